@@ -1,4 +1,6 @@
-from django.contrib import admin
+import logging
+
+from django.contrib import admin, messages
 from django import forms
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.utils.html import format_html
@@ -6,7 +8,10 @@ from django.urls import reverse
 from django.http import HttpRequest
 from ..models.manga_models import MangaTitle, Chapter, Page, Genre, Author, Comment
 from ..services.manga_service import MangaTitleService, PageService, CommentService
-from .mixins import LogUserMixin
+from ..services.page_import_service import PageImportService
+from .mixins import LogUserMixin, UserSubclassPrefetchMixin
+
+logger = logging.getLogger(__name__)
 
 
 # --- Form classes ---
@@ -23,6 +28,38 @@ class MangaTitleForm(forms.ModelForm):
         fields = "__all__"
 
 
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultipleImageField(forms.ImageField):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("widget", MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        if isinstance(data, (list, tuple)):
+            return [super(MultipleImageField, self).clean(item, initial) for item in data]
+        return [super().clean(data, initial)] if data else []
+
+
+class ChapterForm(forms.ModelForm):
+    pages_archive_upload = forms.FileField(
+        required=False,
+        label="Import Pages (CBZ/ZIP)",
+        help_text="Pages are appended after the last page, in natural order of the file names.",
+        widget=forms.ClearableFileInput(attrs={"accept": ".cbz,.zip"})
+    )
+    pages_images_upload = MultipleImageField(
+        required=False,
+        label="Import Pages (images)",
+    )
+
+    class Meta:
+        model = Chapter
+        fields = "__all__"
+
+
 class PageForm(forms.ModelForm):
     image_upload = forms.ImageField(
         required=False,
@@ -244,6 +281,7 @@ class ChapterAdmin(LogUserMixin, admin.ModelAdmin):
     ordering = ("manga_title__title", "-upload_date")
     list_per_page = 20
     inlines = [PageInline, CommentInline]
+    form = ChapterForm
 
     fieldset = (
         ("Chapter Details", {"fields": (
@@ -268,6 +306,31 @@ class ChapterAdmin(LogUserMixin, admin.ModelAdmin):
     def get_display_name(self, obj: Page) -> str:
         return str(obj)
     get_display_name.short_description = "Display name"
+
+    def save_related(
+        self, request: HttpRequest, form: forms.ModelForm, 
+        formsets, change: bool
+    ):
+        super().save_related(request, form, formsets, change)
+
+        # Import pages after the inline pages are saved
+        archive_file = form.cleaned_data.get("pages_archive_upload")
+        image_files = form.cleaned_data.get("pages_images_upload")
+        if not archive_file and not image_files:
+            return
+        try:
+            if archive_file:
+                pages = PageImportService.import_archive(form.instance, archive_file, request.user)
+            else:
+                pages = PageImportService.import_files(form.instance, image_files, request.user)
+        except ValueError as e:
+            self.message_user(request, f"Page import failed: {e}", level=messages.ERROR)
+            return
+        except Exception as e:
+            logger.exception("Page import failed (chapter_id=%s)", form.instance.id)
+            self.message_user(request, f"Page import failed: {e}", level=messages.ERROR)
+            return
+        self.message_user(request, f"Imported {len(pages)} page(s).", level=messages.SUCCESS)
     
     def save_formset(
         self, request: HttpRequest, form: forms.ModelForm, 
@@ -386,8 +449,9 @@ class GenreAdmin(LogUserMixin, admin.ModelAdmin):
         
 
 @admin.register(Comment)
-class CommentAdmin(LogUserMixin, admin.ModelAdmin):
+class CommentAdmin(UserSubclassPrefetchMixin, LogUserMixin, admin.ModelAdmin):
     form = CommentForm
+    user_subclass_fields = ("owner", "parent_comment__owner")
     list_display = (
         "get_display_name", 
         "owner", 
@@ -400,6 +464,11 @@ class CommentAdmin(LogUserMixin, admin.ModelAdmin):
     )
     list_per_page = 20
     list_filter = ("status", "created_at", "owner", "manga_title", "chapter",)
+    # Comment names are built from the title or chapter (and its title)
+    list_select_related = (
+        "manga_title", "chapter__manga_title",
+        "parent_comment__manga_title", "parent_comment__chapter__manga_title",
+    )
     ordering = ("manga_title", "chapter",)
 
     fields = (
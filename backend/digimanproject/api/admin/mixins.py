@@ -1,6 +1,8 @@
 from django import forms
 from django.http import HttpRequest
 
+from ..utils.helper_functions import prefetch_user_subclasses
+
 
 class LogUserMixin:
     """Mixin to attach the current user to the object for logging."""
@@ -10,4 +12,24 @@ class LogUserMixin:
 
     def delete_model(self, request: HttpRequest, obj):
         obj._action_user = request.user
-        super().delete_model(request, obj)
\ No newline at end of file
+        super().delete_model(request, obj)
+
+class UserSubclassPrefetchMixin:
+    """
+    Changelists: load the users in user_subclass_fields of a result page,
+    and their Reader/Administrator subclass, in bulk, so user display
+    names do not query once per row.
+    """
+    user_subclass_fields: tuple[str, ...] = ()
+
+    def get_changelist(self, request: HttpRequest, **kwargs):
+        changelist_class = super().get_changelist(request, **kwargs)
+        user_fields = self.user_subclass_fields
+
+        class UserSubclassPrefetchChangeList(changelist_class):
+            def get_results(self, request: HttpRequest) -> None:
+                super().get_results(request)
+                # Fills the result cache the changelist then renders from
+                prefetch_user_subclasses(self.result_list, *user_fields)
+
+        return UserSubclassPrefetchChangeList
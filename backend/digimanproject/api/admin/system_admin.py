@@ -4,8 +4,10 @@ from django.contrib import messages
 from django.urls import reverse
 from django.utils.html import format_html
 
-from ..models.system_models import Report, LogEntry, FlaggedContent, ModerationThreshold
+from ..models.system_models import Report, LogEntry, FlaggedContent, ModerationThreshold, StoredImage, OutboxEvent
 from ..services.system_service import FlaggedContentService
+from .mixins import UserSubclassPrefetchMixin
+from ..services.outbox_service import OutboxService
 
 
 @admin.register(Report)
@@ -20,6 +22,7 @@ class ReportAdmin(admin.ModelAdmin):
         "created_at",
     )
     list_filter = ("status", "category", "target_content_type")
+    list_select_related = ("reporter",)
     ordering = ("-created_at",)
     fields = (
         "id",
@@ -50,7 +53,8 @@ class ReportAdmin(admin.ModelAdmin):
 
 
 @admin.register(LogEntry)
-class LogEntryAdmin(admin.ModelAdmin):
+class LogEntryAdmin(UserSubclassPrefetchMixin, admin.ModelAdmin):
+    user_subclass_fields = ("user",)
     list_display = (
         "get_display_name", 
         "action_type", 
@@ -202,4 +206,65 @@ class ModerationThresholdAdmin(admin.ModelAdmin):
 
     def get_display_name(self, obj: ModerationThreshold) -> str:
         return str(obj)
-    get_display_name.short_description = "Display name"
\ No newline at end of file
+    get_display_name.short_description = "Display name"
+
+@admin.register(StoredImage)
+class StoredImageAdmin(admin.ModelAdmin):
+    list_display = (
+        "object_path",
+        "bucket",
+        "content_type",
+        "size",
+        "reference_count",
+        "created_at",
+    )
+    list_filter = ("bucket", "content_type",)
+    search_fields = ("content_hash", "public_url",)
+    ordering = ("-created_at",)
+    readonly_fields = (
+        "id",
+        "bucket",
+        "content_hash",
+        "object_path",
+        "public_url",
+        "content_type",
+        "size",
+        "reference_count",
+        "moderation_scores",
+        "created_at",
+    )
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = (
+        "event_type",
+        "status",
+        "attempts",
+        "available_at",
+        "created_at",
+    )
+    list_filter = ("event_type", "status",)
+    ordering = ("created_at",)
+    readonly_fields = (
+        "id",
+        "event_type",
+        "payload",
+        "status",
+        "attempts",
+        "last_error",
+        "available_at",
+        "created_at",
+    )
+    actions = ("retry_dead_events",)
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description="Retry selected dead events")
+    def retry_dead_events(self, request, queryset):
+        count = OutboxService.retry_dead_events(queryset)
+        self.message_user(request, f"{count} event(s) queued again.", messages.SUCCESS)
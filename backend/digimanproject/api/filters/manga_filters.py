@@ -1,5 +1,7 @@
 import django_filters
+from rest_framework.filters import OrderingFilter, SearchFilter
 from ..models.manga_models import MangaTitle, Chapter, Comment
+from ..services.manga_search_service import MangaTitleSearchService
 
 class MangaTitleFilter(django_filters.FilterSet):
     # Single-value filters
@@ -34,7 +36,34 @@ class CommentFilter(django_filters.FilterSet):
     manga_title_id = django_filters.CharFilter(field_name="manga_title__id", lookup_expr="exact")
     chapter_id = django_filters.CharFilter(field_name="chapter__id", lookup_expr="exact")
     owner_id = django_filters.CharFilter(field_name="owner__id", lookup_expr="exact")
+    parent_comment_id = django_filters.CharFilter(
+        field_name="parent_comment__id", lookup_expr="exact")
 
     class Meta:
         model = Comment
-        fields = ["manga_title_id", "chapter_id", "owner_id"]
+        fields = ["manga_title_id", "chapter_id", "owner_id", "parent_comment_id"]
+
+
+class MangaTitleSearchFilter(SearchFilter):
+    """
+    ?search= backed by the title search vector and trigram indexes,
+    annotating search_relevance. Falls back to the icontains search over
+    the view's search_fields when full-text search is unavailable.
+    """
+    def filter_queryset(self, request, queryset, view):
+        if not MangaTitleSearchService.is_supported():
+            return super().filter_queryset(request, queryset, view)
+        terms = " ".join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+        return MangaTitleSearchService.search(queryset, terms)
+
+
+class RelevanceOrderingFilter(OrderingFilter):
+    """Orders search results by relevance unless ?ordering= is given."""
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        relevance = MangaTitleSearchService.RELEVANCE_ANNOTATION
+        if not params and relevance in queryset.query.annotations:
+            return [f"-{relevance}"]
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from ...services.image_service import ImageVariantService, ImageVariantTargets
+from ...tasks import enqueue_image_variants_task
+
+
+class Command(BaseCommand):
+    help = "Queue WebP variant and metadata generation for images missing them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target", action="append",
+            choices=[
+                ImageVariantTargets.PAGE,
+                ImageVariantTargets.MANGA_COVER,
+                ImageVariantTargets.AVATAR,
+            ],
+            help="Only process this target (repeatable, default: all targets).",
+        )
+
+    def handle(self, *args, **options):
+        targets = options["target"] or [
+            ImageVariantTargets.PAGE,
+            ImageVariantTargets.MANGA_COVER,
+            ImageVariantTargets.AVATAR,
+        ]
+        for target in targets:
+            model, source_field, variants_field, metadata_field, _, _ = (
+                ImageVariantService.get_target(target))
+            missing = Q(**{variants_field: {}})
+            if metadata_field:
+                missing |= Q(**{metadata_field: {}})
+            object_ids = (
+                model.objects
+                .exclude(**{f"{source_field}__isnull": True})
+                .exclude(**{source_field: ""})
+                .filter(missing)
+                .values_list("pk", flat=True)
+            )
+            count = 0
+            for object_id in object_ids.iterator():
+                enqueue_image_variants_task(target, object_id)
+                count += 1
+            self.stdout.write(self.style.SUCCESS(f"Queued {count} {target} image(s)."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services.manga_search_service import MangaTitleSearchService
+
+
+class Command(BaseCommand):
+    help = "Recompute the full-text search vectors of manga titles."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "manga_title_ids", nargs="*",
+            help="Only process these manga title ids (default: all titles).",
+        )
+
+    def handle(self, *args, **options):
+        if not MangaTitleSearchService.is_supported():
+            raise CommandError("Full-text search requires PostgreSQL.")
+        updated = MangaTitleSearchService.update_search_vectors(
+            options["manga_title_ids"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Updated search vectors of {updated} manga title(s)."))
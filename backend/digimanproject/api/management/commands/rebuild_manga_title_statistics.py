@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from ...services.manga_title_statistics_service import MangaTitleStatisticsService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized MangaTitleStatistics counters from the "
+        "source tables, or report drift with --check."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "manga_title_ids", nargs="*",
+            help="Only process these manga title ids (default: all titles).",
+        )
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Report counters that differ from the source tables without fixing them.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        manga_title_ids = options["manga_title_ids"] or None
+
+        if options["check"]:
+            drift = MangaTitleStatisticsService.find_drift(manga_title_ids)
+            for row in drift:
+                self.stdout.write(
+                    f"{row['manga_title_id']} {row['field']}: "
+                    f"stored={row['stored']} computed={row['computed']}"
+                )
+            if drift:
+                self.stdout.write(self.style.WARNING(f"{len(drift)} drifted counter(s)."))
+            else:
+                self.stdout.write(self.style.SUCCESS("No drift found."))
+            return
+
+        rebuilt = MangaTitleStatisticsService.rebuild(
+            manga_title_ids, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics for {rebuilt} manga title(s)."))
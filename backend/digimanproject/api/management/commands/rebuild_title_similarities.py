@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ...services.title_similarity_service import TitleSimilarityService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the MangaTitleSimilarity neighbours used for "
+        "recommendations from MangaReaderStatistics."
+    )
+
+    def handle(self, *args, **options):
+        rows = TitleSimilarityService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Stored {rows} title similarities."))
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:12
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset):
+    return Coalesce(Subquery(
+        queryset.order_by().values("manga_title")
+        .annotate(count=Count("pk")).values("count")
+    ), 0)
+
+
+def populate_manga_title_statistics(apps, schema_editor):
+    MangaTitle = apps.get_model("api", "MangaTitle")
+    MangaTitleStatistics = apps.get_model("api", "MangaTitleStatistics")
+    Chapter = apps.get_model("api", "Chapter")
+    Comment = apps.get_model("api", "Comment")
+    MangaReaderStatistics = apps.get_model("api", "MangaReaderStatistics")
+
+    chapters = Chapter.objects.filter(manga_title=OuterRef("pk"))
+    comments = Comment.objects.filter(manga_title=OuterRef("pk"))
+    ratings = MangaReaderStatistics.objects.filter(
+        manga_title=OuterRef("pk"), star_rating__gt=0).order_by()
+    rows = MangaTitle.objects.annotate(
+        chapter_count=_count(chapters),
+        comment_count=_count(comments),
+        safe_comment_count=_count(comments.filter(moderation_status="safe")),
+        latest_chapter_date=Subquery(
+            chapters.order_by("-upload_date").values("upload_date")[:1]),
+        rating_sum=Coalesce(Subquery(
+            ratings.values("manga_title").annotate(total=Sum("star_rating")).values("total")
+        ), 0),
+        rating_count=_count(ratings),
+        average_rating=Subquery(
+            ratings.values("manga_title").annotate(avg=Avg("star_rating")).values("avg"),
+            output_field=models.FloatField(),
+        ),
+        read_count=_count(MangaReaderStatistics.objects.filter(
+            manga_title=OuterRef("pk"), is_reader_read=True)),
+    ).values(
+        "id", "chapter_count", "comment_count", "safe_comment_count",
+        "latest_chapter_date", "rating_sum", "rating_count", "average_rating",
+        "read_count",
+    )
+
+    batch = []
+    for row in rows.iterator(chunk_size=1000):
+        batch.append(MangaTitleStatistics(manga_title_id=row.pop("id"), **row))
+        if len(batch) >= 1000:
+            MangaTitleStatistics.objects.bulk_create(batch)
+            batch = []
+    MangaTitleStatistics.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0037_alter_logentry_action_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MangaTitleStatistics',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('chapter_count', models.IntegerField(default=0)),
+                ('comment_count', models.IntegerField(default=0)),
+                ('safe_comment_count', models.IntegerField(default=0)),
+                ('latest_chapter_date', models.DateTimeField(blank=True, null=True)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('average_rating', models.FloatField(blank=True, null=True)),
+                ('read_count', models.IntegerField(default=0)),
+                ('manga_title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='api.mangatitle')),
+            ],
+            options={
+                'verbose_name': 'Manga Title Statistics',
+                'verbose_name_plural': 'Manga Title Statistics',
+                'indexes': [models.Index(fields=['-average_rating'], name='manga_stats_avg_rating_idx'), models.Index(fields=['-read_count'], name='manga_stats_read_count_idx'), models.Index(fields=['-latest_chapter_date'], name='manga_stats_latest_date_idx')],
+            },
+        ),
+        migrations.RunPython(
+            populate_manga_title_statistics, migrations.RunPython.noop),
+    ]
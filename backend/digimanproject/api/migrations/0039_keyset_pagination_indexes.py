@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0038_manga_title_statistics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created_at', 'id'], name='comment_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['manga_title', 'created_at', 'id'], name='comment_title_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['chapter', 'created_at', 'id'], name='comment_chapter_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['timestamp', 'id'], name='log_entry_timestamp_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mangatitle',
+            index=models.Index(fields=['publication_date', 'id'], name='manga_title_pub_date_id_idx'),
+        ),
+    ]
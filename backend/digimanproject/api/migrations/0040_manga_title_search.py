@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:16
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+POPULATE_SEARCH_VECTORS_SQL = """
+UPDATE api_mangatitle AS m SET search_vector =
+    setweight(to_tsvector('simple', coalesce(m.title, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce(m.alternative_title, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce(
+        (SELECT a.name FROM api_author AS a WHERE a.id = m.author_id), '')), 'B')
+    || setweight(to_tsvector('simple', coalesce(
+        (SELECT string_agg(g.name, ' ')
+         FROM api_mangatitle_genres AS mg
+         JOIN api_genre AS g ON g.id = mg.genre_id
+         WHERE mg.mangatitle_id = m.id), '')), 'B')
+    || setweight(to_tsvector('simple', coalesce(m.description, '')), 'C')
+"""
+
+
+def populate_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(POPULATE_SEARCH_VECTORS_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0039_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='mangatitle',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='mangatitle',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='manga_title_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mangatitle',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='manga_title_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='mangatitle',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['alternative_title'], name='manga_title_alt_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
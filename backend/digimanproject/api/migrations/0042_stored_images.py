@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:37
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0041_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('bucket', models.CharField(max_length=100)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('object_path', models.CharField(max_length=255)),
+                ('public_url', models.URLField(db_index=True, max_length=1024)),
+                ('content_type', models.CharField(max_length=50)),
+                ('size', models.PositiveBigIntegerField()),
+                ('reference_count', models.PositiveIntegerField(default=1)),
+                ('moderation_scores', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Stored Image',
+                'verbose_name_plural': 'Stored Images',
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'content_hash'), name='unique_stored_image_content'), models.UniqueConstraint(fields=('bucket', 'object_path'), name='unique_stored_image_path')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0043_outbox_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mangatitle',
+            name='cover_image_metadata',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='image_metadata',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0044_image_metadata'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flaggedcontent',
+            index=models.Index(fields=['target_object_type', 'target_object_id', 'is_resolved'], name='flagged_content_target_idx'),
+        ),
+    ]
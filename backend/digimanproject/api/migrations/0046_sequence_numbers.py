@@ -0,0 +1,74 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:49
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def _number(rows, get_scope, model, field="sequence_number"):
+    """Number the rows (already ordered by scope) 1..n within each scope."""
+    batch = []
+    previous_scope, number = object(), 0
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        scope = get_scope(row)
+        number = number + 1 if scope == previous_scope else 1
+        previous_scope = scope
+        setattr(row, field, number)
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_update(batch, [field])
+            batch = []
+    model.objects.bulk_update(batch, [field])
+
+
+def populate_sequence_numbers(apps, schema_editor):
+    Comment = apps.get_model("api", "Comment")
+    FlaggedContent = apps.get_model("api", "FlaggedContent")
+
+    # Same order the numbers were counted in before: safe comments of a
+    # title (or of a chapter, for chapter comments) by creation time
+    safe_comments = Comment.objects.filter(moderation_status="safe").only(
+        "id", "manga_title_id", "chapter_id")
+    _number(
+        safe_comments.filter(manga_title__isnull=False)
+        .order_by("manga_title_id", "created_at", "id"),
+        lambda comment: comment.manga_title_id, Comment,
+    )
+    _number(
+        safe_comments.filter(manga_title__isnull=True, chapter__isnull=False)
+        .order_by("chapter_id", "created_at", "id"),
+        lambda comment: comment.chapter_id, Comment,
+    )
+    _number(
+        FlaggedContent.objects.only("id").order_by("flagged_at", "id"),
+        lambda flag: None, FlaggedContent,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0045_flagged_content_target_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='sequence_number',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='flaggedcontent',
+            name='sequence_number',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(populate_sequence_numbers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='comment',
+            constraint=models.UniqueConstraint(fields=('manga_title', 'sequence_number'), name='unique_comment_sequence_per_title'),
+        ),
+        migrations.AddConstraint(
+            model_name='comment',
+            constraint=models.UniqueConstraint(condition=models.Q(('manga_title__isnull', True)), fields=('chapter', 'sequence_number'), name='unique_comment_sequence_per_chapter'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:53
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_progress(apps, schema_editor):
+    """Keep the most recent progress of each (reader, chapter)."""
+    ReadingProgress = apps.get_model("api", "ReadingProgress")
+    duplicates = (
+        ReadingProgress.objects
+        .filter(chapter__isnull=False)
+        .values("reader_id", "chapter_id")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        rows = ReadingProgress.objects.filter(
+            reader_id=duplicate["reader_id"], chapter_id=duplicate["chapter_id"],
+        ).order_by("-last_read_timestamp", "id")
+        keep = rows.values_list("id", flat=True)[0]
+        rows.exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0046_sequence_numbers'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_progress, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='readingprogress',
+            constraint=models.UniqueConstraint(fields=('reader', 'chapter'), name='unique_reading_progress_per_chapter'),
+        ),
+    ]
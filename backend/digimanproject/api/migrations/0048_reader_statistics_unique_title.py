@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:56
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce
+
+
+def _count(queryset):
+    return Coalesce(Subquery(
+        queryset.order_by().values("manga_title")
+        .annotate(count=Count("pk")).values("count")
+    ), 0)
+
+
+def merge_duplicate_statistics(apps, schema_editor):
+    """
+    Merge the rows of each (reader, manga title) into one: flags are
+    combined and the highest rating kept. The read and rating counters of
+    the affected titles counted every duplicate, so they are recomputed.
+    """
+    MangaReaderStatistics = apps.get_model("api", "MangaReaderStatistics")
+    MangaTitleStatistics = apps.get_model("api", "MangaTitleStatistics")
+
+    duplicates = (
+        MangaReaderStatistics.objects
+        .values("reader_id", "manga_title_id")
+        .annotate(
+            count=Count("id"),
+            # MAX() of booleans is not portable: compare them as integers
+            is_reader_visited=Max(Cast("is_reader_visited", models.IntegerField())),
+            is_reader_read=Max(Cast("is_reader_read", models.IntegerField())),
+            is_reader_commented=Max(Cast("is_reader_commented", models.IntegerField())),
+            star_rating=Max("star_rating"),
+        )
+        .filter(count__gt=1)
+    )
+    manga_title_ids = set()
+    for duplicate in duplicates.iterator():
+        rows = MangaReaderStatistics.objects.filter(
+            reader_id=duplicate["reader_id"], manga_title_id=duplicate["manga_title_id"],
+        ).order_by("id")
+        keep = rows.values_list("id", flat=True)[0]
+        rows.exclude(id=keep).delete()
+        rows.filter(id=keep).update(**{
+            field: bool(duplicate[field]) for field in (
+                "is_reader_visited", "is_reader_read", "is_reader_commented")
+        }, star_rating=duplicate["star_rating"])
+        manga_title_ids.add(duplicate["manga_title_id"])
+
+    ratings = MangaReaderStatistics.objects.filter(
+        manga_title=OuterRef("manga_title"), star_rating__gt=0).order_by()
+    MangaTitleStatistics.objects.filter(manga_title_id__in=manga_title_ids).update(
+        rating_sum=Coalesce(Subquery(
+            ratings.values("manga_title").annotate(total=Sum("star_rating")).values("total")
+        ), 0),
+        rating_count=_count(ratings),
+        average_rating=Subquery(
+            ratings.values("manga_title").annotate(avg=Avg("star_rating")).values("avg"),
+            output_field=models.FloatField(),
+        ),
+        read_count=_count(MangaReaderStatistics.objects.filter(
+            manga_title=OuterRef("manga_title"), is_reader_read=True)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0047_reading_progress_unique_chapter'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_statistics, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='mangareaderstatistics',
+            constraint=models.UniqueConstraint(fields=('reader', 'manga_title'), name='unique_reader_statistics_per_title'),
+        ),
+    ]
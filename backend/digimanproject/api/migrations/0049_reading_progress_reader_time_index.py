@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0048_reader_statistics_unique_title'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='readingprogress',
+            index=models.Index(fields=['reader', 'last_read_timestamp'], name='progress_reader_time_idx'),
+        ),
+    ]
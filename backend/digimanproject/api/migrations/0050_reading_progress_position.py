@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0049_reading_progress_reader_time_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readingprogress',
+            name='page_number',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='readingprogress',
+            name='position_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='readingprogress',
+            name='scroll_position',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
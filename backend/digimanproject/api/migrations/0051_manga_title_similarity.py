@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:04
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0050_reading_progress_position'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MangaTitleSimilarity',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('manga_title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='api.mangatitle')),
+                ('similar_title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='api.mangatitle')),
+            ],
+            options={
+                'verbose_name': 'Manga Title Similarity',
+                'verbose_name_plural': 'Manga Title Similarities',
+                'constraints': [models.UniqueConstraint(fields=('manga_title', 'rank'), name='unique_similarity_rank'), models.UniqueConstraint(fields=('manga_title', 'similar_title'), name='unique_similar_title')],
+            },
+        ),
+    ]
@@ -1,13 +1,17 @@
 from __future__ import annotations
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 from django.db import models
 from django.utils import timezone
 from django.contrib import admin
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 import uuid
 from .common_choice_classes import ModerationStatusChoices
-from ..utils.helper_functions import update_instance, remove_unchanged_and_denied_fields, cast_user_to_subclass
+from ..utils.helper_functions import (
+    update_instance, remove_unchanged_and_denied_fields, cast_user_to_subclass, save_with_sequence_number,
+)
 
 from typing import TYPE_CHECKING
 
@@ -81,6 +85,10 @@ class MangaTitle(models.Model):
         related_name="manga_titles")
     description: str = models.TextField(blank=True)
     cover_image: str = models.URLField(blank=True, null=True, default="")
+    # {variant: url} WebP renditions, filled by ImageVariantService
+    cover_image_variants: Dict[str, str] = models.JSONField(default=dict, blank=True)
+    # width, height, bytes, mime_type, placeholder (LQIP data URI) of the cover
+    cover_image_metadata: Dict[str, Any] = models.JSONField(default=dict, blank=True)
 
     publication_status: str = models.CharField(
         max_length=20,
@@ -95,9 +103,22 @@ class MangaTitle(models.Model):
     first_free_chapter_amount: int = models.IntegerField(default=0)
     last_free_chapter_amount: int = models.IntegerField(default=0)
 
+    # Maintained by MangaTitleSearchService (see manga_signals)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         verbose_name = "Manga Title"
         verbose_name_plural = "Manga Titles"
+        indexes = [
+            models.Index(fields=["publication_date", "id"], name="manga_title_pub_date_id_idx"),
+            GinIndex(fields=["search_vector"], name="manga_title_search_idx"),
+            GinIndex(
+                fields=["title"], opclasses=["gin_trgm_ops"],
+                name="manga_title_title_trgm_idx"),
+            GinIndex(
+                fields=["alternative_title"], opclasses=["gin_trgm_ops"],
+                name="manga_title_alt_title_trgm_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -156,8 +177,8 @@ class MangaTitle(models.Model):
 
     def update_metadata(self, **metadata: Any) -> bool:
         """allowed_fields: title, alternative_title, author, description, 
-        cover_image, publication_status, is_visible, is_premium,
-        first_free_chapter_amount, last_free_chapter_amount"""
+        cover_image, cover_image_variants, cover_image_metadata, publication_status, is_visible,
+        is_premium, first_free_chapter_amount, last_free_chapter_amount"""
 
         allowed_fields = {
             "title",
@@ -165,6 +186,8 @@ class MangaTitle(models.Model):
             "author",
             "description",
             "cover_image",
+            "cover_image_variants",
+            "cover_image_metadata",
             "publication_status",
             "is_visible",
             "is_premium",
@@ -186,15 +209,76 @@ class MangaTitle(models.Model):
     def clear_genres(self) -> None:
         self.genres.clear()
 
-    def check_chapter_number_premium(self, chapter_number: int) -> bool:
+    def check_chapter_number_premium(
+        self, chapter_number: int, chapter_count: Optional[int] = None
+    ) -> bool:
+        """chapter_count can be passed when already known, to skip the count query"""
         if not self.is_premium:
             return False
-        chapter_count = self.get_chapter_count()
+        if chapter_count is None:
+            chapter_count = self.get_chapter_count()
         first_premium_chapter_number = self.first_free_chapter_amount + 1
         last_premium_chapter_number = chapter_count - self.last_free_chapter_amount
         return first_premium_chapter_number <= chapter_number <= last_premium_chapter_number
 
 
+class MangaTitleStatistics(models.Model):
+    """Denormalized per-title counters, kept current by the manga/reader
+    signals and ReaderStatisticsService, rebuilt by the
+    rebuild_manga_title_statistics management command."""
+    id: uuid.UUID = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False)
+    manga_title: "MangaTitle" = models.OneToOneField(
+        "MangaTitle", related_name="statistics", on_delete=models.CASCADE)
+    chapter_count: int = models.IntegerField(default=0)
+    comment_count: int = models.IntegerField(default=0)
+    safe_comment_count: int = models.IntegerField(default=0)
+    latest_chapter_date: Optional[datetime] = models.DateTimeField(null=True, blank=True)
+    rating_sum: int = models.IntegerField(default=0)
+    rating_count: int = models.IntegerField(default=0)
+    average_rating: Optional[float] = models.FloatField(null=True, blank=True)
+    read_count: int = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Manga Title Statistics"
+        verbose_name_plural = "Manga Title Statistics"
+        indexes = [
+            models.Index(fields=["-average_rating"], name="manga_stats_avg_rating_idx"),
+            models.Index(fields=["-read_count"], name="manga_stats_read_count_idx"),
+            models.Index(fields=["-latest_chapter_date"], name="manga_stats_latest_date_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Statistics of {self.manga_title}"
+
+
+class MangaTitleSimilarity(models.Model):
+    """Top neighbours of a manga title by item-item collaborative
+    filtering over MangaReaderStatistics, rebuilt by
+    TitleSimilarityService.rebuild."""
+    id: uuid.UUID = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False)
+    manga_title: "MangaTitle" = models.ForeignKey(
+        "MangaTitle", related_name="similarities", on_delete=models.CASCADE)
+    similar_title: "MangaTitle" = models.ForeignKey(
+        "MangaTitle", related_name="similar_to", on_delete=models.CASCADE)
+    score: float = models.FloatField()
+    rank: int = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name = "Manga Title Similarity"
+        verbose_name_plural = "Manga Title Similarities"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["manga_title", "rank"], name="unique_similarity_rank"),
+            models.UniqueConstraint(
+                fields=["manga_title", "similar_title"], name="unique_similar_title"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.manga_title} ~ {self.similar_title} ({self.score:.3f})"
+
+
 class Chapter(models.Model):
     id: uuid.UUID = models.UUIDField(
         primary_key=True, default=uuid.uuid4, editable=False)
@@ -204,6 +288,14 @@ class Chapter(models.Model):
     chapter_number: int = models.IntegerField()
     upload_date: datetime = models.DateTimeField(default=timezone.now)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Title as loaded, so the statistics signals can recount it when
+        # the chapter is moved to another title
+        instance._loaded_manga_title_id = instance.__dict__.get("manga_title_id")
+        return instance
+
     def __str__(self) -> str:
         return f"{self.manga_title} - Chapter {self.chapter_number}"
     
@@ -276,8 +368,9 @@ class Chapter(models.Model):
         description="Is premium",
         boolean=True
     )
-    def is_premium(self) -> bool:
-        return self.manga_title.check_chapter_number_premium(self.chapter_number)
+    def is_premium(self, chapter_count: Optional[int] = None) -> bool:
+        return self.manga_title.check_chapter_number_premium(
+            self.chapter_number, chapter_count)
 
 
 class Page(models.Model):
@@ -287,6 +380,10 @@ class Page(models.Model):
         "Chapter", related_name="pages", on_delete=models.CASCADE)
     page_number: int = models.IntegerField()
     image_url: str = models.URLField(blank=True, null=True, default="")
+    # {variant: url} WebP renditions, filled by ImageVariantService
+    image_variants: Dict[str, str] = models.JSONField(default=dict, blank=True)
+    # width, height, bytes, mime_type, placeholder (LQIP data URI) of the image
+    image_metadata: Dict[str, Any] = models.JSONField(default=dict, blank=True)
 
     class Meta:
         constraints = [
@@ -303,8 +400,8 @@ class Page(models.Model):
         return self.chapter
     
     def update_metadata(self, **metadata: Any) -> bool:
-        """allowed_fields: page_number, image_url"""
-        allowed_fields = {"page_number", "image_url"}
+        """allowed_fields: page_number, image_url, image_variants, image_metadata"""
+        allowed_fields = {"page_number", "image_url", "image_variants", "image_metadata"}
         metadata = remove_unchanged_and_denied_fields(self, allowed_fields, **metadata)
         return update_instance(self, **metadata)
 
@@ -344,18 +441,85 @@ class Comment(models.Model):
         default=ModerationStatusChoices.PENDING
     )
     last_moderated_at = models.DateTimeField(null=True, blank=True)
+    # Position among the safe comments of the title (or chapter), assigned
+    # once when the comment becomes safe
+    sequence_number: Optional[int] = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+
+    SEQUENCE_SCOPE_FIELDS = {"manga_title", "manga_title_id", "chapter", "chapter_id"}
 
     class Meta:
         ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["manga_title", "sequence_number"],
+                name="unique_comment_sequence_per_title",
+            ),
+            models.UniqueConstraint(
+                fields=["chapter", "sequence_number"],
+                condition=models.Q(manga_title__isnull=True),
+                name="unique_comment_sequence_per_chapter",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="comment_created_id_idx"),
+            models.Index(
+                fields=["manga_title", "created_at", "id"], name="comment_title_created_id_idx"),
+            models.Index(
+                fields=["chapter", "created_at", "id"], name="comment_chapter_created_id_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Title as loaded, so the statistics signals can recount it when
+        # the comment is moved to another title
+        instance._loaded_manga_title_id = instance.__dict__.get("manga_title_id")
+        # Numbering scope as loaded, so a moved comment is numbered again
+        if {"manga_title_id", "chapter_id"} <= instance.__dict__.keys():
+            instance._loaded_sequence_scope = instance.get_sequence_scope_key()
+        return instance
+
 
     def __str__(self) -> str:
-        index = self.get_comment_index()
-        where = self.manga_title if self.manga_title else self.chapter
-        if index is not None:
-            return f"Comment #{index} in {where}"
+        where = self.manga_title if self.manga_title_id else self.chapter
+        if self.sequence_number is not None:
+            return f"Comment #{self.sequence_number} in {where}"
         else:
             return f"Comment by {self.get_owner_name()} at {self.created_at}"
-        
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        saves_scope = (
+            update_fields is None or bool(Comment.SEQUENCE_SCOPE_FIELDS & set(update_fields)))
+        scope_key = self.get_sequence_scope_key()
+        if (
+            saves_scope
+            and self.sequence_number is not None
+            and getattr(self, "_loaded_sequence_scope", scope_key) != scope_key
+        ):
+            # Moved to another title or chapter: numbered again in its new scope
+            self.sequence_number = None
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "sequence_number"}
+
+        scope = self.get_sequence_scope()
+        if (
+            self.sequence_number is not None
+            or self.moderation_status != ModerationStatusChoices.SAFE
+            or scope is None
+        ):
+            super(Comment, self).save(*args, **kwargs)
+        else:
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "sequence_number"}
+            save_with_sequence_number(
+                self, "sequence_number", scope,
+                lambda: super(Comment, self).save(*args, **kwargs),
+            )
+        if saves_scope:
+            self._loaded_sequence_scope = scope_key
+
     def get_owner_name(self) -> str:
         return (cast_user_to_subclass(self.owner).get_display_name() 
                 if self.owner else "Guest")
@@ -364,20 +528,19 @@ class Comment(models.Model):
         return (cast_user_to_subclass(self.owner).get_avatar() 
                 if self.owner else "")
     
-    def get_comment_index(self) -> int:
-        if self.moderation_status != ModerationStatusChoices.SAFE:
-            return 0
-        if self.manga_title:
-            comments = (self.manga_title.get_comments()
-                        .filter(moderation_status=ModerationStatusChoices.SAFE)
-                        .order_by("created_at"))
-        elif self.chapter:
-            comments = (self.chapter.get_comments()
-                        .filter(moderation_status=ModerationStatusChoices.SAFE)
-                        .order_by("created_at"))
-        else:
-            return 0
-        return comments.filter(created_at__lte=self.created_at).count()
+    def get_sequence_scope_key(self) -> tuple:
+        """(title id, chapter id) identifying the sequence scope."""
+        if self.manga_title_id:
+            return (self.manga_title_id, None)
+        return (None, self.chapter_id)
+
+    def get_sequence_scope(self) -> Optional[models.QuerySet["Comment"]]:
+        """The comments numbered together with this one."""
+        if self.manga_title_id:
+            return Comment.objects.filter(manga_title_id=self.manga_title_id)
+        if self.chapter_id:
+            return Comment.objects.filter(manga_title__isnull=True, chapter_id=self.chapter_id)
+        return None
     
     def get_hidden_reasons(self) -> str:
         return self.hidden_reasons
@@ -22,13 +22,32 @@ class ReadingProgress(models.Model):
     chapter: Optional["Chapter"] = models.ForeignKey(
         "Chapter", on_delete=models.SET_NULL, null=True)
     last_read_timestamp: datetime = models.DateTimeField(default=timezone.now)
+    # Resume position: the page and how far it was scrolled, in
+    # SCROLL_SCALE-ths of the page
+    page_number: Optional[int] = models.PositiveSmallIntegerField(null=True, blank=True)
+    scroll_position: int = models.PositiveSmallIntegerField(default=0)
+    position_updated_at: Optional[datetime] = models.DateTimeField(null=True, blank=True)
+
+    SCROLL_SCALE = 10000
 
     class Meta:
         verbose_name = "Reading Progress"
         verbose_name_plural = "Reading Progresses"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["reader", "chapter"], name="unique_reading_progress_per_chapter"),
+        ]
+        indexes = [
+            models.Index(
+                fields=["reader", "last_read_timestamp"], name="progress_reader_time_idx"),
+        ]
 
     def get_manga_title(self) -> "MangaTitle":
         return self.chapter.get_manga_title()
+
+    @property
+    def scroll_fraction(self) -> float:
+        return self.scroll_position / ReadingProgress.SCROLL_SCALE
     
     
 class MangaReaderStatistics(models.Model):
@@ -46,6 +65,10 @@ class MangaReaderStatistics(models.Model):
     class Meta:
         verbose_name = "Manga Reader Statistics"
         verbose_name_plural = "Manga Reader Statistics"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["reader", "manga_title"], name="unique_reader_statistics_per_title"),
+        ]
 
     def update_statistics(self, **statistics_data: Any) -> None:
         """Allowed fields: is_reader_visited, is_reader_read,
@@ -6,7 +6,10 @@ from django.utils import timezone
 import uuid
 
 from .common_choice_classes import ModerationStatusChoices
-from ..utils.helper_functions import get_target_object, update_instance, cast_user_to_subclass, remove_unchanged_and_denied_fields
+from ..utils.helper_functions import (
+    get_target_object, update_instance, cast_user_to_subclass, remove_unchanged_and_denied_fields,
+    save_with_sequence_number,
+)
 from django.contrib import admin
 
 from typing import TYPE_CHECKING
@@ -132,16 +135,36 @@ class FlaggedContent(models.Model):
     target_object_type: str = models.CharField(
         choices=TargetObjectTypeChoices.choices)
     target_object_id: uuid.UUID = models.UUIDField()
+    # Global position of the flag, assigned on creation
+    sequence_number: Optional[int] = models.PositiveIntegerField(
+        null=True, blank=True, unique=True, editable=False)
 
     class Meta:
         ordering = ["-flagged_at"]
         verbose_name = "Flagged Content"
         verbose_name_plural = "Flagged Contents"
+        indexes = [
+            models.Index(
+                fields=["target_object_type", "target_object_id", "is_resolved"],
+                name="flagged_content_target_idx"),
+        ]
 
     def __str__(self) -> str:
-        from ..services.system_service import FlaggedContentService
-        index = FlaggedContentService.get_flagged_content_index(self)
-        return f"Flagged Content #{index} on {self.target_object_type}'s {self.content_name}"
+        return (
+            f"Flagged Content #{self.sequence_number} on "
+            f"{self.target_object_type}'s {self.content_name}"
+        )
+
+    def save(self, *args, **kwargs):
+        if self.sequence_number is not None:
+            super(FlaggedContent, self).save(*args, **kwargs)
+            return
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "sequence_number"}
+        save_with_sequence_number(
+            self, "sequence_number", FlaggedContent.objects.all(),
+            lambda: super(FlaggedContent, self).save(*args, **kwargs),
+        )
     
     def get_reason(self) -> str:
         return self.reason
@@ -271,6 +294,9 @@ class LogEntry(models.Model):
         ordering = ["-timestamp"]
         verbose_name = "Log Entry"
         verbose_name_plural = "Log Entries"
+        indexes = [
+            models.Index(fields=["timestamp", "id"], name="log_entry_timestamp_id_idx"),
+        ]
 
     def __str__(self) -> str:
         if self.action_type in {self.ActionTypeChoices.LOGIN, self.ActionTypeChoices.LOGOUT}:
@@ -359,3 +385,82 @@ class LogEntry(models.Model):
                 retry_count=self.retry_count + 1,
                 last_error=last_error
             )
+
+
+class StoredImage(models.Model):
+    """
+    An image object in storage, addressed by the SHA-256 of its content.
+    Identical uploads share one object; reference_count tracks how many
+    model fields point at its public URL.
+    """
+    id: uuid.UUID = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False
+    )
+    bucket: str = models.CharField(max_length=100)
+    content_hash: str = models.CharField(max_length=64)
+    object_path: str = models.CharField(max_length=255)
+    public_url: str = models.URLField(max_length=1024, db_index=True)
+    content_type: str = models.CharField(max_length=50)
+    size: int = models.PositiveBigIntegerField()
+    reference_count: int = models.PositiveIntegerField(default=1)
+    moderation_scores: Optional[Dict[str, float]] = models.JSONField(
+        null=True, blank=True
+    )
+    created_at: datetime = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Stored Image"
+        verbose_name_plural = "Stored Images"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bucket", "content_hash"],
+                name="unique_stored_image_content",
+            ),
+            models.UniqueConstraint(
+                fields=["bucket", "object_path"],
+                name="unique_stored_image_path",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.bucket}/{self.object_path} ({self.reference_count} refs)"
+
+
+class OutboxEvent(models.Model):
+    """
+    An external side effect (e.g. deleting storage objects) recorded in
+    the same transaction as the database change that requires it, and
+    carried out by a worker after commit (see OutboxService).
+    """
+    class EventTypeChoices(models.TextChoices):
+        DELETE_STORAGE_OBJECTS = "delete_storage_objects"
+
+    class StatusChoices(models.TextChoices):
+        PENDING = "pending"
+        DEAD = "dead"
+
+    id: uuid.UUID = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False
+    )
+    event_type: str = models.CharField(max_length=50, choices=EventTypeChoices.choices)
+    payload: Dict[str, Any] = models.JSONField(default=dict)
+    status: str = models.CharField(
+        max_length=10,
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING
+    )
+    attempts: int = models.PositiveIntegerField(default=0)
+    last_error: str = models.TextField(blank=True, default="")
+    available_at: datetime = models.DateTimeField(default=timezone.now)
+    created_at: datetime = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Outbox Event"
+        verbose_name_plural = "Outbox Events"
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "available_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.event_type} ({self.status}, {self.attempts} attempts)"
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Any
+from typing import Any, Dict
 from datetime import datetime
 from django.db import models
 from django.contrib.auth.models import AbstractUser
@@ -132,6 +132,8 @@ class User(AbstractUser):
 class Reader(User):
     display_name: str = models.CharField(max_length=100, blank=True, default="")
     avatar: str = models.URLField(blank=True, null=True, default="")
+    # {variant: url} WebP renditions, filled by ImageVariantService
+    avatar_variants: Dict[str, str] = models.JSONField(default=dict, blank=True)
     
     class Meta:
         verbose_name = "Reader"
@@ -147,7 +149,7 @@ class Reader(User):
         return self.avatar if self.avatar != "" else super().get_avatar()
 
     def update_metadata(self, **metadata: Any) -> bool:
-        """Allowed fields: username, email, password, status, moderation_status, last_moderated_at, display_name, avatar"""
+        """Allowed fields: username, email, password, status, moderation_status, last_moderated_at, display_name, avatar, avatar_variants"""
         allowed_fields = {
             "username", 
             "email", 
@@ -157,6 +159,7 @@ class Reader(User):
             "last_moderated_at",
             "display_name", 
             "avatar", 
+            "avatar_variants",
         }
         # set moderation_status to PENDING
         # if any content field (username, display_name, avatar) is updated
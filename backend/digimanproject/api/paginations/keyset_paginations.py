@@ -0,0 +1,174 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import View
+
+
+class OptInKeysetPagination(PageNumberPagination):
+    """
+    Page number pagination by default, keyset (cursor) pagination on request.
+
+    Clients opt in with ?pagination=cursor and then follow the returned
+    next/previous links, which carry a ?cursor= token. The keyset is the
+    first field of the active ordering (as chosen by OrderingFilter or the
+    view/model default) plus the primary key as a tie-breaker, e.g.
+    (publication_date, id). Each page is a single indexed range query:
+    no COUNT(*) and no OFFSET, so latency does not grow with depth.
+    The ordering key must be non-null (use a Coalesce annotation otherwise).
+    """
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    keyset_mode = "cursor"
+    invalid_cursor_message = "Invalid cursor."
+
+    def is_keyset_requested(self, request: Request) -> bool:
+        return (
+            request.query_params.get(self.mode_query_param) == self.keyset_mode
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(
+        self, queryset: QuerySet, request: Request, view: Optional[View] = None
+    ) -> Optional[List[Any]]:
+        self.use_keyset = self.is_keyset_requested(request)
+        if not self.use_keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.request = request
+        self.key_field, self.descending = self.get_keyset_ordering(queryset)
+        cursor = self.decode_cursor(request)
+        is_reverse = bool(cursor and cursor["reverse"])
+
+        # Walking backwards flips the ordering; the page is flipped back below.
+        descending = self.descending != is_reverse
+        queryset = queryset.order_by(*self.get_order_by(descending))
+        if cursor:
+            try:
+                queryset = queryset.filter(
+                    self.get_keyset_filter(cursor["value"], cursor["pk"], descending))
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        self.page = rows[:page_size]
+        if is_reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    def get_paginated_response(self, data: Any) -> Response:
+        if not getattr(self, "use_keyset", False):
+            return super().get_paginated_response(data)
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_next_link(self) -> Optional[str]:
+        if not getattr(self, "use_keyset", False):
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.build_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not getattr(self, "use_keyset", False):
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.build_link(self.page[0], reverse=True)
+
+    # ------------------------------------------------------------------
+    # Keyset helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def get_keyset_ordering(queryset: QuerySet) -> Tuple[str, bool]:
+        """Return (field, descending) from the first ordering term."""
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        first = next((term for term in ordering if isinstance(term, str)), "-pk")
+        descending = first.startswith("-")
+        field = first.lstrip("-")
+        if field in ("pk", queryset.model._meta.pk.name):
+            field = "pk"
+        return field, descending
+
+    def get_order_by(self, descending: bool) -> List[str]:
+        prefix = "-" if descending else ""
+        if self.key_field == "pk":
+            return [f"{prefix}pk"]
+        return [f"{prefix}{self.key_field}", f"{prefix}pk"]
+
+    def get_keyset_filter(self, value: Any, pk: Any, descending: bool) -> Q:
+        lookup = "lt" if descending else "gt"
+        if self.key_field == "pk":
+            return Q(**{f"pk__{lookup}": pk})
+        return (
+            Q(**{f"{self.key_field}__{lookup}": value})
+            | Q(**{self.key_field: value, f"pk__{lookup}": pk})
+        )
+
+    def get_key_value(self, instance: Model) -> Any:
+        value = instance
+        for attribute in self.key_field.split("__"):
+            value = getattr(value, attribute)
+        return value
+
+    # ------------------------------------------------------------------
+    # Cursor encoding
+    # ------------------------------------------------------------------
+
+    def build_link(self, instance: Model, reverse: bool) -> str:
+        payload = {"pk": instance.pk, "reverse": reverse}
+        if self.key_field != "pk":
+            payload["value"] = self.get_key_value(instance)
+        token = base64.urlsafe_b64encode(
+            json.dumps(payload, default=self.encode_value).encode()
+        ).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    @staticmethod
+    def encode_value(value: Any) -> str:
+        # Full precision: DjangoJSONEncoder truncates datetimes to milliseconds,
+        # which would skip or repeat rows sharing a millisecond.
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value)
+
+    def decode_cursor(self, request: Request) -> Optional[Dict[str, Any]]:
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            return {
+                "pk": payload["pk"],
+                "value": payload.get("value"),
+                "reverse": bool(payload.get("reverse", False)),
+            }
+        except (TypeError, ValueError, KeyError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class KeysetPagination(OptInKeysetPagination):
+    """Keyset (cursor) pagination only, for endpoints without page numbers."""
+
+    def is_keyset_requested(self, request: Request) -> bool:
+        return True
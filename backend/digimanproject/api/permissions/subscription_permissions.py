@@ -1,5 +1,6 @@
 from typing import Any
 
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import permissions
 from rest_framework.request import Request
 from rest_framework.views import View
@@ -14,10 +15,9 @@ class PremiumChaptersPermission(permissions.BasePermission):
         """
         Check if the user has access to the premium chapter object or its page object
         """
-        from ..models.user_models import Reader
         from ..models.manga_models import Chapter, Page
         from ..models.subscription_models import SubscriptionFeatureChoices
-        from ..utils.helper_functions import cast_user_to_subclass
+        from ..services.entitlement_service import EntitlementService
 
         # Check if the object is a premium Chapter or a page of a premium chapter
         # Non-premium chapters can be accessed by any user
@@ -28,26 +28,14 @@ class PremiumChaptersPermission(permissions.BasePermission):
         else:
             return False
 
-        if not chapter.is_premium():
+        if not self.is_chapter_premium(chapter):
             return True
         
-        # Check if the user is a premium user 
-        # Only a Reader and higher account can access premium chapters
-        # And an Admin always has access
-        user = request.user
-        if not user or not user.is_authenticated:
-            return False
-        
-        user = cast_user_to_subclass(user)
-        
-        if user.has_admin_access():
-            return True
-        
-        # If this account is not a Reader or higher one, deny access
-        if not isinstance(user, Reader):
-            return False
-        
-        return user.has_subscription_feature_access(SubscriptionFeatureChoices.PREMIUM_CHAPTERS)
+        # Admins always have access; Readers need the premium chapters feature.
+        # Entitlements are cached per user, so this does not query the
+        # subscription tables on every page.
+        return EntitlementService.has_feature(
+            request.user, SubscriptionFeatureChoices.PREMIUM_CHAPTERS, request)
     
     def has_permission(self, request: Request, view: View) -> bool:
         """
@@ -60,8 +48,10 @@ class PremiumChaptersPermission(permissions.BasePermission):
             return True
 
         try:
-            chapter = Chapter.objects.get(id=chapter_id)
-        except Chapter.DoesNotExist:
+            chapter = (Chapter.objects
+                .select_related("manga_title__statistics")
+                .get(id=chapter_id))
+        except (Chapter.DoesNotExist, ValueError, DjangoValidationError):
             return False
         
         # Use the has_object_permission method to check the permission for the chapter
@@ -70,4 +60,13 @@ class PremiumChaptersPermission(permissions.BasePermission):
 
         # If the user has access to the premium chapter, run the parent permission method
         return super().has_permission(request, view)
-        
\ No newline at end of file
+
+    @staticmethod
+    def is_chapter_premium(chapter: Any) -> bool:
+        """Use the stored chapter count of the title when it is loaded"""
+        manga_title = chapter.get_manga_title()
+        if not manga_title.is_premium:
+            return False
+        statistics = getattr(manga_title, "statistics", None)
+        chapter_count = None if statistics is None else statistics.chapter_count
+        return chapter.is_premium(chapter_count)
@@ -1,14 +1,19 @@
-from typing import Optional, List
+from typing import Dict, Optional, List
+import uuid
+from django.db import models
 from rest_framework import serializers
 from ..models.manga_models import MangaTitle, Chapter, Page, Genre, Author, Comment
+from ..models.system_models import FlaggedContent
 from ..services.system_service import FlaggedContentService
+from ..services.manga_service import ChapterNavigation, ChapterService
+from ..utils.helper_functions import prefetch_user_subclasses
 from datetime import datetime
 
 
 class MangaTitleSerializer(serializers.ModelSerializer):
     """Fields for manga title: id, title, alternative_title, author_name, 
-    description, cover_image, publication_status, publication_date,
-    is_visible, first_free_chapter_amount, last_free_chapter_amount,
+    description, cover_image, cover_image_variants, cover_image_metadata,
+    publication_status, publication_date, is_visible, first_free_chapter_amount, last_free_chapter_amount,
     chapter_count, comment_count, latest_chapter_date,
     average_rating, read_count"""
     author_name = serializers.SerializerMethodField()
@@ -27,6 +32,8 @@ class MangaTitleSerializer(serializers.ModelSerializer):
             "author_name", 
             "description", 
             "cover_image", 
+            "cover_image_variants",
+            "cover_image_metadata",
             "publication_status", 
             "publication_date", 
             "is_premium",
@@ -36,31 +43,58 @@ class MangaTitleSerializer(serializers.ModelSerializer):
             "average_rating",
             "read_count",
         ]
+        read_only_fields = ["cover_image_variants", "cover_image_metadata"]
+
+    # The count/date/rating getters read the annotations added by
+    # MangaTitleService.annotate_catalog_statistics and only fall back to
+    # per-object queries when the queryset was not annotated.
 
     def get_author_name(self, obj: MangaTitle) -> str:
         return obj.get_author_name()
 
     def get_chapter_count(self, obj: MangaTitle) -> int:
-        return obj.get_chapter_count()
+        count = getattr(obj, "computed_chapter_count", None)
+        return count if count is not None else obj.get_chapter_count()
 
     def get_comment_count(self, obj: MangaTitle) -> int:
-        return obj.get_comment_count()
+        count = getattr(obj, "computed_comment_count", None)
+        return count if count is not None else obj.get_comment_count()
     
     def get_latest_chapter_date(self, obj: MangaTitle) -> datetime:
+        latest_chapter_date = getattr(obj, "latest_chapter_date", None)
+        if latest_chapter_date is not None:
+            return latest_chapter_date
         return obj.get_latest_chapter_upload_date()
 
     def get_average_rating(self, obj: MangaTitle) -> float:
         from ..services.reader_statistics_service import ReaderStatisticsService
+        if hasattr(obj, "computed_average_rating"):
+            avg = obj.computed_average_rating
+            return round(float(avg), 1) if avg is not None else 0.0
         return ReaderStatisticsService.get_average_rating(obj.id)
 
     def get_read_count(self, obj: MangaTitle) -> int:
         from ..services.reader_statistics_service import ReaderStatisticsService
-        return ReaderStatisticsService.get_read_count(obj.id)
+        count = getattr(obj, "computed_read_count", None)
+        return count if count is not None else ReaderStatisticsService.get_read_count(obj.id)
+
+
+class ChapterListSerializer(serializers.ListSerializer):
+    """Computes the navigation of every chapter in the list in one query
+    before serializing the rows."""
+    def to_representation(self, data):
+        chapters = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.child.navigation = ChapterService.get_navigation(chapters)
+        return super().to_representation(chapters)
 
 
 class ChapterSerializer(serializers.ModelSerializer):
     """Fields for chapter: id, manga_title_id, title, chapter_number, 
-    upload_date, page_count"""
+    upload_date, page_count, previous_chapter_id, next_chapter_id, is_premium.
+    Expects ChapterService.get_chapter_queryset() rows; other rows fall
+    back to per-object queries."""
+    navigation: Optional[Dict[uuid.UUID, ChapterNavigation]] = None
+
     manga_title = serializers.SerializerMethodField()
     page_count = serializers.SerializerMethodField()
     previous_chapter_id = serializers.SerializerMethodField()
@@ -81,27 +115,33 @@ class ChapterSerializer(serializers.ModelSerializer):
             "next_chapter_id",
             "is_premium",
         ]
+        list_serializer_class = ChapterListSerializer
+
+    def get_chapter_navigation(self, obj: Chapter) -> ChapterNavigation:
+        if self.navigation is None or obj.id not in self.navigation:
+            self.navigation = ChapterService.get_navigation([obj])
+        return self.navigation[obj.id]
 
     def get_manga_title(self, obj: Chapter) -> str:
         return obj.get_manga_title_title()
 
     def get_page_count(self, obj: Chapter) -> int:
-        return obj.get_page_count()
+        page_count = getattr(obj, "computed_page_count", None)
+        return obj.get_page_count() if page_count is None else page_count
     
-    def get_previous_chapter_id(self, obj: Chapter) -> Optional[str]:
-        prev = obj.get_previous_chapter()
-        return None if prev is None else prev.id
+    def get_previous_chapter_id(self, obj: Chapter) -> Optional[uuid.UUID]:
+        return self.get_chapter_navigation(obj).previous_chapter_id
     
-    def get_next_chapter_id(self, obj: Chapter) -> Optional[str]:
-        next = obj.get_next_chapter()
-        return None if next is None else next.id
+    def get_next_chapter_id(self, obj: Chapter) -> Optional[uuid.UUID]:
+        return self.get_chapter_navigation(obj).next_chapter_id
     
     def get_is_premium(self, obj: Chapter) -> bool:
-        return obj.is_premium()
+        return obj.is_premium(self.get_chapter_navigation(obj).title_chapter_count)
 
 
 class PageSerializer(serializers.ModelSerializer):
-    """Fields for page: id, chapter_id, page_number, image_url"""
+    """Fields for page: id, chapter_id, page_number, image_url, image_variants,
+    image_metadata"""
     class Meta:
         model = Page
         fields = [
@@ -109,7 +149,10 @@ class PageSerializer(serializers.ModelSerializer):
             "chapter_id", 
             "page_number", 
             "image_url",
+            "image_variants",
+            "image_metadata",
         ]
+        read_only_fields = ["image_variants", "image_metadata"]
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -126,6 +169,18 @@ class AuthorSerializer(serializers.ModelSerializer):
         fields = ["id", "name"]
         
 
+class CommentListSerializer(serializers.ListSerializer):
+    """Resolves the owners and flag reasons of all comments in bulk before
+    serializing them."""
+    def to_representation(self, data):
+        comments = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        prefetch_user_subclasses(comments, "owner")
+        FlaggedContentService.prefetch_flagged_reasons(
+            (comment for comment in comments if not comment.get_hidden_reasons()),
+            lambda comment: FlaggedContent.TargetObjectTypeChoices.COMMENT.value)
+        return super().to_representation(comments)
+
+
 class CommentSerializer(serializers.ModelSerializer):
     """
     Fields for comment: id, owner_id, manga_title_id, chapter_id,
@@ -177,6 +232,7 @@ class CommentSerializer(serializers.ModelSerializer):
             "chapter",
             "parent_comment",
         ]
+        list_serializer_class = CommentListSerializer
     
     def get_owner_name(self, obj: Comment) -> str:
         return obj.get_owner_name()
@@ -220,5 +276,5 @@ class CommentSerializer(serializers.ModelSerializer):
     def get_hidden_reasons(self, obj: Comment) -> List[str]:
         if obj.get_hidden_reasons():
             return [obj.get_hidden_reasons()]
-        return FlaggedContentService.get_flagged_reasons_by_target_object(
-            "comment", obj.id)
+        return FlaggedContentService.get_flagged_reasons(
+            obj, FlaggedContent.TargetObjectTypeChoices.COMMENT.value)
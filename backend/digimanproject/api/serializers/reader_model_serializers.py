@@ -11,6 +11,7 @@ class ReadingProgressSerializer(serializers.ModelSerializer):
     manga_title_cover = serializers.SerializerMethodField()
     chapter_number = serializers.SerializerMethodField()
     chapter_title = serializers.SerializerMethodField()
+    scroll_fraction = serializers.FloatField(read_only=True)
 
     class Meta:
         model = ReadingProgress
@@ -19,6 +20,8 @@ class ReadingProgressSerializer(serializers.ModelSerializer):
             "reader_id",
             "chapter_id",
             "last_read_timestamp",
+            "page_number",
+            "scroll_fraction",
             "manga_title_id",
             "manga_title_title",
             "manga_title_cover",
@@ -48,6 +51,38 @@ class ReadingProgressSerializer(serializers.ModelSerializer):
         return obj.chapter.get_title() if obj.chapter else None
 
 
+class ReadingHistorySerializer(ReadingProgressSerializer):
+    """ReadingProgressSerializer plus the continue-reading fields annotated
+    by ReaderStatisticsService.get_reading_history."""
+    next_unread_chapter_id = serializers.UUIDField(read_only=True)
+    latest_chapter_id = serializers.UUIDField(read_only=True)
+    latest_chapter_number = serializers.IntegerField(read_only=True)
+
+    class Meta(ReadingProgressSerializer.Meta):
+        fields = [
+            *ReadingProgressSerializer.Meta.fields,
+            "next_unread_chapter_id",
+            "latest_chapter_id",
+            "latest_chapter_number",
+        ]
+
+
+class ReadingPositionSerializer(serializers.Serializer):
+    """One position update of the reader; updated_at is the client time of
+    the update (updates queued offline keep their own time)."""
+    chapter_id = serializers.UUIDField()
+    page_number = serializers.IntegerField(min_value=1, max_value=32767)
+    scroll_fraction = serializers.FloatField(min_value=0, max_value=1, default=0)
+    updated_at = serializers.DateTimeField(required=False)
+
+
+class ReadingPositionBatchSerializer(serializers.Serializer):
+    MAX_POSITIONS = 200
+
+    positions = ReadingPositionSerializer(
+        many=True, allow_empty=False, max_length=MAX_POSITIONS)
+
+
 class MangaReaderStatisticsSerializer(serializers.ModelSerializer):
     average_rating = serializers.SerializerMethodField()
     read_count = serializers.SerializerMethodField()
@@ -1,9 +1,22 @@
 from typing import List
 
+from django.db import models
 from rest_framework import serializers
 from ..models.user_models import User, Reader, Administrator
 from ..services.system_service import FlaggedContentService
 
+class UserListSerializer(serializers.ListSerializer):
+    """Loads the flag reasons of all users in bulk before serializing them."""
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        FlaggedContentService.prefetch_flagged_reasons(users, get_flag_target_type)
+        return super().to_representation(users)
+
+
+def get_flag_target_type(user: User) -> str:
+    return user.__class__.__name__.lower()
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Fields for user: id, username, email, role, status, created_at, password, 
     moderation_status, last_moderated_at"""
@@ -28,11 +41,11 @@ class UserSerializer(serializers.ModelSerializer):
             "flagged_reasons",
             "last_moderated_at",
         ]
+        list_serializer_class = UserListSerializer
     
     def get_flagged_reasons(self, obj) -> List[str]:
         try:
-            return FlaggedContentService.get_flagged_reasons_by_target_object(
-                obj.__class__.__name__.lower(), obj.id)
+            return FlaggedContentService.get_flagged_reasons(obj, get_flag_target_type(obj))
         except Exception as e:
             print(str(e))
             return []
@@ -40,18 +53,22 @@ class UserSerializer(serializers.ModelSerializer):
 
 class ReaderSerializer(UserSerializer):
     """Fields for reader: id, username, email, role, status, created_at, password, 
-    moderation_status, last_moderated_at, display_name, avatar"""
+    moderation_status, last_moderated_at, display_name, avatar, avatar_variants"""
 
     class Meta:
         model = Reader
         fields = UserSerializer.Meta.fields + [
-            "display_name", "avatar",
+            "display_name", "avatar", "avatar_variants",
         ]
+        read_only_fields = ["avatar_variants"]
+        list_serializer_class = UserListSerializer
 
 
 class AdministratorSerializer(ReaderSerializer):
     """Fields for administrator: id, username, email, role, status, created_at, password, 
-    moderation_status, last_moderated_at, display_name, avatar, avatar_upload"""
+    moderation_status, last_moderated_at, display_name, avatar, avatar_variants, avatar_upload"""
     class Meta:
         model = Administrator
         fields = ReaderSerializer.Meta.fields
+        read_only_fields = ReaderSerializer.Meta.read_only_fields
+        list_serializer_class = UserListSerializer
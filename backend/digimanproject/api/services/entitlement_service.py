@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import logging
+import uuid
+from typing import Any, Dict, NamedTuple, Optional
+
+from django.core.cache import cache
+
+from ..models.subscription_models import ReaderSubscription, SubscriptionFeatureChoices
+from ..models.user_models import User
+
+logger = logging.getLogger(__name__)
+
+
+class Entitlements(NamedTuple):
+    premium_chapters: bool = False
+    offline_reading: bool = False
+    admin: bool = False
+
+    def has_feature(self, feature: str) -> bool:
+        """Admins have every subscription feature."""
+        return self.admin or bool(getattr(self, feature, False))
+
+    def to_dict(self) -> Dict[str, bool]:
+        return self._asdict()
+
+
+NO_ENTITLEMENTS = Entitlements()
+
+
+class EntitlementService:
+    """Resolves what a user may access (premium chapters, offline reading,
+    admin) from their role and ReaderSubscription.
+
+    The result is memoized on the request and cached per user, so reading
+    a premium chapter page by page does not query the subscription tables.
+    Cached entries are invalidated when the user's ReaderSubscription or
+    role changes (see entitlement_signals) and when any SubscriptionPlan
+    changes (plan version bump); they also expire after CACHE_SECONDS.
+    """
+
+    CACHE_SECONDS = 10 * 60
+    KEY_PREFIX = "entitlements"
+    REQUEST_ATTRIBUTE = "_entitlements"
+
+    @staticmethod
+    def _plan_version_key() -> str:
+        return f"{EntitlementService.KEY_PREFIX}:plan_version"
+
+    @staticmethod
+    def _user_key(user_id: uuid.UUID, plan_version: int) -> str:
+        return f"{EntitlementService.KEY_PREFIX}:v{plan_version}:{user_id}"
+
+    @staticmethod
+    def resolve(user: User) -> Entitlements:
+        """Compute the entitlements from the database (one query)."""
+        subscription: Optional[ReaderSubscription] = (
+            ReaderSubscription.objects
+            .select_related("subscription_plan")
+            .filter(reader_id=user.id)
+            .first()
+        )
+        is_active = subscription is not None and subscription.is_active()
+        return Entitlements(
+            premium_chapters=is_active and subscription.has_access(
+                SubscriptionFeatureChoices.PREMIUM_CHAPTERS),
+            offline_reading=is_active and subscription.has_access(
+                SubscriptionFeatureChoices.OFFLINE_READING),
+            admin=user.has_admin_access(),
+        )
+
+    @staticmethod
+    def get_entitlements(user: Any, request: Any = None) -> Entitlements:
+        """Entitlements of the user; anonymous users have none."""
+        if not user or not isinstance(user, User) or not user.is_authenticated:
+            return NO_ENTITLEMENTS
+
+        # Memoize on the underlying HttpRequest, shared by DRF Request wrappers
+        http_request = getattr(request, "_request", request)
+        memo = getattr(http_request, EntitlementService.REQUEST_ATTRIBUTE, None)
+        if memo is not None and memo[0] == user.id:
+            return memo[1]
+
+        entitlements = EntitlementService._get_cached(user)
+        if http_request is not None:
+            setattr(http_request, EntitlementService.REQUEST_ATTRIBUTE, (user.id, entitlements))
+        return entitlements
+
+    @staticmethod
+    def _get_cached(user: User) -> Entitlements:
+        try:
+            plan_version = cache.get(EntitlementService._plan_version_key(), 0)
+            key = EntitlementService._user_key(user.id, plan_version)
+            cached = cache.get(key)
+        except Exception:
+            logger.exception("Entitlement cache unavailable (user_id=%s)", user.id)
+            return EntitlementService.resolve(user)
+
+        if cached is not None:
+            return Entitlements(**cached)
+
+        entitlements = EntitlementService.resolve(user)
+        try:
+            cache.set(key, entitlements.to_dict(), EntitlementService.CACHE_SECONDS)
+        except Exception:
+            logger.exception("Entitlement cache write failed (user_id=%s)", user.id)
+        return entitlements
+
+    @staticmethod
+    def has_feature(user: Any, feature: str, request: Any = None) -> bool:
+        return EntitlementService.get_entitlements(user, request).has_feature(feature)
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def invalidate(user_id: uuid.UUID) -> None:
+        try:
+            plan_version = cache.get(EntitlementService._plan_version_key(), 0)
+            cache.delete(EntitlementService._user_key(user_id, plan_version))
+        except Exception:
+            logger.exception("Entitlement invalidation failed (user_id=%s)", user_id)
+
+    @staticmethod
+    def invalidate_all() -> None:
+        """Drop every cached entitlement (a plan's features changed)."""
+        key = EntitlementService._plan_version_key()
+        try:
+            cache.add(key, 0, None)
+            cache.incr(key)
+        except Exception:
+            logger.exception("Entitlement invalidation failed (all users)")
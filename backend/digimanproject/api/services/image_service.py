@@ -1,52 +1,494 @@
+import base64
+import hashlib
+import io
+import posixpath
+import re
 import uuid
-from typing import BinaryIO
-from ..utils.supabase_client import supabase
+from collections import Counter
+from typing import Any, BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Model
+from PIL import Image, ImageOps
+from ..models.system_models import StoredImage
+from ..storage_backends import get_storage_backend
+from .outbox_service import OutboxService
+
+
+class PreparedImage(NamedTuple):
+    content_hash: str
+    size: int
+    content_type: str
+
 
 class ImageService:
-    """Handles image uploads to Supabase Storage."""
+    """Handles image uploads to the storage backend (see storage_backends).
+
+    Images are content-addressed: an upload is stored as
+    <sha256 of its bytes>.<ext> and recorded as a StoredImage, so uploading
+    identical content again only adds a reference to the existing object.
+    The object is deleted (through the outbox) with its last reference.
+    """
+
+    HASH_CHUNK_SIZE = 64 * 1024
+    # <content hash>.<ext> for originals, <content hash>_<variant>.webp for variants
+    CONTENT_PATH_PATTERN = re.compile(r"^([0-9a-f]{64})[._]")
+
+    # Sniffed content types: (magic bytes offset, magic bytes, extension)
+    IMAGE_SIGNATURES: Dict[str, Tuple[Tuple[int, bytes], ...]] = {
+        "image/jpeg": ((0, b"\xff\xd8\xff"),),
+        "image/png": ((0, b"\x89PNG\r\n\x1a\n"),),
+        "image/gif": ((0, b"GIF87a"), (0, b"GIF89a")),
+        "image/webp": ((0, b"RIFF"), (8, b"WEBP")),
+        "image/avif": ((4, b"ftypavi"),),
+    }
+    EXTENSIONS: Dict[str, str] = {
+        "image/jpeg": "jpg",
+        "image/png": "png",
+        "image/gif": "gif",
+        "image/webp": "webp",
+        "image/avif": "avif",
+    }
     
+    @staticmethod
+    def validate_image(file: BinaryIO) -> Tuple[int, str]:
+        """
+        Check the size and the type (from the first bytes) of an upload
+        without reading its body. Returns (size, content type).
+        """
+        size = ImageService.get_size(file)
+        max_size = settings.IMAGE_UPLOAD_MAX_BYTES
+        if size > max_size:
+            raise ValueError(
+                f"Image is too large ({size} bytes, at most {max_size} bytes allowed).")
+        if size == 0:
+            raise ValueError("Image is empty.")
+
+        file.seek(0)
+        header = file.read(16)
+        file.seek(0)
+        for content_type, signatures in ImageService.IMAGE_SIGNATURES.items():
+            if all(header[offset:offset + len(magic)] == magic for offset, magic in signatures):
+                return size, content_type
+        raise ValueError("Unsupported image type (allowed: JPEG, PNG, GIF, WebP, AVIF).")
+
+    @staticmethod
+    def get_size(file: BinaryIO) -> int:
+        size = getattr(file, "size", None)
+        if size is None:
+            size = file.seek(0, io.SEEK_END)
+            file.seek(0)
+        return size
+
+    @staticmethod
+    def get_content_hash(file: BinaryIO) -> str:
+        """SHA-256 of the file content, read in chunks."""
+        digest = hashlib.sha256()
+        file.seek(0)
+        while chunk := file.read(ImageService.HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        file.seek(0)
+        return digest.hexdigest()
+
+    @staticmethod
+    def prepare_image(file: BinaryIO) -> PreparedImage:
+        """Validate an upload and hash its content (see validate_image)."""
+        size, content_type = ImageService.validate_image(file)
+        return PreparedImage(ImageService.get_content_hash(file), size, content_type)
+
+    @staticmethod
+    def get_object_name(image: PreparedImage) -> str:
+        return f"{image.content_hash}.{ImageService.EXTENSIONS[image.content_type]}"
+
     @staticmethod
     def upload_image(file: BinaryIO, bucket: str) -> str:
         """
-        Upload an image to a given Supabase bucket and return the public URL.
+        Upload an image to a given bucket and return the public URL.
+
+        If the bucket already holds the same content, its URL is returned
+        and no upload happens. Otherwise the upload is streamed by the
+        storage backend (the Supabase backend uses chunked resumable uploads
+        for files of RESUMABLE_UPLOAD_THRESHOLD bytes or more), so a worker
+        never holds the whole image in memory.
+        Raises ValueError if the image is too large or not a supported type.
         """
-        file_name: str | None = None
+        image = ImageService.prepare_image(file)
+        public_url = ImageService.add_references(bucket, {image.content_hash: 1}).get(
+            image.content_hash)
+        if public_url:
+            return public_url
+
         try:
-            file_ext: str = file.name.split('.')[-1]
-            file_name: str = f"{uuid.uuid4()}.{file_ext}"
-            file_bytes: bytes = file.read()
+            public_url = ImageService.store_object(file, bucket, image)
+        except Exception:
+            # Rollback: attempt to delete the file if it was uploaded
+            ImageService.discard_objects(bucket, [image])
+            raise
+        return ImageService.record_image(bucket, image, public_url)
 
-            response: dict = supabase.storage.from_(bucket).upload(file_name, file_bytes)
-            # Check if the upload was successful
-            if hasattr(response, "error") and response.error:
-                raise Exception(response["error"]["message"])
+    @staticmethod
+    def store_object(file: BinaryIO, bucket: str, image: PreparedImage) -> str:
+        """
+        Upload prepared content to storage and return its public URL.
+        Does not touch the database, so it can run in worker threads.
+        """
+        storage = get_storage_backend()
+        file_name = ImageService.get_object_name(image)
+        try:
+            # The path is derived from the content, so overwriting is harmless
+            storage.upload(bucket, file_name, file, image.size, image.content_type, upsert=True)
 
-            public_url: str = supabase.storage.from_(bucket).get_public_url(file_name)
+            public_url: str = storage.get_public_url(bucket, file_name)
             # Verify the public URL (optional, depending on your requirements)
             if not public_url:
                 raise RuntimeError("Failed to retrieve the public URL of the uploaded file.")
             return public_url
-
         except Exception as e:
-            # Rollback: Attempt to delete the file if it was uploaded
-            try:
-                if file_name:
-                    supabase.storage.from_(bucket).remove([file_name])
-            except Exception as rollback_error:
-                # Log the rollback error (optional)
-                print(f"Rollback failed: {rollback_error}")
             raise RuntimeError(f"Failed to upload image to bucket '{bucket}': {str(e)}")
 
+    @staticmethod
+    def record_image(
+        bucket: str, image: PreparedImage, public_url: str, reference_count: int = 1
+    ) -> str:
+        """Record stored content with its first references; returns its URL."""
+        try:
+            with transaction.atomic():
+                StoredImage.objects.create(
+                    bucket=bucket,
+                    content_hash=image.content_hash,
+                    object_path=ImageService.get_object_name(image),
+                    public_url=public_url,
+                    content_type=image.content_type,
+                    size=image.size,
+                    reference_count=reference_count,
+                )
+        except IntegrityError:
+            # The same content was recorded by a concurrent upload
+            return ImageService.add_references(
+                bucket, {image.content_hash: reference_count}
+            ).get(image.content_hash, public_url)
+        return public_url
+
+    @staticmethod
+    def add_references(bucket: str, counts: Dict[str, int]) -> Dict[str, str]:
+        """
+        Add references ({content hash: count}) to content the bucket already
+        holds. Returns the public URLs of the content found, by hash.
+        """
+        stored = dict(
+            StoredImage.objects
+            .filter(bucket=bucket, content_hash__in=counts.keys())
+            .values_list("content_hash", "public_url")
+        )
+        public_urls = {}
+        for content_hash, public_url in stored.items():
+            # Skipped if its last reference was deleted meanwhile
+            if StoredImage.objects.filter(bucket=bucket, content_hash=content_hash).update(
+                reference_count=F("reference_count") + counts[content_hash]
+            ):
+                public_urls[content_hash] = public_url
+        return public_urls
+
+    @staticmethod
+    def discard_objects(bucket: str, images: Iterable[PreparedImage]) -> None:
+        """Delete stored content that was never recorded (failed uploads),
+        unless a concurrent upload recorded it meanwhile."""
+        hashes = {image.content_hash: image for image in images}
+        recorded = set(
+            StoredImage.objects
+            .filter(bucket=bucket, content_hash__in=hashes.keys())
+            .values_list("content_hash", flat=True)
+        )
+        paths = [
+            ImageService.get_object_name(image)
+            for content_hash, image in hashes.items() if content_hash not in recorded
+        ]
+        try:
+            if paths:
+                get_storage_backend().delete_many(bucket, paths)
+        except Exception as rollback_error:
+            # Log the rollback error (optional)
+            print(f"Rollback failed: {rollback_error}")
+
     @staticmethod
     def delete_image(file_path: str, bucket: str) -> None:
         """
-        Delete an image from a given Supabase bucket.
-        Returns True if deletion succeeded.
+        Delete an image from a given bucket, by path or public URL.
+        Shared content is only removed with its last reference.
         """
-        response: dict = supabase.storage.from_(bucket).remove([file_path])
-        if hasattr(response, "error") and response.error:
-            raise RuntimeError(response["error"]["message"])
-    
+        ImageService.delete_images([file_path], bucket)
+
+    @staticmethod
+    def delete_images(file_paths: Iterable[str], bucket: str) -> None:
+        """
+        Drop one reference per path or public URL. Objects left without
+        references, and objects without a StoredImage record (uploaded
+        before deduplication), are deleted through the outbox once the
+        current transaction commits.
+        """
+        storage = get_storage_backend()
+        counts = Counter(
+            storage.get_object_path(file_path, bucket) or file_path
+            for file_path in file_paths
+        )
+        if not counts:
+            return
+
+        unreferenced = []
+        with transaction.atomic():
+            images = {
+                image.object_path: image
+                for image in StoredImage.objects.select_for_update().filter(
+                    bucket=bucket, object_path__in=counts.keys())
+            }
+            for path, count in counts.items():
+                image = images.get(path)
+                if image is not None:
+                    # Unreferenced records stay until the object is purged,
+                    # so an identical upload meanwhile can take them back
+                    StoredImage.objects.filter(pk=image.pk).update(
+                        reference_count=max(image.reference_count - count, 0))
+                    if image.reference_count > count:
+                        continue
+                unreferenced.append(path)
+            OutboxService.delete_storage_objects(bucket, unreferenced)
+
+    @staticmethod
+    def get_path_content_hash(path: str) -> Optional[str]:
+        """Content hash of an original or variant object path, if any."""
+        match = ImageService.CONTENT_PATH_PATTERN.match(posixpath.basename(path))
+        return match.group(1) if match else None
+
+    @staticmethod
+    def purge_objects(bucket: str, paths: List[str]) -> None:
+        """
+        Delete objects queued for deletion (called by the outbox worker).
+        Content referenced again since then is kept, with its variants.
+        """
+        hashes = {ImageService.get_path_content_hash(path) for path in paths} - {None}
+        with transaction.atomic():
+            images = list(
+                StoredImage.objects.select_for_update()
+                .filter(bucket=bucket, content_hash__in=hashes)
+            )
+            referenced = {
+                image.content_hash for image in images if image.reference_count > 0
+            }
+            StoredImage.objects.filter(
+                id__in=[image.id for image in images if image.reference_count == 0]
+            ).delete()
+
+            paths = [
+                path for path in paths
+                if ImageService.get_path_content_hash(path) not in referenced
+            ]
+            # The records are locked until the objects are gone
+            if paths:
+                get_storage_backend().delete_many(bucket, paths)
+
+    @staticmethod
+    def get_moderation_scores(image_url: str) -> Optional[Dict[str, float]]:
+        """Moderation scores already computed for the same content, if any."""
+        return (
+            StoredImage.objects
+            .filter(public_url=image_url, moderation_scores__isnull=False)
+            .values_list("moderation_scores", flat=True)
+            .first()
+        )
+
+    @staticmethod
+    def save_moderation_scores(image_url: str, scores: Dict[str, float]) -> None:
+        StoredImage.objects.filter(public_url=image_url).update(moderation_scores=scores)
+
+
+class ImageVariantTargets:
+    PAGE = "page"
+    MANGA_COVER = "manga_cover"
+    AVATAR = "avatar"
+
+
+class ImageVariantService:
+    """Generates resized WebP variants and layout metadata of uploaded images.
+
+    Variants are stored next to the original in the same bucket
+    (<name>_<variant>.webp) and recorded on the model as a
+    {variant: public_url} mapping, so clients can pick the smallest image
+    that fits (e.g. thumbnails in catalog grids). Pages and covers also get
+    their dimensions, byte size, MIME type and a tiny blurred placeholder,
+    so readers can lay out a chapter before its images arrive.
+    """
+
+    # Target widths in pixels; images are never upscaled
+    PAGE_WIDTHS: Dict[str, int] = {"thumbnail": 240, "mobile": 720, "desktop": 1280}
+    COVER_WIDTHS: Dict[str, int] = {"thumbnail": 240, "mobile": 480, "desktop": 960}
+    AVATAR_WIDTHS: Dict[str, int] = {"thumbnail": 64, "mobile": 128, "desktop": 256}
+
+    WEBP_QUALITY = 80
+    CONTENT_TYPE = "image/webp"
+    PLACEHOLDER_WIDTH = 16
+    PLACEHOLDER_QUALITY = 40
+
+    @staticmethod
+    def get_object_path(public_url: str, bucket: str) -> Optional[str]:
+        """Storage path of a public URL of the bucket, or None."""
+        return get_storage_backend().get_object_path(public_url, bucket)
+
+    @staticmethod
+    def prepare_image(source: Image.Image) -> Image.Image:
+        """Apply the EXIF orientation and convert to a mode WebP can encode."""
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        return image
+
+    @staticmethod
+    def resize_to_width(image: Image.Image, width: int) -> Image.Image:
+        if image.width <= width:
+            return image
+        height = max(1, round(image.height * width / image.width))
+        return image.resize((width, height), Image.Resampling.LANCZOS)
+
+    @staticmethod
+    def encode_webp(image: Image.Image, quality: int) -> bytes:
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=quality, method=6)
+        return buffer.getvalue()
+
+    @staticmethod
+    def build_variants(image_bytes: bytes, widths: Dict[str, int]) -> Dict[str, bytes]:
+        """Resize the image to each width and encode it as WebP."""
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            return ImageVariantService.encode_variants(
+                ImageVariantService.prepare_image(source), widths)
+
+    @staticmethod
+    def encode_variants(image: Image.Image, widths: Dict[str, int]) -> Dict[str, bytes]:
+        return {
+            name: ImageVariantService.encode_webp(
+                ImageVariantService.resize_to_width(image, width),
+                ImageVariantService.WEBP_QUALITY)
+            for name, width in widths.items()
+        }
+
+    @staticmethod
+    def build_metadata(image: Image.Image, byte_size: int, mime_type: str) -> Dict[str, Any]:
+        """
+        Displayed dimensions (after EXIF orientation), byte size, MIME type
+        and a placeholder: a PLACEHOLDER_WIDTH pixels wide WebP data URI
+        (a few hundred bytes) to show blurred while the image loads.
+        """
+        placeholder = ImageVariantService.encode_webp(
+            ImageVariantService.resize_to_width(image, ImageVariantService.PLACEHOLDER_WIDTH),
+            ImageVariantService.PLACEHOLDER_QUALITY)
+        return {
+            "width": image.width,
+            "height": image.height,
+            "bytes": byte_size,
+            "mime_type": mime_type,
+            "placeholder": (
+                f"data:{ImageVariantService.CONTENT_TYPE};base64,"
+                f"{base64.b64encode(placeholder).decode()}"
+            ),
+        }
+
+    @staticmethod
+    def generate_variants(
+        public_url: str, bucket: str, widths: Dict[str, int]
+    ) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """
+        Download the original image, upload its WebP variants next to it
+        and return their public URLs by variant name, with the metadata
+        of the original (decoded once for both).
+        """
+        path = ImageVariantService.get_object_path(public_url, bucket)
+        if path is None:
+            raise ValueError(f"'{public_url}' is not an object of bucket '{bucket}'")
+
+        storage = get_storage_backend()
+        original: bytes = storage.download(bucket, path)
+        stem = path.rsplit(".", 1)[0]
+
+        with Image.open(io.BytesIO(original)) as source:
+            mime_type = source.get_format_mimetype() or "application/octet-stream"
+            image = ImageVariantService.prepare_image(source)
+            metadata = ImageVariantService.build_metadata(image, len(original), mime_type)
+            variants = ImageVariantService.encode_variants(image, widths)
+
+        variant_urls = {}
+        for name, content in variants.items():
+            variant_path = f"{stem}_{name}.webp"
+            storage.upload(
+                bucket, variant_path, io.BytesIO(content), len(content),
+                ImageVariantService.CONTENT_TYPE, upsert=True)
+            variant_urls[name] = storage.get_public_url(bucket, variant_path)
+        return variant_urls, metadata
+
+    @staticmethod
+    def get_target(
+        target: str,
+    ) -> Tuple[type[Model], str, str, Optional[str], str, Dict[str, int]]:
+        """(model, source field, variants field, metadata field or None,
+        bucket, widths) of a target."""
+        from ..models.manga_models import MangaTitle, Page
+        from ..models.user_models import Reader
+
+        targets = {
+            ImageVariantTargets.PAGE: (
+                Page, "image_url", "image_variants", "image_metadata",
+                BucketNames.MANGA_CONTENT, ImageVariantService.PAGE_WIDTHS),
+            ImageVariantTargets.MANGA_COVER: (
+                MangaTitle, "cover_image", "cover_image_variants", "cover_image_metadata",
+                BucketNames.MANGA_CONTENT, ImageVariantService.COVER_WIDTHS),
+            ImageVariantTargets.AVATAR: (
+                Reader, "avatar", "avatar_variants", None,
+                BucketNames.USER_AVATARS, ImageVariantService.AVATAR_WIDTHS),
+        }
+        if target not in targets:
+            raise ValueError(f"Invalid image variant target: {target}")
+        return targets[target]
+
+    @staticmethod
+    def refresh_variants(target: str, object_id: uuid.UUID) -> Optional[Dict[str, str]]:
+        """
+        Generate and record the variants (and metadata) of an object's
+        current image. They are only saved if the image was not replaced
+        meanwhile. Returns the recorded variants, or None if nothing was
+        recorded.
+        """
+        model, source_field, variants_field, metadata_field, bucket, widths = (
+            ImageVariantService.get_target(target))
+        source_url = (
+            model.objects.filter(pk=object_id)
+            .values_list(source_field, flat=True)
+            .first()
+        )
+        if not source_url:
+            return None
+
+        variants, metadata = ImageVariantService.generate_variants(source_url, bucket, widths)
+        values = {variants_field: variants}
+        if metadata_field:
+            values[metadata_field] = metadata
+        # Queryset update: no save signals, log entries or moderation
+        updated = model.objects.filter(
+            pk=object_id, **{source_field: source_url}
+        ).update(**values)
+        if not updated:
+            ImageVariantService.delete_variants(variants, bucket)
+            return None
+        return variants
+
+    @staticmethod
+    def delete_variants(variants: Optional[Dict[str, str]], bucket: str) -> None:
+        """Delete stored variants after commit (see OutboxService)."""
+        OutboxService.delete_storage_objects(bucket, [
+            path for path in (
+                ImageVariantService.get_object_path(url, bucket)
+                for url in (variants or {}).values()
+            ) if path
+        ])
+
+
 class BucketNames:
     USER_AVATARS = "user-avatars"
     COMMENT_IMAGES = "comment-images"
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import re
+import uuid
+from typing import Iterable, Optional
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import Expression, F, FloatField, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Cast, Coalesce, Greatest
+
+from ..models.manga_models import Author, MangaTitle
+
+SEARCH_CONFIG = "simple"
+
+
+class MangaTitleSearchService:
+    """Full-text and trigram search over the manga catalog.
+
+    MangaTitle.search_vector holds a weighted tsvector of the title and
+    alternative title (A), author and genre names (B) and description (C).
+    It is refreshed by the manga signals and can be rebuilt with the
+    rebuild_manga_title_search_vectors management command.
+
+    The tsvector and trigram indexes are PostgreSQL features; on other
+    databases the vectors are not maintained and search falls back to
+    the icontains SearchFilter.
+    """
+
+    RELEVANCE_ANNOTATION = "search_relevance"
+
+    @staticmethod
+    def is_supported() -> bool:
+        return connection.vendor == "postgresql"
+
+    # ------------------------------------------------------------------
+    # Search vector maintenance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def search_vector_expression() -> Expression:
+        """A tsvector built from the title row, computed in a single UPDATE
+        (related names come from correlated subqueries, not joins)."""
+        author_name = Subquery(
+            Author.objects.filter(pk=OuterRef("author_id")).values("name")[:1]
+        )
+        genre_names = Subquery(
+            MangaTitle.genres.through.objects
+            .filter(mangatitle_id=OuterRef("pk"))
+            .order_by()
+            .values("mangatitle_id")
+            .annotate(names=StringAgg("genre__name", delimiter=" "))
+            .values("names")
+        )
+        return (
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("alternative_title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector(author_name, weight="B", config=SEARCH_CONFIG)
+            + SearchVector(genre_names, weight="B", config=SEARCH_CONFIG)
+            + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+        )
+
+    @staticmethod
+    def update_search_vectors(
+        manga_title_ids: Optional[Iterable[uuid.UUID]] = None
+    ) -> int:
+        """Refresh the search vector of the given titles (all by default).
+        Returns the number of updated rows."""
+        if not MangaTitleSearchService.is_supported():
+            return 0
+        queryset = MangaTitle.objects.all()
+        if manga_title_ids is not None:
+            manga_title_ids = list(manga_title_ids)
+            if not manga_title_ids:
+                return 0
+            queryset = queryset.filter(id__in=manga_title_ids)
+        return queryset.update(
+            search_vector=MangaTitleSearchService.search_vector_expression())
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build_query(terms: str) -> Optional[SearchQuery]:
+        """Prefix query (every word must start a lexeme), so partially
+        typed words match while the reader is still typing."""
+        words = re.findall(r"\w+", terms.lower())
+        if not words:
+            return None
+        return SearchQuery(
+            " & ".join(f"{word}:*" for word in words),
+            search_type="raw",
+            config=SEARCH_CONFIG,
+        )
+
+    @staticmethod
+    def search(queryset: QuerySet[MangaTitle], terms: str) -> QuerySet[MangaTitle]:
+        """Filter titles matching the terms, either through the tsvector
+        or by trigram similarity (typo tolerance), annotated with
+        search_relevance. Both conditions are served by GIN indexes.
+
+        ts_rank and similarity are real (float4); the sum is cast to double
+        precision so a relevance value read back from a keyset cursor
+        compares equal to the row it came from."""
+        query = MangaTitleSearchService.build_query(terms)
+        if query is None:
+            return queryset
+        return queryset.filter(
+            Q(search_vector=query)
+            | Q(title__trigram_similar=terms)
+            | Q(alternative_title__trigram_similar=terms)
+        ).annotate(**{
+            MangaTitleSearchService.RELEVANCE_ANNOTATION: Cast(
+                Coalesce(SearchRank(F("search_vector"), query), 0.0)
+                + Greatest(
+                    TrigramSimilarity("title", terms),
+                    Coalesce(TrigramSimilarity("alternative_title", terms), 0.0),
+                ),
+                FloatField(),
+            ),
+        })
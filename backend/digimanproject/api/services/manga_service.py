@@ -1,10 +1,16 @@
-from django.db import transaction
-from ..models.manga_models import MangaTitle, Page, Comment
+import uuid
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery, Window
+from django.db.models.functions import Coalesce, Lag, Lead
+from ..models.manga_models import MangaTitle, Chapter, Page, Comment
 from ..models.user_models import User
 from ..models.common_choice_classes import ModerationStatusChoices
-from ..services.image_service import ImageService, BucketNames
+from ..services.image_service import (
+    ImageService, ImageVariantService, ImageVariantTargets, BucketNames)
 from ..services.system_service import LogEntryService
-from ..tasks import enqueue_moderation_task
+from ..tasks import enqueue_moderation_task, enqueue_image_variants_task
 
 class MangaTitleService:
     @staticmethod
@@ -30,6 +36,11 @@ class MangaTitleService:
             for genre in genres:
                 manga.add_genre(genre)
 
+        # Generate resized cover variants after transaction
+        if cover_image_url:
+            transaction.on_commit(lambda: enqueue_image_variants_task(
+                ImageVariantTargets.MANGA_COVER, manga.id))
+
         return manga
     
     @staticmethod
@@ -44,11 +55,16 @@ class MangaTitleService:
             # Upload new cover
             new_cover_image_url = ImageService.upload_image(cover_image_file, bucket)
 
-            # Delete old cover if it exists
+            # Delete old cover and its variants if it exists
             if manga_title.cover_image:
                 ImageService.delete_image(manga_title.cover_image, bucket)
+            ImageVariantService.delete_variants(manga_title.cover_image_variants, bucket)
 
             data["cover_image"] = new_cover_image_url
+            data["cover_image_variants"] = {}
+            data["cover_image_metadata"] = {}
+            transaction.on_commit(lambda: enqueue_image_variants_task(
+                ImageVariantTargets.MANGA_COVER, manga_title.id))
 
         # Handle genres
         genres = data.pop("genres")
@@ -67,9 +83,94 @@ class MangaTitleService:
         # Delete cover image if it exists
         if manga.cover_image:
             ImageService.delete_image(manga.cover_image, BucketNames.MANGA_CONTENT)
+        ImageVariantService.delete_variants(
+            manga.cover_image_variants, BucketNames.MANGA_CONTENT)
         manga.delete()
+
+    @staticmethod
+    def annotate_catalog_statistics(queryset: QuerySet[MangaTitle]) -> QuerySet[MangaTitle]:
+        """
+        Annotate manga titles with the values read by MangaTitleSerializer:
+        computed_chapter_count, computed_comment_count, latest_chapter_date,
+        computed_average_rating, computed_read_count.
+
+        The values come from the denormalized MangaTitleStatistics row
+        (one LEFT JOIN), so a catalog page costs a constant number of queries
+        and sorting by them does not aggregate over chapters or statistics.
+        """
+        return queryset.annotate(
+            computed_chapter_count=Coalesce(F("statistics__chapter_count"), 0),
+            computed_comment_count=Coalesce(F("statistics__comment_count"), 0),
+            latest_chapter_date=Coalesce(
+                F("statistics__latest_chapter_date"), F("publication_date")),
+            computed_average_rating=F("statistics__average_rating"),
+            computed_read_count=Coalesce(F("statistics__read_count"), 0),
+        )
+
+    @staticmethod
+    def get_catalog_queryset() -> QuerySet[MangaTitle]:
+        """Visible manga titles annotated for MangaTitleSerializer."""
+        return MangaTitleService.annotate_catalog_statistics(
+            MangaTitle.objects
+            .filter(is_visible=True)
+            .select_related("author")
+            .prefetch_related("genres")
+        )
     
 
+class ChapterNavigation(NamedTuple):
+    previous_chapter_id: Optional[uuid.UUID]
+    next_chapter_id: Optional[uuid.UUID]
+    title_chapter_count: int
+
+
+class ChapterService:
+    @staticmethod
+    def get_chapter_queryset() -> QuerySet[Chapter]:
+        """Chapters with their manga title (and its statistics) joined and
+        the page count annotated (computed_page_count), for ChapterSerializer."""
+        page_counts = (
+            Page.objects.filter(chapter=OuterRef("pk"))
+            .order_by()
+            .values("chapter")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return Chapter.objects.select_related("manga_title__statistics").annotate(
+            computed_page_count=Coalesce(Subquery(page_counts), 0))
+
+    @staticmethod
+    def get_navigation(chapters: Iterable[Chapter]) -> Dict[uuid.UUID, ChapterNavigation]:
+        """Previous/next chapter ids and chapter count of each chapter's
+        title, in one query: LAG/LEAD and COUNT windows over the chapters
+        of the involved titles, ordered by chapter_number."""
+        chapter_ids = set()
+        manga_title_ids = set()
+        for chapter in chapters:
+            chapter_ids.add(chapter.id)
+            manga_title_ids.add(chapter.manga_title_id)
+        if not chapter_ids:
+            return {}
+
+        by_title = {"partition_by": [F("manga_title_id")]}
+        in_order = {**by_title, "order_by": [F("chapter_number").asc(), F("id").asc()]}
+        rows = (
+            Chapter.objects
+            .filter(manga_title_id__in=manga_title_ids)
+            .annotate(
+                previous_chapter_id=Window(Lag("id"), **in_order),
+                next_chapter_id=Window(Lead("id"), **in_order),
+                title_chapter_count=Window(Count("id"), **by_title),
+            )
+            .values_list("id", "previous_chapter_id", "next_chapter_id", "title_chapter_count")
+        )
+        return {
+            chapter_id: ChapterNavigation(previous_id, next_id, chapter_count)
+            for chapter_id, previous_id, next_id, chapter_count in rows
+            if chapter_id in chapter_ids
+        }
+
+
 class PageService:
     @staticmethod
     @transaction.atomic
@@ -85,6 +186,11 @@ class PageService:
 
         page = Page.objects.create(**data)
 
+        # Generate resized page variants after transaction
+        if image_url:
+            transaction.on_commit(lambda: enqueue_image_variants_task(
+                ImageVariantTargets.PAGE, page.id))
+
         return page
     
     @staticmethod
@@ -97,11 +203,16 @@ class PageService:
             # Upload new image
             new_image_url = ImageService.upload_image(image_file, bucket)
 
-            # Delete old image if it exists
+            # Delete old image and its variants if it exists
             if page.image_url:
                 ImageService.delete_image(page.image_url, bucket)
+            ImageVariantService.delete_variants(page.image_variants, bucket)
 
             data["image_url"] = new_image_url
+            data["image_variants"] = {}
+            data["image_metadata"] = {}
+            transaction.on_commit(lambda: enqueue_image_variants_task(
+                ImageVariantTargets.PAGE, page.id))
 
         # Update other fields
         page.update_metadata(**data)
@@ -118,11 +229,70 @@ class PageService:
                 # Ignore "not found" errors, log others
                 if "not_found" not in str(e):
                     raise
+        ImageVariantService.delete_variants(page.image_variants, BucketNames.MANGA_CONTENT)
 
         page.delete()
 
 
-class CommentService:    
+class CommentService:
+    DEFAULT_TREE_DEPTH = 3
+    MAX_TREE_DEPTH = 10
+    # Replies loaded per tree request; the rest are loaded lazily
+    MAX_TREE_REPLIES = 500
+
+    @staticmethod
+    def annotate_reply_count(queryset: QuerySet[Comment]) -> QuerySet[Comment]:
+        """Annotate reply_count: the number of direct replies."""
+        replies = (
+            Comment.objects
+            .filter(parent_comment=OuterRef("pk"))
+            .order_by()
+            .values("parent_comment")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return queryset.annotate(reply_count=Coalesce(Subquery(replies), 0))
+
+    @staticmethod
+    def get_reply_trees(
+        root_ids: Iterable[uuid.UUID], depth: int,
+        max_replies: int = MAX_TREE_REPLIES,
+    ) -> List[Comment]:
+        """
+        Replies below the root comments, down to depth levels, in one
+        recursive CTE query. Each reply has depth (1 for direct replies)
+        and reply_count attributes. Replies are ordered by depth, then
+        creation time. At most max_replies are returned; a cut-off keeps
+        whole levels first, so the parent of every reply is included.
+        """
+        root_ids = list(root_ids)
+        if not root_ids or depth < 1:
+            return []
+
+        table = connection.ops.quote_name(Comment._meta.db_table)
+        pk = Comment._meta.pk
+        placeholders = ", ".join(["%s"] * len(root_ids))
+        query = f"""
+            WITH RECURSIVE reply_tree (id, depth) AS (
+                SELECT id, 1 FROM {table}
+                WHERE parent_comment_id IN ({placeholders})
+                UNION ALL
+                SELECT reply.id, reply_tree.depth + 1
+                FROM {table} reply
+                JOIN reply_tree ON reply.parent_comment_id = reply_tree.id
+                WHERE reply_tree.depth < %s
+            )
+            SELECT comment.*, reply_tree.depth,
+                (SELECT COUNT(*) FROM {table} child
+                 WHERE child.parent_comment_id = comment.id) AS reply_count
+            FROM reply_tree
+            JOIN {table} comment ON comment.id = reply_tree.id
+            ORDER BY reply_tree.depth, comment.created_at, comment.id
+            LIMIT %s
+        """
+        params = [pk.get_db_prep_value(root_id, connection) for root_id in root_ids]
+        return list(Comment.objects.raw(query, [*params, depth, max_replies]))
+
     @staticmethod
     def create_comment(data: dict, owner: User, image_file=None) -> Comment:
         # Validate data
@@ -190,22 +360,23 @@ class CommentService:
         bucket = BucketNames.COMMENT_IMAGES
         data = data.copy()
 
-        # Replace image if a new one is provided
-        if image_file:
-            # Upload new image
-            new_image_url = ImageService.upload_image(image_file, bucket)
-
-            # Delete old image if it exists
-            if comment.attached_image_url:
-                ImageService.delete_image(comment.attached_image_url, bucket)
-            data["attached_image_url"] = new_image_url
-        else:
-            # Delete image if it's an empty string
-            if data.get("attached_image_url") == "":
-                ImageService.delete_image(comment.attached_image_url, bucket)
-        
-        # Update other comment fields and create log entry in a single transaction
+        # Replace the image, update other comment fields and create log entry
+        # in a single transaction, so a failed update keeps the old image
         with transaction.atomic():
+            # Replace image if a new one is provided
+            if image_file:
+                # Upload new image
+                new_image_url = ImageService.upload_image(image_file, bucket)
+
+                # Delete old image if it exists
+                if comment.attached_image_url:
+                    ImageService.delete_image(comment.attached_image_url, bucket)
+                data["attached_image_url"] = new_image_url
+            else:
+                # Delete image if it's an empty string
+                if data.get("attached_image_url") == "":
+                    ImageService.delete_image(comment.attached_image_url, bucket)
+
             if not comment.update_metadata(**data):
                 return comment    # Nothing to update
 
@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import logging
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import (
+    Avg, Case, Count, Expression, F, FloatField, OuterRef, Q, QuerySet,
+    Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.lookups import GreaterThan
+
+from ..models.common_choice_classes import ModerationStatusChoices
+from ..models.manga_models import MangaTitle, MangaTitleStatistics, Chapter, Comment
+from ..models.reader_models import MangaReaderStatistics
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = (
+    "chapter_count",
+    "comment_count",
+    "safe_comment_count",
+    "latest_chapter_date",
+    "rating_sum",
+    "rating_count",
+    "average_rating",
+    "read_count",
+)
+
+
+def _count_subquery(queryset: QuerySet, group_field: str) -> Expression:
+    return Coalesce(Subquery(
+        queryset.order_by()
+        .values(group_field)
+        .annotate(count=Count("pk"))
+        .values("count")
+    ), 0)
+
+
+def _average_expression(rating_sum: Expression, rating_count: Expression) -> Expression:
+    return Case(
+        When(
+            GreaterThan(rating_count, 0),
+            then=Cast(rating_sum, FloatField()) / Cast(rating_count, FloatField()),
+        ),
+        default=None,
+        output_field=FloatField(),
+    )
+
+
+class MangaTitleStatisticsService:
+    """Maintains the MangaTitleStatistics counters.
+
+    Incremental updates are single UPDATE statements using F() expressions,
+    so concurrent writers never lose an increment. A missing counters row is
+    rebuilt from the source tables, which already include the change that
+    triggered the update, except on removals: when a title is deleted, its
+    row is cascade-deleted before its chapters, comments and reader
+    statistics, and rebuilding it would reference the deleted title.
+    """
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _update(
+        manga_title_id: Optional[uuid.UUID], rebuild_missing: bool = True, **values: Any
+    ) -> None:
+        if manga_title_id is None:
+            return
+        updated = MangaTitleStatistics.objects.filter(
+            manga_title_id=manga_title_id
+        ).update(**values)
+        if not updated and rebuild_missing:
+            MangaTitleStatisticsService.rebuild([manga_title_id])
+
+    # ------------------------------------------------------------------
+    # Manga titles
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def create_statistics(manga_title: MangaTitle) -> MangaTitleStatistics:
+        stats, _ = MangaTitleStatistics.objects.get_or_create(manga_title=manga_title)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Chapters
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def chapter_added(chapter: Chapter) -> None:
+        MangaTitleStatisticsService._update(
+            chapter.manga_title_id,
+            chapter_count=F("chapter_count") + 1,
+            latest_chapter_date=Case(
+                When(
+                    Q(latest_chapter_date__isnull=True)
+                    | Q(latest_chapter_date__lt=chapter.upload_date),
+                    then=Value(chapter.upload_date),
+                ),
+                default=F("latest_chapter_date"),
+            ),
+        )
+
+    @staticmethod
+    def chapter_changed(
+        manga_title_id: uuid.UUID, previous_manga_title_id: Optional[uuid.UUID] = None
+    ) -> None:
+        """Recount the chapters of a title after an existing chapter was
+        saved, and of its previous title when the chapter was moved."""
+        for title_id in dict.fromkeys([manga_title_id, previous_manga_title_id]):
+            chapters = Chapter.objects.filter(manga_title_id=title_id)
+            MangaTitleStatisticsService._update(
+                title_id,
+                chapter_count=_count_subquery(chapters, "manga_title"),
+                latest_chapter_date=Subquery(
+                    chapters.order_by("-upload_date").values("upload_date")[:1]
+                ),
+            )
+
+    @staticmethod
+    def chapter_removed(chapter: Chapter) -> None:
+        MangaTitleStatisticsService._update(
+            chapter.manga_title_id,
+            rebuild_missing=False,
+            chapter_count=F("chapter_count") - 1,
+            latest_chapter_date=Subquery(
+                Chapter.objects
+                .filter(manga_title_id=chapter.manga_title_id)
+                .order_by("-upload_date")
+                .values("upload_date")[:1]
+            ),
+        )
+
+    # ------------------------------------------------------------------
+    # Comments (only comments posted on the title itself are counted)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def comment_added(comment: Comment) -> None:
+        is_safe = comment.moderation_status == ModerationStatusChoices.SAFE
+        MangaTitleStatisticsService._update(
+            comment.manga_title_id,
+            comment_count=F("comment_count") + 1,
+            safe_comment_count=F("safe_comment_count") + int(is_safe),
+        )
+
+    @staticmethod
+    def comment_moderation_changed(manga_title_id: Optional[uuid.UUID]) -> None:
+        """Recount the safe comments of a title. The previous moderation
+        status is unknown in post_save, so this is a single UPDATE with a
+        COUNT subquery rather than an increment."""
+        MangaTitleStatisticsService._update(
+            manga_title_id,
+            safe_comment_count=_count_subquery(
+                Comment.objects.filter(
+                    manga_title_id=manga_title_id,
+                    moderation_status=ModerationStatusChoices.SAFE,
+                ),
+                "manga_title",
+            ),
+        )
+
+    @staticmethod
+    def comments_moved(manga_title_ids: Iterable[Optional[uuid.UUID]]) -> None:
+        """Recount all comments of the titles a comment was moved between."""
+        for manga_title_id in dict.fromkeys(manga_title_ids):
+            comments = Comment.objects.filter(manga_title_id=manga_title_id)
+            MangaTitleStatisticsService._update(
+                manga_title_id,
+                comment_count=_count_subquery(comments, "manga_title"),
+                safe_comment_count=_count_subquery(
+                    comments.filter(moderation_status=ModerationStatusChoices.SAFE),
+                    "manga_title",
+                ),
+            )
+
+    @staticmethod
+    def comment_removed(comment: Comment) -> None:
+        is_safe = comment.moderation_status == ModerationStatusChoices.SAFE
+        MangaTitleStatisticsService._update(
+            comment.manga_title_id,
+            rebuild_missing=False,
+            comment_count=F("comment_count") - 1,
+            safe_comment_count=F("safe_comment_count") - int(is_safe),
+        )
+
+    # ------------------------------------------------------------------
+    # Reader statistics
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def adjust_rating(
+        manga_title_id: uuid.UUID, old_rating: int, new_rating: int,
+        rebuild_missing: bool = True,
+    ) -> None:
+        """Apply a reader's rating change (0 means not rated)."""
+        MangaTitleStatisticsService.adjust_rating_totals(
+            manga_title_id,
+            new_rating - old_rating,
+            int(new_rating > 0) - int(old_rating > 0),
+            rebuild_missing=rebuild_missing,
+        )
+
+    @staticmethod
+    def adjust_rating_totals(
+        manga_title_id: uuid.UUID, sum_delta: int, count_delta: int,
+        rebuild_missing: bool = True,
+    ) -> None:
+        """Apply the summed rating changes of one or more readers."""
+        if not sum_delta and not count_delta:
+            return
+        rating_sum = F("rating_sum") + sum_delta
+        rating_count = F("rating_count") + count_delta
+        MangaTitleStatisticsService._update(
+            manga_title_id,
+            rebuild_missing=rebuild_missing,
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            average_rating=_average_expression(rating_sum, rating_count),
+        )
+
+    @staticmethod
+    def adjust_read_count(
+        manga_title_id: uuid.UUID, delta: int, rebuild_missing: bool = True
+    ) -> None:
+        if not delta:
+            return
+        MangaTitleStatisticsService._update(
+            manga_title_id, rebuild_missing=rebuild_missing, read_count=F("read_count") + delta)
+
+    @staticmethod
+    def reader_statistics_removed(stats: MangaReaderStatistics) -> None:
+        MangaTitleStatisticsService.adjust_read_count(
+            stats.manga_title_id, -int(stats.is_reader_read), rebuild_missing=False)
+        MangaTitleStatisticsService.adjust_rating(
+            stats.manga_title_id, stats.star_rating, 0, rebuild_missing=False)
+
+    # ------------------------------------------------------------------
+    # Rebuild and drift check
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def annotate_computed_statistics(queryset: QuerySet[MangaTitle]) -> QuerySet[MangaTitle]:
+        """Annotate titles with every counter computed from the source
+        tables (prefixed with computed_)."""
+        chapters = Chapter.objects.filter(manga_title=OuterRef("pk"))
+        comments = Comment.objects.filter(manga_title=OuterRef("pk"))
+        ratings = MangaReaderStatistics.objects.filter(
+            manga_title=OuterRef("pk"), star_rating__gt=0).order_by()
+
+        return queryset.annotate(
+            computed_chapter_count=_count_subquery(chapters, "manga_title"),
+            computed_comment_count=_count_subquery(comments, "manga_title"),
+            computed_safe_comment_count=_count_subquery(
+                comments.filter(moderation_status=ModerationStatusChoices.SAFE),
+                "manga_title",
+            ),
+            computed_latest_chapter_date=Subquery(
+                chapters.order_by("-upload_date").values("upload_date")[:1]
+            ),
+            computed_rating_sum=Coalesce(Subquery(
+                ratings.values("manga_title")
+                .annotate(total=Sum("star_rating"))
+                .values("total")
+            ), 0),
+            computed_rating_count=_count_subquery(ratings, "manga_title"),
+            computed_average_rating=Subquery(
+                ratings.values("manga_title")
+                .annotate(avg=Avg("star_rating"))
+                .values("avg"),
+                output_field=FloatField(),
+            ),
+            computed_read_count=_count_subquery(
+                MangaReaderStatistics.objects.filter(
+                    manga_title=OuterRef("pk"), is_reader_read=True),
+                "manga_title",
+            ),
+        )
+
+    @staticmethod
+    def _computed_rows(manga_title_ids: Optional[Iterable[uuid.UUID]]) -> Iterable[Dict[str, Any]]:
+        queryset = MangaTitle.objects.all()
+        if manga_title_ids is not None:
+            queryset = queryset.filter(id__in=list(manga_title_ids))
+        computed_fields = [f"computed_{field}" for field in COUNTER_FIELDS]
+        return (
+            MangaTitleStatisticsService.annotate_computed_statistics(queryset)
+            .values("id", *computed_fields)
+            .iterator(chunk_size=1000)
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild(
+        manga_title_ids: Optional[Iterable[uuid.UUID]] = None, batch_size: int = 1000
+    ) -> int:
+        """Recompute the counters from scratch (all titles by default) and
+        upsert them. Returns the number of titles rebuilt."""
+        rebuilt = 0
+        batch: List[MangaTitleStatistics] = []
+        for row in MangaTitleStatisticsService._computed_rows(manga_title_ids):
+            batch.append(MangaTitleStatistics(
+                manga_title_id=row["id"],
+                **{field: row[f"computed_{field}"] for field in COUNTER_FIELDS},
+            ))
+            if len(batch) >= batch_size:
+                rebuilt += MangaTitleStatisticsService._upsert(batch)
+                batch = []
+        if batch:
+            rebuilt += MangaTitleStatisticsService._upsert(batch)
+        return rebuilt
+
+    @staticmethod
+    def _upsert(batch: List[MangaTitleStatistics]) -> int:
+        MangaTitleStatistics.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=["manga_title"],
+            update_fields=list(COUNTER_FIELDS),
+        )
+        return len(batch)
+
+    @staticmethod
+    def find_drift(
+        manga_title_ids: Optional[Iterable[uuid.UUID]] = None
+    ) -> List[Dict[str, Any]]:
+        """Compare the stored counters with the source tables.
+
+        Returns one dict per mismatching field:
+        {"manga_title_id", "field", "stored", "computed"}.
+        """
+        stored_by_title = {
+            row["manga_title_id"]: row
+            for row in MangaTitleStatistics.objects.values("manga_title_id", *COUNTER_FIELDS)
+        }
+        drift = []
+        for row in MangaTitleStatisticsService._computed_rows(manga_title_ids):
+            stored = stored_by_title.get(row["id"])
+            for field in COUNTER_FIELDS:
+                computed_value = row[f"computed_{field}"]
+                stored_value = stored[field] if stored else None
+                if field == "average_rating" and None not in (stored_value, computed_value):
+                    if abs(stored_value - computed_value) < 1e-6:
+                        continue
+                elif stored is not None and stored_value == computed_value:
+                    continue
+                drift.append({
+                    "manga_title_id": row["id"],
+                    "field": field,
+                    "stored": stored_value,
+                    "computed": computed_value,
+                })
+        return drift
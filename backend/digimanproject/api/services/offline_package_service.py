@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+import tempfile
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Sequence, Tuple
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+from django.conf import settings
+
+from ..models.manga_models import Chapter, Page
+from ..storage_backends import get_storage_backend
+from .image_service import BucketNames
+
+
+class OfflinePackageService:
+    """Builds CBZ (ZIP) archives of chapters for offline reading.
+
+    An archive holds one folder of page images per chapter and a
+    manifest.json describing them. Archives are cached in
+    OFFLINE_PACKAGE_CACHE_DIR under a hash of their manifest, so a chapter
+    is only built again when its pages change. The directory is kept under
+    OFFLINE_PACKAGE_CACHE_MAX_BYTES by evicting the least recently served
+    archives (their mtime is refreshed on every hit).
+
+    Page images are copied into the archive in chunks, so building a
+    package holds at most one chunk of one image in memory.
+    """
+
+    MAX_CHAPTERS = 20
+    CHUNK_SIZE = 64 * 1024
+    FETCH_TIMEOUT_SECONDS = 30
+    FORMAT_VERSION = 1
+    MANIFEST_NAME = "manifest.json"
+    EXTENSION = ".cbz"
+    CONTENT_TYPE = "application/vnd.comicbook+zip"
+
+    @staticmethod
+    def get_cache_dir() -> Path:
+        cache_dir = Path(settings.OFFLINE_PACKAGE_CACHE_DIR)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        return cache_dir
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build_manifest(chapters: Sequence[Chapter]) -> Dict[str, Any]:
+        """Describe the package: the chapters in the given order and their
+        pages (archive file and source URL), loaded in one query."""
+        pages_by_chapter: Dict[uuid.UUID, List[Dict[str, Any]]] = {
+            chapter.id: [] for chapter in chapters
+        }
+        pages = (
+            Page.objects
+            .filter(chapter_id__in=pages_by_chapter.keys())
+            .exclude(image_url__isnull=True)
+            .exclude(image_url="")
+            .order_by("page_number")
+            .values("chapter_id", "page_number", "image_url")
+        )
+        for page in pages:
+            pages_by_chapter[page["chapter_id"]].append(page)
+
+        manifest_chapters = []
+        for chapter in chapters:
+            folder = f"{chapter.manga_title_id}/{chapter.chapter_number:04d}"
+            manifest_chapters.append({
+                "id": str(chapter.id),
+                "manga_title_id": str(chapter.manga_title_id),
+                "manga_title": chapter.manga_title.title,
+                "chapter_number": chapter.chapter_number,
+                "title": chapter.title,
+                "pages": [
+                    {
+                        "page_number": page["page_number"],
+                        "file": (
+                            f"{folder}/{page['page_number']:04d}"
+                            f"{OfflinePackageService.get_extension(page['image_url'])}"
+                        ),
+                        "source_url": page["image_url"],
+                    }
+                    for page in pages_by_chapter[chapter.id]
+                ],
+            })
+        return {
+            "format_version": OfflinePackageService.FORMAT_VERSION,
+            "chapters": manifest_chapters,
+        }
+
+    @staticmethod
+    def get_extension(image_url: str) -> str:
+        extension = posixpath.splitext(urlparse(image_url).path)[1].lower()
+        return extension if 1 < len(extension) <= 5 else ".jpg"
+
+    @staticmethod
+    def get_package_key(manifest: Dict[str, Any]) -> str:
+        encoded = json.dumps(manifest, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()[:32]
+
+    # ------------------------------------------------------------------
+    # Packages
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def open_package(chapters: Sequence[Chapter]) -> Tuple[BinaryIO, str]:
+        """Return (open archive file, package key) of the chapters, building
+        the archive unless it is already cached. The archive is opened
+        here, so a concurrent eviction cannot remove it before it is served;
+        an archive evicted since the lookup is a cache miss."""
+        manifest = OfflinePackageService.build_manifest(chapters)
+        key = OfflinePackageService.get_package_key(manifest)
+        path = OfflinePackageService.get_cache_dir() / f"{key}{OfflinePackageService.EXTENSION}"
+
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            OfflinePackageService.build_archive(manifest, path)
+            file = open(path, "rb")
+            OfflinePackageService.evict(keep=path)
+            return file, key
+
+        try:
+            # Mark as recently used for LRU eviction
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return file, key
+
+    @staticmethod
+    def build_archive(manifest: Dict[str, Any], path: Path) -> None:
+        """Write the archive to a temporary file and move it into place, so
+        concurrent requests never serve a partial archive."""
+        descriptor, temp_name = tempfile.mkstemp(
+            dir=path.parent, prefix=".", suffix=".part")
+        try:
+            with os.fdopen(descriptor, "wb") as temp_file:
+                # Images are already compressed: store them as they are
+                with zipfile.ZipFile(temp_file, "w", zipfile.ZIP_STORED) as archive:
+                    archive.writestr(
+                        OfflinePackageService.MANIFEST_NAME,
+                        json.dumps(manifest, indent=2),
+                        compress_type=zipfile.ZIP_DEFLATED,
+                    )
+                    for chapter in manifest["chapters"]:
+                        for page in chapter["pages"]:
+                            with OfflinePackageService.open_image(page["source_url"]) as source, \
+                                    archive.open(page["file"], "w", force_zip64=True) as target:
+                                shutil.copyfileobj(
+                                    source, target, OfflinePackageService.CHUNK_SIZE)
+            os.replace(temp_name, path)
+        except BaseException:
+            try:
+                os.remove(temp_name)
+            except FileNotFoundError:
+                pass
+            raise
+
+    @staticmethod
+    def open_image(image_url: str) -> BinaryIO:
+        storage = get_storage_backend()
+        path = storage.get_object_path(image_url, BucketNames.MANGA_CONTENT)
+        if path is not None:
+            return storage.open(BucketNames.MANGA_CONTENT, path)
+        if urlparse(image_url).scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported page image URL: {image_url}")
+        return urlopen(image_url, timeout=OfflinePackageService.FETCH_TIMEOUT_SECONDS)
+
+    @staticmethod
+    def evict(keep: Path) -> None:
+        """Delete the least recently used archives until the cache fits in
+        OFFLINE_PACKAGE_CACHE_MAX_BYTES (never the archive just served)."""
+        cache_dir = OfflinePackageService.get_cache_dir()
+        archives = []
+        for archive_path in cache_dir.glob(f"*{OfflinePackageService.EXTENSION}"):
+            try:
+                stat = archive_path.stat()
+            except FileNotFoundError:
+                continue
+            archives.append((stat.st_mtime, stat.st_size, archive_path))
+
+        total_size = sum(size for _, size, _ in archives)
+        for _, size, archive_path in sorted(archives, key=lambda item: item[0]):
+            if total_size <= settings.OFFLINE_PACKAGE_CACHE_MAX_BYTES:
+                break
+            if archive_path == keep:
+                continue
+            try:
+                # Readers already streaming it keep their open file handle
+                archive_path.unlink()
+            except FileNotFoundError:
+                pass
+            total_size -= size
@@ -0,0 +1,149 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models.system_models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxService:
+    """
+    Transactional outbox for external side effects.
+
+    Services record an OutboxEvent inside their database transaction
+    instead of calling the external service there, so requests never wait
+    on the network while holding locks, and a rolled back transaction also
+    discards its side effects. After commit a Celery worker drains the
+    events in batches (drain_outbox_task, also scheduled periodically).
+    Failed events are retried with exponential backoff and marked DEAD
+    after MAX_ATTEMPTS.
+    """
+
+    BATCH_SIZE = 100
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY_SECONDS = 60  # doubled on every further attempt
+
+    @staticmethod
+    def delete_storage_objects(bucket: str, paths: Iterable[str]) -> None:
+        """Delete storage objects once the current transaction commits."""
+        paths = list(dict.fromkeys(paths))
+        if not paths:
+            return
+        OutboxService.add_event(
+            OutboxEvent.EventTypeChoices.DELETE_STORAGE_OBJECTS,
+            {"bucket": bucket, "paths": paths},
+        )
+
+    @staticmethod
+    def add_event(event_type: str, payload: Dict) -> OutboxEvent:
+        from ..tasks import enqueue_drain_outbox_task
+
+        event = OutboxEvent.objects.create(event_type=event_type, payload=payload)
+        transaction.on_commit(enqueue_drain_outbox_task)
+        return event
+
+    @staticmethod
+    def get_handlers() -> Dict[str, Callable[[List[OutboxEvent]], None]]:
+        return {
+            OutboxEvent.EventTypeChoices.DELETE_STORAGE_OBJECTS:
+                OutboxService.handle_storage_deletions,
+        }
+
+    @staticmethod
+    def drain(batch_size: int = BATCH_SIZE) -> int:
+        """
+        Carry out a batch of due events and return how many were taken.
+        Events locked by a concurrent drain are skipped.
+        """
+        handlers = OutboxService.get_handlers()
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    status=OutboxEvent.StatusChoices.PENDING,
+                    available_at__lte=timezone.now(),
+                )
+                .order_by("available_at")[:batch_size]
+            )
+            events_by_type: Dict[str, List[OutboxEvent]] = defaultdict(list)
+            for event in events:
+                events_by_type[event.event_type].append(event)
+
+            for event_type, typed_events in events_by_type.items():
+                OutboxService.handle_events(handlers[event_type], typed_events)
+        return len(events)
+
+    @staticmethod
+    def handle_events(
+        handler: Callable[[List[OutboxEvent]], None], events: List[OutboxEvent]
+    ) -> None:
+        """
+        Run a handler over a batch and delete the handled events. When the
+        batch fails its events are retried one at a time, so only the
+        events that fail on their own are counted as failed attempts.
+        """
+        try:
+            # Savepoint: a failed handler leaves no partial changes
+            with transaction.atomic():
+                handler(events)
+        except Exception as e:
+            if len(events) == 1:
+                OutboxService.set_failed_attempt(events, str(e))
+                return
+            for event in events:
+                OutboxService.handle_events(handler, [event])
+        else:
+            OutboxEvent.objects.filter(id__in=[event.id for event in events]).delete()
+
+    @staticmethod
+    def set_failed_attempt(events: List[OutboxEvent], error_message: str) -> None:
+        now = timezone.now()
+        for event in events:
+            event.attempts += 1
+            event.last_error = error_message
+            if event.attempts >= OutboxService.MAX_ATTEMPTS:
+                event.status = OutboxEvent.StatusChoices.DEAD
+                logger.error(
+                    "Outbox event %s failed permanently: %s", event.id, error_message)
+            else:
+                delay = OutboxService.RETRY_DELAY_SECONDS * 2 ** (event.attempts - 1)
+                event.available_at = now + timedelta(seconds=delay)
+        OutboxEvent.objects.bulk_update(
+            events, ["attempts", "last_error", "status", "available_at"])
+
+    @staticmethod
+    def retry_dead_events(events: Iterable[OutboxEvent]) -> int:
+        """Put dead events back in the queue with a fresh attempt count."""
+        from ..tasks import enqueue_drain_outbox_task
+
+        count = OutboxEvent.objects.filter(
+            id__in=[event.id for event in events],
+            status=OutboxEvent.StatusChoices.DEAD,
+        ).update(
+            status=OutboxEvent.StatusChoices.PENDING,
+            attempts=0,
+            available_at=timezone.now(),
+        )
+        transaction.on_commit(enqueue_drain_outbox_task)
+        return count
+
+    # ------------------------------------------------------------------
+    # Handlers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def handle_storage_deletions(events: List[OutboxEvent]) -> None:
+        """Delete the objects of all events with one call per bucket."""
+        from .image_service import ImageService
+
+        paths_by_bucket: Dict[str, List[str]] = defaultdict(list)
+        for event in events:
+            paths_by_bucket[event.payload["bucket"]].extend(event.payload["paths"])
+        for bucket, paths in paths_by_bucket.items():
+            ImageService.purge_objects(bucket, list(dict.fromkeys(paths)))
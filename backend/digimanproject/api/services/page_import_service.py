@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import logging
+import posixpath
+import re
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+
+from ..models.manga_models import Chapter, Page
+from ..models.user_models import User
+from .image_service import ImageService, ImageVariantTargets, BucketNames, PreparedImage
+from .system_service import LogEntryService
+from ..tasks import enqueue_image_variants_task
+
+logger = logging.getLogger(__name__)
+
+
+class ImportedImage(NamedTuple):
+    name: str
+    open: Callable[[], BinaryIO]
+
+
+class PageImportService:
+    """Creates the pages of a chapter from a CBZ/ZIP archive or a set of
+    image files.
+
+    Images are ordered by natural sort of their names (page2 before page10),
+    uploaded to storage concurrently by a bounded thread pool
+    (STORAGE_UPLOAD_CONCURRENCY workers), then inserted with a single bulk_create
+    and one summarized log entry. If any upload or the insert fails, the
+    images already stored are released again.
+    """
+
+    MAX_PAGES = 500
+    IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".avif"}
+
+    @staticmethod
+    def natural_sort_key(name: str) -> Tuple[Tuple[int, Union[int, str]], ...]:
+        return tuple(
+            (0, int(part)) if part.isdigit() else (1, part.lower())
+            for part in re.split(r"(\d+)", name) if part
+        )
+
+    @staticmethod
+    def is_image_name(name: str) -> bool:
+        base_name = posixpath.basename(name)
+        return (
+            not base_name.startswith(".")
+            and not name.startswith("__MACOSX/")
+            and posixpath.splitext(base_name)[1].lower() in PageImportService.IMAGE_EXTENSIONS
+        )
+
+    # ------------------------------------------------------------------
+    # Sources
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def images_from_archive(archive: zipfile.ZipFile) -> List[ImportedImage]:
+        """Image entries of an open archive (nested folders included).
+        Entries are streamed from the archive by the upload workers."""
+        def opener(info: zipfile.ZipInfo) -> Callable[[], BinaryIO]:
+            return lambda: UploadedFile(
+                archive.open(info), name=posixpath.basename(info.filename),
+                size=info.file_size)
+
+        return PageImportService.sort_images([
+            ImportedImage(info.filename, opener(info))
+            for info in archive.infolist()
+            if not info.is_dir() and PageImportService.is_image_name(info.filename)
+        ])
+
+    @staticmethod
+    def images_from_files(files: Iterable[BinaryIO]) -> List[ImportedImage]:
+        """Uploaded image files (e.g. the content of a folder)."""
+        return PageImportService.sort_images([
+            ImportedImage(file.name, lambda file=file: file)
+            for file in files if PageImportService.is_image_name(file.name)
+        ])
+
+    @staticmethod
+    def sort_images(images: List[ImportedImage]) -> List[ImportedImage]:
+        return sorted(images, key=lambda image: PageImportService.natural_sort_key(image.name))
+
+    # ------------------------------------------------------------------
+    # Import
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def import_archive(
+        chapter: Chapter, archive_file: BinaryIO, user: Optional[User] = None
+    ) -> List[Page]:
+        try:
+            archive = zipfile.ZipFile(archive_file)
+        except zipfile.BadZipFile:
+            raise ValueError("The uploaded file is not a valid CBZ/ZIP archive.")
+        with archive:
+            images = PageImportService.images_from_archive(archive)
+            return PageImportService.import_pages(
+                chapter, images, user, source=getattr(archive_file, "name", ""))
+
+    @staticmethod
+    def import_files(
+        chapter: Chapter, files: Iterable[BinaryIO], user: Optional[User] = None
+    ) -> List[Page]:
+        images = PageImportService.images_from_files(files)
+        return PageImportService.import_pages(chapter, images, user, source="files")
+
+    @staticmethod
+    def import_pages(
+        chapter: Chapter, images: List[ImportedImage],
+        user: Optional[User] = None, source: str = "",
+    ) -> List[Page]:
+        """Append the images to the chapter as new pages, after its last page."""
+        if not images:
+            raise ValueError("No images were found to import.")
+        if len(images) > PageImportService.MAX_PAGES:
+            raise ValueError(f"At most {PageImportService.MAX_PAGES} pages can be imported at once.")
+
+        image_urls = PageImportService.upload_images(images)
+        try:
+            with transaction.atomic():
+                # Serialize concurrent imports into the same chapter
+                Chapter.objects.select_for_update().filter(pk=chapter.pk).exists()
+                first_page_number = chapter.get_last_page_number() + 1
+                pages = Page.objects.bulk_create([
+                    Page(chapter=chapter, page_number=first_page_number + index, image_url=url)
+                    for index, url in enumerate(image_urls)
+                ])
+                LogEntryService.log_page_import(user, chapter, {
+                    "source": source,
+                    "page_count": len(pages),
+                    "first_page_number": first_page_number,
+                    "last_page_number": first_page_number + len(pages) - 1,
+                })
+
+                # Generate resized page variants after transaction
+                page_ids = [page.id for page in pages]
+                def enqueue_variants():
+                    for page_id in page_ids:
+                        enqueue_image_variants_task(ImageVariantTargets.PAGE, page_id)
+                transaction.on_commit(enqueue_variants)
+        except Exception:
+            PageImportService.delete_images(image_urls)
+            raise
+        return pages
+
+    @staticmethod
+    def upload_images(images: List[ImportedImage]) -> List[str]:
+        """
+        Upload the images and return their URLs in order.
+
+        Workers first validate and hash the images, then upload the content
+        the bucket does not hold yet, once per distinct content. Database
+        work stays on the calling thread. On the first failure, pending work
+        is cancelled and the references and objects already taken are
+        released again.
+        """
+        bucket = BucketNames.MANGA_CONTENT
+
+        def prepare(image: ImportedImage) -> PreparedImage:
+            with image.open() as file:
+                try:
+                    return ImageService.prepare_image(file)
+                except ValueError as e:
+                    raise ValueError(f"{image.name}: {e}")
+
+        prepared, failure = PageImportService.run_concurrently(prepare, images)
+        if failure is not None:
+            PageImportService.raise_failure(failure)
+
+        counts = Counter(image.content_hash for image in prepared)
+        public_urls = ImageService.add_references(bucket, counts)
+        missing: Dict[str, Tuple[ImportedImage, PreparedImage]] = {}
+        for image, prepared_image in zip(images, prepared):
+            if prepared_image.content_hash not in public_urls:
+                missing.setdefault(prepared_image.content_hash, (image, prepared_image))
+
+        def store(item: Tuple[ImportedImage, PreparedImage]) -> str:
+            image, prepared_image = item
+            with image.open() as file:
+                return ImageService.store_object(file, bucket, prepared_image)
+
+        stored_urls, failure = PageImportService.run_concurrently(store, list(missing.values()))
+        if failure is not None:
+            PageImportService.delete_images([
+                public_urls[content_hash]
+                for content_hash in counts.elements() if content_hash in public_urls
+            ])
+            ImageService.discard_objects(bucket, [
+                prepared_image for (_, prepared_image), url in zip(missing.values(), stored_urls)
+                if url is not None
+            ])
+            PageImportService.raise_failure(failure)
+
+        for (_, prepared_image), url in zip(missing.values(), stored_urls):
+            public_urls[prepared_image.content_hash] = ImageService.record_image(
+                bucket, prepared_image, url, counts[prepared_image.content_hash])
+        return [public_urls[image.content_hash] for image in prepared]
+
+    @staticmethod
+    def run_concurrently(
+        function: Callable[[Any], Any], items: List[Any]
+    ) -> Tuple[List[Any], Optional[BaseException]]:
+        """
+        Apply the function to the items with a bounded thread pool
+        (STORAGE_UPLOAD_CONCURRENCY workers). Returns the results in order
+        (None where not completed) and the first failure, after which
+        pending items are cancelled.
+        """
+        if not items:
+            return [], None
+        workers = min(settings.STORAGE_UPLOAD_CONCURRENCY, len(items))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page-import") as executor:
+            futures = [executor.submit(function, item) for item in items]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failure = next(
+                (future.exception() for future in done if future.exception() is not None),
+                None,
+            )
+            if failure is not None:
+                for future in futures:
+                    future.cancel()
+
+        return [
+            future.result() if not future.cancelled() and future.exception() is None else None
+            for future in futures
+        ], failure
+
+    @staticmethod
+    def raise_failure(failure: BaseException) -> None:
+        if isinstance(failure, ValueError):
+            raise failure
+        raise RuntimeError(f"Failed to import pages: {failure}") from failure
+
+    @staticmethod
+    def delete_images(image_urls: List[str]) -> None:
+        try:
+            ImageService.delete_images(image_urls, BucketNames.MANGA_CONTENT)
+        except Exception:
+            logger.exception("Failed to delete imported images")
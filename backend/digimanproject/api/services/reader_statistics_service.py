@@ -2,13 +2,17 @@ from __future__ import annotations
 
 import logging
 import uuid
-from typing import Tuple
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 
-from django.db import transaction
-from django.db.models import Avg
+from django.db import connection, transaction
+from django.db.models import Avg, Exists, F, OuterRef, QuerySet, Subquery, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 
 from ..models.reader_models import MangaReaderStatistics, ReadingProgress
+from .manga_title_statistics_service import MangaTitleStatisticsService
+from .response_cache_service import ResponseCacheService
 
 from typing import TYPE_CHECKING
 
@@ -17,80 +21,202 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Columns written by upsert_statistics_many, in StatisticsUpdate order
+UPSERT_FIELDS = (
+    "id", "reader", "manga_title",
+    "is_reader_visited", "is_reader_read", "is_reader_commented", "star_rating",
+)
+
+
+class StatisticsUpdate(NamedTuple):
+    """Flags to set and rating to apply (0 keeps the current rating)."""
+    reader_id: uuid.UUID
+    manga_title_id: uuid.UUID
+    is_reader_visited: bool = False
+    is_reader_read: bool = False
+    is_reader_commented: bool = False
+    star_rating: int = 0
+
+    def merge(self, earlier: "StatisticsUpdate") -> "StatisticsUpdate":
+        return self._replace(
+            is_reader_visited=self.is_reader_visited or earlier.is_reader_visited,
+            is_reader_read=self.is_reader_read or earlier.is_reader_read,
+            is_reader_commented=self.is_reader_commented or earlier.is_reader_commented,
+            star_rating=self.star_rating or earlier.star_rating,
+        )
+
 
 class ReaderStatisticsService:
 
     # ------------------------------------------------------------------
-    # Internal helper
+    # Upserts
     # ------------------------------------------------------------------
 
     @staticmethod
-    @transaction.atomic
-    def get_or_create_stats(
-        reader_id: uuid.UUID, manga_title_id: uuid.UUID
+    def upsert_statistics(
+        reader_id: uuid.UUID, manga_title_id: uuid.UUID, **values: Any
     ) -> MangaReaderStatistics:
-        stats, _ = MangaReaderStatistics.objects.get_or_create(
-            reader_id=reader_id,
-            manga_title_id=manga_title_id,
-        )
-        return stats
+        """Apply the flags/rating of StatisticsUpdate (given as keyword
+        arguments) to one (reader, manga title) and return the row."""
+        return ReaderStatisticsService.upsert_statistics_many(
+            [StatisticsUpdate(reader_id, manga_title_id, **values)])[0]
+
+    @staticmethod
+    @transaction.atomic
+    def upsert_statistics_many(
+        updates: Iterable[StatisticsUpdate]
+    ) -> List[MangaReaderStatistics]:
+        """
+        Apply many updates with one INSERT ... ON CONFLICT DO UPDATE per
+        batch and return the resulting rows. Flags are only ever set and a
+        rating of 0 keeps the current one, so concurrent upserts of the same
+        row merge instead of overwriting each other.
+
+        Updates that can change the title counters (read, rating) first lock
+        the existing rows to learn their previous values. A row inserted
+        concurrently in between is detected by its id (ours was not used)
+        and its title is recounted instead.
+        """
+        merged: Dict[Tuple[uuid.UUID, uuid.UUID], StatisticsUpdate] = {}
+        for update in updates:
+            if not 0 <= update.star_rating <= 5:
+                raise ValueError("Rating must be between 0 (keep the current rating) and 5.")
+            pair = (update.reader_id, update.manga_title_id)
+            merged[pair] = update.merge(merged[pair]) if pair in merged else update
+        if not merged:
+            return []
+
+        previous: Dict[Tuple[uuid.UUID, uuid.UUID], MangaReaderStatistics] = {}
+        if any(update.is_reader_read or update.star_rating for update in merged.values()):
+            for stats in MangaReaderStatistics.objects.select_for_update().filter(
+                reader_id__in={reader_id for reader_id, _ in merged},
+                manga_title_id__in={manga_title_id for _, manga_title_id in merged},
+            ):
+                previous[(stats.reader_id, stats.manga_title_id)] = stats
+
+        proposed_ids = {pair: uuid.uuid4() for pair in merged}
+        rows: List[MangaReaderStatistics] = []
+        pairs = list(merged)
+        batch_size = connection.ops.bulk_batch_size(UPSERT_FIELDS, pairs) or len(pairs)
+        for start in range(0, len(pairs), batch_size):
+            rows.extend(ReaderStatisticsService._upsert_batch([
+                (proposed_ids[pair], merged[pair]) for pair in pairs[start:start + batch_size]
+            ]))
+
+        read_deltas: Counter = Counter()
+        rating_deltas: Dict[uuid.UUID, List[int]] = defaultdict(lambda: [0, 0])
+        recount_ids: Set[uuid.UUID] = set()
+        for row in rows:
+            pair = (row.reader_id, row.manga_title_id)
+            if row.id == proposed_ids[pair]:
+                was_read, old_rating = False, 0
+            elif pair in previous:
+                was_read, old_rating = previous[pair].is_reader_read, previous[pair].star_rating
+            else:
+                if merged[pair].is_reader_read or merged[pair].star_rating:
+                    recount_ids.add(row.manga_title_id)
+                continue
+            read_deltas[row.manga_title_id] += int(row.is_reader_read) - int(was_read)
+            rating_delta = rating_deltas[row.manga_title_id]
+            rating_delta[0] += row.star_rating - old_rating
+            rating_delta[1] += int(row.star_rating > 0) - int(old_rating > 0)
+
+        for manga_title_id, delta in read_deltas.items():
+            if manga_title_id not in recount_ids:
+                MangaTitleStatisticsService.adjust_read_count(manga_title_id, delta)
+        for manga_title_id, (sum_delta, count_delta) in rating_deltas.items():
+            if manga_title_id not in recount_ids:
+                MangaTitleStatisticsService.adjust_rating_totals(
+                    manga_title_id, sum_delta, count_delta)
+        if recount_ids:
+            MangaTitleStatisticsService.rebuild(recount_ids)
+        if recount_ids or any(read_deltas.values()) or any(
+            sum_delta or count_delta for sum_delta, count_delta in rating_deltas.values()
+        ):
+            # Raw upserts send no signals: invalidate the rankings here
+            transaction.on_commit(ResponseCacheService.invalidate)
+        return rows
+
+    @staticmethod
+    def _upsert_batch(
+        batch: List[Tuple[uuid.UUID, StatisticsUpdate]]
+    ) -> List[MangaReaderStatistics]:
+        quote = connection.ops.quote_name
+        table = quote(MangaReaderStatistics._meta.db_table)
+        fields = [MangaReaderStatistics._meta.get_field(name) for name in UPSERT_FIELDS]
+        columns = ", ".join(quote(field.column) for field in fields)
+        flags = [
+            f"{quote(column)} = stats.{quote(column)} OR EXCLUDED.{quote(column)}"
+            for column in ("is_reader_visited", "is_reader_read", "is_reader_commented")
+        ]
+        rating = quote("star_rating")
+        query = f"""
+            INSERT INTO {table} AS stats ({columns})
+            VALUES {", ".join([f"({', '.join(['%s'] * len(fields))})"] * len(batch))}
+            ON CONFLICT ({quote("reader_id")}, {quote("manga_title_id")}) DO UPDATE SET
+                {", ".join(flags)},
+                {rating} = CASE WHEN EXCLUDED.{rating} > 0
+                    THEN EXCLUDED.{rating} ELSE stats.{rating} END
+            RETURNING {columns}
+        """
+        params = []
+        for proposed_id, update in batch:
+            values = (proposed_id, *update)
+            params.extend(
+                field.get_db_prep_value(value, connection)
+                for field, value in zip(fields, values)
+            )
+        return list(MangaReaderStatistics.objects.raw(query, params))
 
     # ------------------------------------------------------------------
     # Flag updates
     # ------------------------------------------------------------------
 
     @staticmethod
-    @transaction.atomic
     def mark_visited(
         reader_id: uuid.UUID, manga_title_id: uuid.UUID
     ) -> MangaReaderStatistics:
         """Set is_reader_visited = True (no-op if already set)."""
-        stats = ReaderStatisticsService.get_or_create_stats(reader_id, manga_title_id)
-        if not stats.is_reader_visited:
-            stats.is_reader_visited = True
-            stats.save(update_fields=["is_reader_visited"])
-        return stats
+        return ReaderStatisticsService.upsert_statistics(
+            reader_id, manga_title_id, is_reader_visited=True)
 
     @staticmethod
-    @transaction.atomic
     def mark_read(
         reader_id: uuid.UUID, manga_title_id: uuid.UUID
     ) -> MangaReaderStatistics:
         """Set is_reader_read = True (no-op if already set)."""
-        stats = ReaderStatisticsService.get_or_create_stats(reader_id, manga_title_id)
-        if not stats.is_reader_read:
-            stats.is_reader_read = True
-            stats.save(update_fields=["is_reader_read"])
-        return stats
+        return ReaderStatisticsService.upsert_statistics(
+            reader_id, manga_title_id, is_reader_read=True)
 
     @staticmethod
-    @transaction.atomic
     def mark_commented(
         reader_id: uuid.UUID, manga_title_id: uuid.UUID
     ) -> MangaReaderStatistics:
         """Set is_reader_commented = True (no-op if already set)."""
-        stats = ReaderStatisticsService.get_or_create_stats(reader_id, manga_title_id)
-        if not stats.is_reader_commented:
-            stats.is_reader_commented = True
-            stats.save(update_fields=["is_reader_commented"])
-        return stats
+        return ReaderStatisticsService.upsert_statistics(
+            reader_id, manga_title_id, is_reader_commented=True)
+
+    @staticmethod
+    def mark_read_many(pairs: Iterable[Tuple[uuid.UUID, uuid.UUID]]) -> None:
+        """Mark many (reader_id, manga_title_id) pairs as visited and read."""
+        ReaderStatisticsService.upsert_statistics_many(
+            StatisticsUpdate(reader_id, manga_title_id, is_reader_visited=True, is_reader_read=True)
+            for reader_id, manga_title_id in pairs
+        )
 
     # ------------------------------------------------------------------
     # Star rating
     # ------------------------------------------------------------------
 
     @staticmethod
-    @transaction.atomic
     def set_star_rating(
         reader_id: uuid.UUID, manga_title_id: uuid.UUID, rating: int
     ) -> MangaReaderStatistics:
         """Set the reader's personal star rating (1–5)."""
         if not 1 <= rating <= 5:
             raise ValueError("Rating must be between 1 and 5.")
-        stats = ReaderStatisticsService.get_or_create_stats(reader_id, manga_title_id)
-        stats.star_rating = rating
-        stats.save(update_fields=["star_rating"])
-        return stats
+        return ReaderStatisticsService.upsert_statistics(
+            reader_id, manga_title_id, star_rating=rating)
 
     # ------------------------------------------------------------------
     # Aggregates (across all readers, used by manga serializer)
@@ -117,19 +243,128 @@ class ReaderStatisticsService:
     # ------------------------------------------------------------------
 
     @staticmethod
-    @transaction.atomic
     def upsert_reading_progress(
         reader_id: uuid.UUID, chapter: "Chapter"
     ) -> Tuple[ReadingProgress, bool]:
-        """Create or update a ReadingProgress entry for (reader, chapter).
+        """Record a read of (reader, chapter) in the progress buffer.
 
-        The post_save signal on ReadingProgress handles updating
-        MangaReaderStatistics flags automatically when created=True.
-        Returns (progress, created).
+        The entry is written to the database (and MangaReaderStatistics
+        flags updated) by the next flush. Returns the progress as it will
+        be stored and whether it is the first read of the chapter.
         """
-        progress, created = ReadingProgress.objects.update_or_create(
-            reader_id=reader_id,
-            chapter=chapter,
-            defaults={"last_read_timestamp": timezone.now()},
-        )
+        from .reading_progress_buffer_service import ReadingProgressBufferService
+
+        read_at = timezone.now()
+        progress = ReaderStatisticsService.get_reading_progress(reader_id, chapter.id)
+        is_new = ReadingProgressBufferService.record(reader_id, chapter.id, read_at)
+        created = progress is None and is_new
+        if progress is None:
+            progress = ReadingProgress(
+                id=ReadingProgressBufferService.get_progress_id(reader_id, chapter.id),
+                reader_id=reader_id,
+            )
+        progress.chapter = chapter
+        progress.last_read_timestamp = read_at
         return progress, created
+
+    @staticmethod
+    def record_reading_positions(
+        reader_id: uuid.UUID, positions: Iterable[Dict[str, Any]]
+    ) -> int:
+        """
+        Buffer a batch of position updates (chapter_id, page_number,
+        scroll_fraction, updated_at). Updates are merged by their time, so
+        the batch may hold several updates of a chapter and updates queued
+        offline; times in the future are taken as now.
+        """
+        from .reading_progress_buffer_service import (
+            ReadingPosition, ReadingProgressBufferService,
+        )
+
+        now = timezone.now()
+        return ReadingProgressBufferService.record_positions(reader_id, [
+            (position["chapter_id"], ReadingPosition(
+                page_number=position["page_number"],
+                scroll_position=round(
+                    position.get("scroll_fraction", 0) * ReadingProgress.SCROLL_SCALE),
+                updated_at=min(position.get("updated_at") or now, now),
+            ))
+            for position in positions
+        ])
+
+    @staticmethod
+    def get_reading_progress(
+        reader_id: uuid.UUID, chapter_id: uuid.UUID
+    ) -> Optional[ReadingProgress]:
+        """The reader's progress in the chapter, unflushed reads and
+        positions included."""
+        from .reading_progress_buffer_service import ReadingProgressBufferService
+
+        progress = ReadingProgress.objects.filter(
+            reader_id=reader_id, chapter_id=chapter_id
+        ).order_by("-last_read_timestamp").first()
+        entry = ReadingProgressBufferService.get_buffered(reader_id).get(chapter_id)
+        if entry is None:
+            return progress
+        if progress is None:
+            progress = ReadingProgress(
+                id=ReadingProgressBufferService.get_progress_id(reader_id, chapter_id),
+                reader_id=reader_id,
+                chapter_id=chapter_id,
+                last_read_timestamp=entry.read_at,
+            )
+        return ReadingProgressBufferService.apply_entry(progress, entry)
+
+    @staticmethod
+    def get_reading_history(reader_id: uuid.UUID) -> QuerySet[ReadingProgress]:
+        """
+        The reader's latest progress of each manga title, newest first, in
+        one query. Each entry is annotated with next_unread_chapter_id (the
+        first later chapter the reader has not opened) and the title's
+        latest_chapter_id/latest_chapter_number.
+
+        PostgreSQL picks the latest entries with DISTINCT ON; other
+        databases use a ROW_NUMBER() window.
+        """
+        from ..models.manga_models import Chapter
+
+        progress = ReadingProgress.objects.filter(reader_id=reader_id, chapter__isnull=False)
+        if connection.vendor == "postgresql":
+            latest_ids = (
+                progress
+                .order_by("chapter__manga_title_id", "-last_read_timestamp", "-id")
+                .distinct("chapter__manga_title_id")
+                .values("id")
+            )
+        else:
+            latest_ids = (
+                progress
+                .annotate(position=Window(
+                    RowNumber(),
+                    partition_by=[F("chapter__manga_title_id")],
+                    order_by=[F("last_read_timestamp").desc(), F("id").desc()],
+                ))
+                .filter(position=1)
+                .values("id")
+            )
+
+        title_chapters = Chapter.objects.filter(manga_title_id=OuterRef("chapter__manga_title_id"))
+        latest_chapters = title_chapters.order_by("-chapter_number", "-id")
+        unread_chapters = (
+            title_chapters
+            .filter(chapter_number__gt=OuterRef("chapter__chapter_number"))
+            .exclude(Exists(ReadingProgress.objects.filter(
+                reader_id=reader_id, chapter_id=OuterRef("pk"))))
+            .order_by("chapter_number", "id")
+        )
+        return (
+            ReadingProgress.objects
+            .filter(id__in=latest_ids)
+            .select_related("chapter__manga_title")
+            .annotate(
+                next_unread_chapter_id=Subquery(unread_chapters.values("id")[:1]),
+                latest_chapter_id=Subquery(latest_chapters.values("id")[:1]),
+                latest_chapter_number=Subquery(latest_chapters.values("chapter_number")[:1]),
+            )
+            .order_by("-last_read_timestamp")
+        )
@@ -0,0 +1,497 @@
+from __future__ import annotations
+
+import logging
+import uuid
+from bisect import bisect_left
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from ..models.manga_models import Chapter
+from ..models.reader_models import ReadingProgress
+from ..models.user_models import Reader
+from ..paginations.keyset_paginations import OptInKeysetPagination
+from .reader_statistics_service import ReaderStatisticsService
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+logger = logging.getLogger(__name__)
+
+UPSERT_FIELDS = (
+    "id", "reader", "chapter", "last_read_timestamp",
+    "page_number", "scroll_position", "position_updated_at",
+)
+
+
+class ReadingPosition(NamedTuple):
+    page_number: int
+    scroll_position: int  # in ReadingProgress.SCROLL_SCALE-ths of the page
+    updated_at: datetime
+
+
+class ProgressEntry(NamedTuple):
+    read_at: datetime
+    position: Optional[ReadingPosition] = None
+
+    def merge(self, other: "ProgressEntry") -> "ProgressEntry":
+        """The later read time and the newer position of both entries."""
+        position = self.position
+        if other.position is not None and (
+            position is None or position.updated_at < other.position.updated_at
+        ):
+            position = other.position
+        return ProgressEntry(max(self.read_at, other.read_at), position)
+
+
+# {(reader_id, chapter_id): entry}
+ProgressEntries = Dict[Tuple[uuid.UUID, uuid.UUID], ProgressEntry]
+
+# Values start with their timestamp ("<ts>" for reads of a chapter,
+# "<ts> <page> <scroll>" for its position): keep the later value of each
+# field and mark the reader as dirty. ARGV: reader id, then field/value
+# pairs. Returns how many fields were not buffered yet.
+RECORD_SCRIPT = """
+local function timestamp(value)
+    return tonumber(string.match(value, '^%S+'))
+end
+local added = 0
+for i = 2, #ARGV, 2 do
+    local current = redis.call('HGET', KEYS[1], ARGV[i])
+    if not current or timestamp(current) < timestamp(ARGV[i + 1]) then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+    if not current and redis.call('HEXISTS', KEYS[2], ARGV[i]) == 0 then
+        added = added + 1
+    end
+end
+redis.call('SADD', KEYS[3], ARGV[1])
+return added
+"""
+
+# Move the buffered entries into the flushing hash (merged with the
+# entries of an earlier flush that failed) and return them.
+TAKE_SCRIPT = """
+local function timestamp(value)
+    return tonumber(string.match(value, '^%S+'))
+end
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+    local current = redis.call('HGET', KEYS[2], entries[i])
+    if not current or timestamp(current) < timestamp(entries[i + 1]) then
+        redis.call('HSET', KEYS[2], entries[i], entries[i + 1])
+    end
+end
+redis.call('DEL', KEYS[1])
+return redis.call('HGETALL', KEYS[2])
+"""
+
+
+class BufferedProgressList:
+    """
+    Stored progress rows merged with progress overlaid from the buffer, in
+    the order of the queryset (its first ordering field, which must not be
+    null). The merged position of each buffered entry is counted once, so
+    a page slice is a single query of the stored rows and the list can be
+    paginated like the queryset.
+    """
+
+    def __init__(self, queryset: QuerySet[ReadingProgress], buffered: List[ReadingProgress]):
+        field, descending = OptInKeysetPagination.get_keyset_ordering(queryset)
+        lookup = "gt" if descending else "lt"
+        self.queryset = queryset
+        self.buffered = sorted(
+            buffered, key=lambda progress: getattr(progress, field), reverse=descending)
+        self.positions = [
+            queryset.filter(**{f"{field}__{lookup}": getattr(progress, field)}).count() + index
+            for index, progress in enumerate(self.buffered)
+        ]
+        self._count: Optional[int] = None
+
+    def count(self) -> int:
+        if self._count is None:
+            self._count = self.queryset.count() + len(self.buffered)
+        return self._count
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __iter__(self) -> Iterator[ReadingProgress]:
+        return iter(self[:])
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if not isinstance(index, slice):
+            items = self[index:index + 1 or None]
+            if not items:
+                raise IndexError("BufferedProgressList index out of range")
+            return items[0]
+        start, stop, step = index.indices(len(self))
+        stop = max(start, stop)
+        rows = iter(self.queryset[
+            start - bisect_left(self.positions, start):stop - bisect_left(self.positions, stop)
+        ])
+        buffered = dict(zip(self.positions, self.buffered))
+        items = [
+            buffered[position] if position in buffered else next(rows, None)
+            for position in range(start, stop)
+        ]
+        return [item for item in items if item is not None][::step]
+
+
+class ReadingProgressBufferService:
+    """
+    Write-behind buffer for reading progress.
+
+    Reads only record (reader, chapter, time) in a Redis hash per reader,
+    keeping the latest time of each chapter and, in a second field, its
+    newest page position, so frequent position updates never add rows;
+    flush() periodically writes
+    the buffered entries of FLUSH_BATCH_SIZE readers with a single
+    INSERT ... ON CONFLICT DO UPDATE and marks the titles visited/read in
+    the same transaction. Entries being flushed stay in a second hash
+    until the transaction commits, so a failed flush is retried and reads
+    in between still see them.
+
+    Without Redis (another cache backend, or an outage) progress is
+    written to the database directly.
+    """
+
+    KEY_PREFIX = "reading_progress"
+    FLUSH_BATCH_SIZE = 500
+    # Rows created by a flush get a stable id, so a progress returned
+    # before the flush keeps its id afterwards
+    PROGRESS_ID_NAMESPACE = uuid.UUID("0c7f3a9e-4b1d-4f55-9a6e-2d8c1e5b7f40")
+    POSITION_SUFFIX = ":position"
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _buffer_key(reader_id: uuid.UUID) -> str:
+        return f"{ReadingProgressBufferService.KEY_PREFIX}:buffer:{reader_id}"
+
+    @staticmethod
+    def _flushing_key(reader_id: uuid.UUID) -> str:
+        return f"{ReadingProgressBufferService.KEY_PREFIX}:flushing:{reader_id}"
+
+    @staticmethod
+    def _dirty_key() -> str:
+        return f"{ReadingProgressBufferService.KEY_PREFIX}:dirty"
+
+    @staticmethod
+    def get_progress_id(reader_id: uuid.UUID, chapter_id: uuid.UUID) -> uuid.UUID:
+        return uuid.uuid5(
+            ReadingProgressBufferService.PROGRESS_ID_NAMESPACE, f"{reader_id}:{chapter_id}")
+
+    @staticmethod
+    def get_client() -> Optional["Redis"]:
+        """The Redis client of the default cache, None for other backends."""
+        from django_redis import get_redis_connection
+        try:
+            return get_redis_connection("default")
+        except NotImplementedError:
+            return None
+
+    # ------------------------------------------------------------------
+    # Recording and reading
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def record(
+        reader_id: uuid.UUID, chapter_id: uuid.UUID, read_at: Optional[datetime] = None
+    ) -> bool:
+        """Buffer a read of the chapter. Returns False when the chapter was
+        already waiting in the buffer."""
+        return bool(ReadingProgressBufferService.record_entries(
+            reader_id, {chapter_id: ProgressEntry(read_at or timezone.now())}))
+
+    @staticmethod
+    def record_positions(
+        reader_id: uuid.UUID, positions: Iterable[Tuple[uuid.UUID, ReadingPosition]]
+    ) -> int:
+        """Buffer the reader's positions, each also a read of its chapter
+        at the time of the position. Returns how many were buffered."""
+        entries: Dict[uuid.UUID, ProgressEntry] = {}
+        count = 0
+        for chapter_id, position in positions:
+            entry = ProgressEntry(position.updated_at, position)
+            entries[chapter_id] = entry.merge(entries[chapter_id]) if chapter_id in entries else entry
+            count += 1
+        ReadingProgressBufferService.record_entries(reader_id, entries)
+        return count
+
+    @staticmethod
+    def record_entries(reader_id: uuid.UUID, entries: Dict[uuid.UUID, ProgressEntry]) -> int:
+        """Merge the entries into the reader's buffer with one script call
+        and return how many fields were not buffered yet."""
+        if not entries:
+            return 0
+        client = ReadingProgressBufferService.get_client()
+        if client is not None:
+            args = [str(reader_id)]
+            for chapter_id, entry in entries.items():
+                args.extend(ReadingProgressBufferService._encode(chapter_id, entry))
+            try:
+                record = client.register_script(RECORD_SCRIPT)
+                return int(record(
+                    keys=[
+                        ReadingProgressBufferService._buffer_key(reader_id),
+                        ReadingProgressBufferService._flushing_key(reader_id),
+                        ReadingProgressBufferService._dirty_key(),
+                    ],
+                    args=args,
+                ))
+            except Exception:
+                logger.exception(
+                    "Reading progress buffer unavailable (reader_id=%s)", reader_id)
+        ReadingProgressBufferService.apply({
+            (reader_id, chapter_id): entry for chapter_id, entry in entries.items()
+        })
+        return len(entries)
+
+    @staticmethod
+    def get_buffered(reader_id: uuid.UUID) -> Dict[uuid.UUID, ProgressEntry]:
+        """{chapter_id: entry} of the reader's unflushed reads."""
+        client = ReadingProgressBufferService.get_client()
+        if client is None:
+            return {}
+        try:
+            with client.pipeline(transaction=False) as pipeline:
+                pipeline.hgetall(ReadingProgressBufferService._flushing_key(reader_id))
+                pipeline.hgetall(ReadingProgressBufferService._buffer_key(reader_id))
+                hashes = pipeline.execute()
+        except Exception:
+            logger.exception("Reading progress buffer unavailable (reader_id=%s)", reader_id)
+            return {}
+
+        buffered: Dict[uuid.UUID, ProgressEntry] = {}
+        for entries in hashes:
+            for chapter_id, entry in ReadingProgressBufferService._parse(entries):
+                buffered[chapter_id] = (
+                    entry.merge(buffered[chapter_id]) if chapter_id in buffered else entry)
+        return buffered
+
+    @staticmethod
+    def apply_entry(progress: ReadingProgress, entry: ProgressEntry) -> ReadingProgress:
+        """Apply an unflushed entry to a progress the way the flush will."""
+        progress.last_read_timestamp = max(progress.last_read_timestamp, entry.read_at)
+        position = entry.position
+        if position is not None and (
+            progress.position_updated_at is None
+            or progress.position_updated_at < position.updated_at
+        ):
+            progress.page_number = position.page_number
+            progress.scroll_position = position.scroll_position
+            progress.position_updated_at = position.updated_at
+        return progress
+
+    @staticmethod
+    def overlay(
+        reader_id: uuid.UUID, queryset: QuerySet[ReadingProgress]
+    ) -> Union[QuerySet[ReadingProgress], BufferedProgressList]:
+        """
+        The reader's progress queryset with the unflushed reads and
+        positions applied, without writing them: buffered chapters are
+        taken out of the queryset and merged back in with their buffered
+        values. Returns the queryset itself when nothing is buffered.
+        """
+        buffered = ReadingProgressBufferService.get_buffered(reader_id)
+        if not buffered:
+            return queryset
+        stored = {
+            progress.chapter_id: progress
+            for progress in queryset.filter(chapter_id__in=buffered.keys())
+        }
+        chapters = Chapter.objects.select_related("manga_title").in_bulk(
+            buffered.keys() - stored.keys())
+        progresses = []
+        for chapter_id, entry in buffered.items():
+            progress = stored.get(chapter_id)
+            if progress is None:
+                if chapter_id not in chapters:
+                    continue  # Deleted chapter, skipped by the flush too
+                progress = ReadingProgress(
+                    id=ReadingProgressBufferService.get_progress_id(reader_id, chapter_id),
+                    reader_id=reader_id,
+                    chapter=chapters[chapter_id],
+                    last_read_timestamp=entry.read_at,
+                )
+            progresses.append(ReadingProgressBufferService.apply_entry(progress, entry))
+        return BufferedProgressList(
+            queryset.exclude(chapter_id__in=buffered.keys()), progresses)
+
+    @staticmethod
+    def _encode(chapter_id: uuid.UUID, entry: ProgressEntry) -> List[str]:
+        """Hash fields and values of an entry, the timestamp first."""
+        fields = [str(chapter_id), f"{entry.read_at.timestamp():.6f}"]
+        if entry.position is not None:
+            fields.extend([
+                f"{chapter_id}{ReadingProgressBufferService.POSITION_SUFFIX}",
+                f"{entry.position.updated_at.timestamp():.6f} "
+                f"{entry.position.page_number} {entry.position.scroll_position}",
+            ])
+        return fields
+
+    @staticmethod
+    def _parse(entries: Dict[bytes, bytes]) -> Iterable[Tuple[uuid.UUID, ProgressEntry]]:
+        for field, value in entries.items():
+            chapter_id, _, kind = field.decode().partition(":")
+            timestamp, *position = value.decode().split()
+            read_at = datetime.fromtimestamp(float(timestamp), tz=dt_timezone.utc)
+            if kind:
+                page_number, scroll_position = map(int, position)
+                yield uuid.UUID(chapter_id), ProgressEntry(
+                    read_at, ReadingPosition(page_number, scroll_position, read_at))
+            else:
+                yield uuid.UUID(chapter_id), ProgressEntry(read_at)
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def flush(batch_size: int = FLUSH_BATCH_SIZE) -> int:
+        """Write the buffered progress of a batch of readers and return
+        how many readers were taken."""
+        client = ReadingProgressBufferService.get_client()
+        if client is None:
+            return 0
+        reader_ids = client.spop(ReadingProgressBufferService._dirty_key(), batch_size)
+        if not reader_ids:
+            return 0
+        ReadingProgressBufferService._flush_readers(
+            client, [uuid.UUID(reader_id.decode()) for reader_id in reader_ids])
+        return len(reader_ids)
+
+    @staticmethod
+    def flush_reader(reader_id: uuid.UUID) -> None:
+        """Write the buffered progress of one reader now: two Redis round
+        trips, plus the upsert and statistics update when entries are
+        buffered."""
+        client = ReadingProgressBufferService.get_client()
+        if client is None:
+            return
+        try:
+            ReadingProgressBufferService._flush_readers(client, [reader_id])
+        except Exception:
+            logger.exception("Failed to flush reading progress (reader_id=%s)", reader_id)
+
+    @staticmethod
+    def _flush_readers(client: "Redis", reader_ids: List[uuid.UUID]) -> None:
+        take = client.register_script(TAKE_SCRIPT)
+        try:
+            with client.pipeline(transaction=False) as pipeline:
+                for reader_id in reader_ids:
+                    take(
+                        keys=[
+                            ReadingProgressBufferService._buffer_key(reader_id),
+                            ReadingProgressBufferService._flushing_key(reader_id),
+                        ],
+                        client=pipeline,
+                    )
+                taken = pipeline.execute()
+
+            entries: ProgressEntries = {}
+            for reader_id, flat_entries in zip(reader_ids, taken):
+                pairs = dict(zip(flat_entries[::2], flat_entries[1::2]))
+                for chapter_id, entry in ReadingProgressBufferService._parse(pairs):
+                    key = (reader_id, chapter_id)
+                    entries[key] = entry.merge(entries[key]) if key in entries else entry
+            ReadingProgressBufferService.apply(entries)
+        except Exception:
+            # The flushing hashes are kept: take them again next time
+            client.sadd(
+                ReadingProgressBufferService._dirty_key(),
+                *[str(reader_id) for reader_id in reader_ids],
+            )
+            raise
+        client.delete(*[
+            ReadingProgressBufferService._flushing_key(reader_id) for reader_id in reader_ids
+        ])
+
+    @staticmethod
+    @transaction.atomic
+    def apply(entries: ProgressEntries) -> None:
+        """Upsert the progress entries and mark their titles visited/read.
+        Deleted readers and chapters are skipped."""
+        if not entries:
+            return
+        manga_title_ids = dict(
+            Chapter.objects
+            .filter(id__in={chapter_id for _, chapter_id in entries})
+            .values_list("id", "manga_title_id")
+        )
+        reader_ids = set(
+            Reader.objects
+            .filter(id__in={reader_id for reader_id, _ in entries})
+            .values_list("id", flat=True)
+        )
+        pairs = [
+            (reader_id, chapter_id) for reader_id, chapter_id in entries
+            if reader_id in reader_ids and chapter_id in manga_title_ids
+        ]
+        batch_size = connection.ops.bulk_batch_size(UPSERT_FIELDS, pairs) or len(pairs)
+        for start in range(0, len(pairs), batch_size):
+            ReadingProgressBufferService._upsert_batch([
+                (pair, entries[pair]) for pair in pairs[start:start + batch_size]
+            ])
+        ReaderStatisticsService.mark_read_many(
+            (reader_id, manga_title_ids[chapter_id]) for reader_id, chapter_id in pairs
+        )
+
+    @staticmethod
+    def _upsert_batch(
+        batch: List[Tuple[Tuple[uuid.UUID, uuid.UUID], ProgressEntry]]
+    ) -> None:
+        """
+        One INSERT ... ON CONFLICT DO UPDATE for the batch. Both the read
+        time and the position only move forward: a stale entry (e.g. an
+        update queued offline) never overwrites a newer one.
+        """
+        quote = connection.ops.quote_name
+        table = quote(ReadingProgress._meta.db_table)
+        fields = [ReadingProgress._meta.get_field(name) for name in UPSERT_FIELDS]
+        columns = ", ".join(quote(field.column) for field in fields)
+        read_at = quote("last_read_timestamp")
+        updated_at = quote("position_updated_at")
+        is_newer_position = (
+            f"EXCLUDED.{updated_at} IS NOT NULL AND (progress.{updated_at} IS NULL"
+            f" OR EXCLUDED.{updated_at} > progress.{updated_at})"
+        )
+        position_columns = [
+            f"{quote(column)} = CASE WHEN {is_newer_position}"
+            f" THEN EXCLUDED.{quote(column)} ELSE progress.{quote(column)} END"
+            for column in ("page_number", "scroll_position", "position_updated_at")
+        ]
+        query = f"""
+            INSERT INTO {table} AS progress ({columns})
+            VALUES {", ".join([f"({', '.join(['%s'] * len(fields))})"] * len(batch))}
+            ON CONFLICT ({quote("reader_id")}, {quote("chapter_id")}) DO UPDATE SET
+                {read_at} = CASE WHEN EXCLUDED.{read_at} > progress.{read_at}
+                    THEN EXCLUDED.{read_at} ELSE progress.{read_at} END,
+                {", ".join(position_columns)}
+        """
+        params = []
+        for (reader_id, chapter_id), entry in batch:
+            position = entry.position
+            values = (
+                ReadingProgressBufferService.get_progress_id(reader_id, chapter_id),
+                reader_id,
+                chapter_id,
+                entry.read_at,
+                position.page_number if position else None,
+                position.scroll_position if position else 0,
+                position.updated_at if position else None,
+            )
+            params.extend(
+                field.get_db_prep_value(value, connection)
+                for field, value in zip(fields, values)
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
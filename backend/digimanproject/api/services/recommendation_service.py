@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import heapq
 import logging
 import uuid
-from typing import Any, Dict, List
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List
 
-from django.db.models import Avg, Count, F, Q
+from django.db.models import F, Q, QuerySet
 
-from ..models.reader_models import ReadingProgress
+from ..models.manga_models import MangaTitle
 
 logger = logging.getLogger(__name__)
 
@@ -14,19 +16,49 @@ logger = logging.getLogger(__name__)
 class RecommendationService:
     """Business logic for content discovery and personalised recommendations."""
 
+    SEED_COUNT = 5
+    SEED_DECAY = 0.8  # weight of each older seed relative to the next newer one
+    BANNER_SIZE = 10
+
     # ------------------------------------------------------------------
     # Public recommendations (no auth required)
     # ------------------------------------------------------------------
 
     @staticmethod
-    def get_recommendations(manga_id: uuid.UUID, limit: int = 10):
+    def get_recommendations(manga_id: uuid.UUID, limit: int = 10) -> List[MangaTitle]:
+        """Return the manga most similar to the given manga by reader
+        behaviour (its MangaTitleSimilarity neighbours), best first.
+
+        Titles without enough neighbours yet (new or rarely read) are
+        filled up with manga sharing the same author or a genre.
+        The source manga is excluded from results.
+        """
+        from .manga_service import MangaTitleService
+
+        recommendations = list(
+            MangaTitleService.get_catalog_queryset()
+            .filter(similar_to__manga_title_id=manga_id)
+            .order_by("similar_to__rank")
+            [:limit]
+        )
+        if len(recommendations) < limit:
+            recommendations.extend(RecommendationService.get_related_titles(
+                manga_id, limit - len(recommendations),
+                exclude_ids=[manga.id for manga in recommendations],
+            ))
+        return recommendations
+
+    @staticmethod
+    def get_related_titles(
+        manga_id: uuid.UUID, limit: int = 10, exclude_ids: Iterable[uuid.UUID] = ()
+    ) -> QuerySet[MangaTitle]:
         """Return manga that share the same author or at least one genre
         as the given manga, ordered by read count (desc).
 
         The source manga is excluded from results.
         Returns an empty queryset if manga_id is not found.
         """
-        from ..models.manga_models import MangaTitle
+        from .manga_service import MangaTitleService
 
         try:
             manga = (
@@ -50,19 +82,11 @@ class RecommendationService:
             return MangaTitle.objects.none()
 
         return (
-            MangaTitle.objects
-            .filter(is_visible=True)
+            MangaTitleService.get_catalog_queryset()
             .exclude(id=manga_id)
+            .exclude(id__in=list(exclude_ids))
             .filter(sim_filter)
             .distinct()
-            .annotate(
-                computed_read_count=Count(
-                    "manga_reader_statistics",
-                    filter=Q(manga_reader_statistics__is_reader_read=True),
-                )
-            )
-            .select_related("author")
-            .prefetch_related("genres")
             .order_by("-computed_read_count")
             [:limit]
         )
@@ -74,39 +98,21 @@ class RecommendationService:
     @staticmethod
     def get_popular(limit: int = 12):
         """Return visible manga ordered by average star rating (nulls last)."""
-        from ..models.manga_models import MangaTitle
+        from .manga_service import MangaTitleService
 
         return (
-            MangaTitle.objects
-            .filter(is_visible=True)
-            .annotate(
-                avg_star=Avg(
-                    "manga_reader_statistics__star_rating",
-                    filter=Q(manga_reader_statistics__star_rating__gt=0),
-                )
-            )
-            .select_related("author")
-            .prefetch_related("genres")
-            .order_by(F("avg_star").desc(nulls_last=True))
+            MangaTitleService.get_catalog_queryset()
+            .order_by(F("computed_average_rating").desc(nulls_last=True))
             [:limit]
         )
 
     @staticmethod
     def get_most_read(limit: int = 12):
         """Return visible manga ordered by distinct reader count (desc)."""
-        from ..models.manga_models import MangaTitle
+        from .manga_service import MangaTitleService
 
         return (
-            MangaTitle.objects
-            .filter(is_visible=True)
-            .annotate(
-                computed_read_count=Count(
-                    "manga_reader_statistics",
-                    filter=Q(manga_reader_statistics__is_reader_read=True),
-                )
-            )
-            .select_related("author")
-            .prefetch_related("genres")
+            MangaTitleService.get_catalog_queryset()
             .order_by("-computed_read_count")
             [:limit]
         )
@@ -118,37 +124,76 @@ class RecommendationService:
     @staticmethod
     def get_homepage_recommendation(reader_id: uuid.UUID) -> List[Dict[str, Any]]:
         """Return ONE personalised recommendation banner based on the
-        most recently read manga in the reader's reading history.
+        reader's reading history.
 
         Steps:
-          1. Find the latest ReadingProgress entry for this reader
-             (ordered by last_read_timestamp desc).
-          2. Use the manga from that entry as the seed.
-          3. Call get_recommendations() on the seed manga.
+          1. Take the titles of the reader's SEED_COUNT latest reads
+             (newest first); the latest one is the banner's source manga.
+          2. Score the neighbours of these seeds (MangaTitleSimilarity,
+             one indexed lookup) by similarity, weighted down by the age
+             of the seed, skipping titles the reader has already read.
+          3. Without neighbours, fall back to get_recommendations() on
+             the source manga.
           4. Return a list with a single banner dict so the response
              shape stays consistent with the API contract.
 
         Returns an empty list if the reader has no reading history.
         """
-        latest_progress = (
-            ReadingProgress.objects
-            .filter(reader_id=reader_id, chapter__isnull=False)
-            .select_related("chapter__manga_title__author")
-            .prefetch_related("chapter__manga_title__genres")
-            .order_by("-last_read_timestamp")
-            .first()
+        from ..models.manga_models import MangaTitleSimilarity
+        from ..models.reader_models import MangaReaderStatistics
+        from .manga_service import MangaTitleService
+        from .reader_statistics_service import ReaderStatisticsService
+
+        seed_ids = list(
+            ReaderStatisticsService.get_reading_history(reader_id)
+            .values_list("chapter__manga_title_id", flat=True)
+            [:RecommendationService.SEED_COUNT]
         )
-        if latest_progress is None:
+        if not seed_ids:
             return []
 
-        seed_manga = latest_progress.chapter.manga_title
-        if not seed_manga or not seed_manga.is_visible:
+        # Load the seed through the catalog queryset so it is serialized
+        # from annotations like the recommendations (None if not visible)
+        seed_manga = (
+            MangaTitleService.get_catalog_queryset()
+            .filter(id=seed_ids[0])
+            .first()
+        )
+        if seed_manga is None:
             return []
 
-        recs = RecommendationService.get_recommendations(seed_manga.id, limit=10)
+        read_ids = set(
+            MangaReaderStatistics.objects
+            .filter(reader_id=reader_id, is_reader_read=True)
+            .values_list("manga_title_id", flat=True)
+        )
+        seed_weights = {
+            manga_title_id: RecommendationService.SEED_DECAY ** age
+            for age, manga_title_id in enumerate(seed_ids)
+        }
+        scores: Dict[uuid.UUID, float] = defaultdict(float)
+        for manga_title_id, similar_title_id, score in (
+            MangaTitleSimilarity.objects
+            .filter(manga_title_id__in=seed_ids)
+            .values_list("manga_title_id", "similar_title_id", "score")
+        ):
+            if similar_title_id not in read_ids and similar_title_id not in seed_weights:
+                scores[similar_title_id] += score * seed_weights[manga_title_id]
+
+        top_ids = heapq.nlargest(
+            RecommendationService.BANNER_SIZE, scores, key=scores.__getitem__)
+        if top_ids:
+            titles = MangaTitleService.get_catalog_queryset().in_bulk(top_ids)
+            recs = [titles[manga_title_id] for manga_title_id in top_ids if manga_title_id in titles]
+        else:
+            recs = [
+                manga for manga in RecommendationService.get_recommendations(
+                    seed_manga.id, limit=RecommendationService.BANNER_SIZE)
+                if manga.id not in read_ids
+            ]
         return [
             {
                 "source_manga": seed_manga,
-                "recommendations": list(recs),
+                "recommendations": recs,
             }
         ]
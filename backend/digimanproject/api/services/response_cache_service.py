@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheSections:
+    POPULAR = "homepage:popular"
+    MOST_READ = "homepage:most_read"
+    RECOMMENDATIONS = "recommendations"
+
+    ALL = (POPULAR, MOST_READ, RECOMMENDATIONS)
+
+
+class ResponseCacheService:
+    """Cache of serialized discovery payloads (homepage sections and
+    per-manga recommendations).
+
+    Each entry stores the payload with the generation it was computed for
+    and a freshness deadline. Invalidation bumps the generation instead of
+    deleting keys, so existing entries become stale but can still be served:
+    the first request to see a stale entry takes a short lock (cache.add)
+    and recomputes it while concurrent requests keep serving the stale
+    payload. Only a cold key makes other requests wait for the lock holder.
+
+    Cache failures are logged and the payload is computed directly, so a
+    Redis outage degrades to the uncached behaviour.
+    """
+
+    KEY_PREFIX = "response_cache"
+    FRESH_SECONDS = 300
+    STALE_SECONDS = 60 * 60 * 24
+    LOCK_SECONDS = 30
+    COLD_WAIT_SECONDS = 2.0
+    COLD_POLL_SECONDS = 0.05
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _entry_key(section: str, key: str) -> str:
+        return f"{ResponseCacheService.KEY_PREFIX}:entry:{section}:{key}"
+
+    @staticmethod
+    def _lock_key(section: str, key: str) -> str:
+        return f"{ResponseCacheService.KEY_PREFIX}:lock:{section}:{key}"
+
+    @staticmethod
+    def _generation_key(section: str) -> str:
+        return f"{ResponseCacheService.KEY_PREFIX}:generation:{section}"
+
+    @staticmethod
+    def _counter_key(section: str, outcome: str) -> str:
+        return f"{ResponseCacheService.KEY_PREFIX}:stats:{section}:{outcome}"
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def get_or_compute(section: str, compute: Callable[[], Any], key: str = "default") -> Any:
+        """Return the cached payload of (section, key), computing it with
+        compute() on a miss or refreshing it when stale."""
+        try:
+            generation = cache.get(ResponseCacheService._generation_key(section), 0)
+            entry = cache.get(ResponseCacheService._entry_key(section, key))
+        except Exception:
+            logger.exception("Response cache unavailable (section=%s)", section)
+            return compute()
+
+        if entry is not None:
+            is_fresh = (
+                entry["generation"] == generation
+                and entry["fresh_until"] > time.time()
+            )
+            if is_fresh:
+                ResponseCacheService._count(section, "hit")
+                return entry["payload"]
+            if not ResponseCacheService._acquire_lock(section, key):
+                # Someone else is refreshing; serve the stale payload meanwhile
+                ResponseCacheService._count(section, "stale")
+                return entry["payload"]
+            ResponseCacheService._count(section, "refresh")
+            return ResponseCacheService._refresh(section, key, generation, compute)
+
+        ResponseCacheService._count(section, "miss")
+        if ResponseCacheService._acquire_lock(section, key):
+            return ResponseCacheService._refresh(section, key, generation, compute)
+
+        # Cold key being computed by another request: wait briefly for it
+        deadline = time.monotonic() + ResponseCacheService.COLD_WAIT_SECONDS
+        try:
+            while time.monotonic() < deadline:
+                time.sleep(ResponseCacheService.COLD_POLL_SECONDS)
+                entry = cache.get(ResponseCacheService._entry_key(section, key))
+                if entry is not None:
+                    return entry["payload"]
+        except Exception:
+            logger.exception("Response cache unavailable (section=%s)", section)
+        return compute()
+
+    @staticmethod
+    def _acquire_lock(section: str, key: str) -> bool:
+        try:
+            return cache.add(
+                ResponseCacheService._lock_key(section, key), 1,
+                ResponseCacheService.LOCK_SECONDS,
+            )
+        except Exception:
+            logger.exception("Response cache lock failed (section=%s)", section)
+            return True
+
+    @staticmethod
+    def _refresh(section: str, key: str, generation: int, compute: Callable[[], Any]) -> Any:
+        try:
+            payload = compute()
+            try:
+                cache.set(
+                    ResponseCacheService._entry_key(section, key),
+                    {
+                        "payload": payload,
+                        "generation": generation,
+                        "fresh_until": time.time() + ResponseCacheService.FRESH_SECONDS,
+                    },
+                    ResponseCacheService.STALE_SECONDS,
+                )
+            except Exception:
+                logger.exception("Response cache write failed (section=%s)", section)
+            return payload
+        finally:
+            try:
+                cache.delete(ResponseCacheService._lock_key(section, key))
+            except Exception:
+                logger.exception("Response cache unlock failed (section=%s)", section)
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def invalidate(sections: Iterable[str] = ResponseCacheSections.ALL) -> None:
+        """Mark every entry of the sections stale (served until refreshed)."""
+        for section in sections:
+            generation_key = ResponseCacheService._generation_key(section)
+            try:
+                cache.add(generation_key, 0, None)
+                cache.incr(generation_key)
+            except Exception:
+                logger.exception("Response cache invalidation failed (section=%s)", section)
+
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _count(section: str, outcome: str) -> None:
+        counter_key = ResponseCacheService._counter_key(section, outcome)
+        try:
+            cache.add(counter_key, 0, None)
+            cache.incr(counter_key)
+        except Exception:
+            logger.exception("Response cache counter failed (section=%s)", section)
+
+    @staticmethod
+    def get_stats() -> Dict[str, Dict[str, int]]:
+        """Hit/miss/stale/refresh counters per section (zeroed when the
+        cache is unavailable)."""
+        outcomes = ("hit", "miss", "stale", "refresh")
+        stats = {}
+        for section in ResponseCacheSections.ALL:
+            keys = {
+                ResponseCacheService._counter_key(section, outcome): outcome
+                for outcome in outcomes
+            }
+            try:
+                values = cache.get_many(list(keys))
+            except Exception:
+                logger.exception("Response cache stats unavailable (section=%s)", section)
+                values = {}
+            counters = {outcome: int(values.get(key, 0)) for key, outcome in keys.items()}
+            lookups = counters["hit"] + counters["stale"] + counters["refresh"] + counters["miss"]
+            counters["hit_ratio"] = (
+                round((counters["hit"] + counters["stale"]) / lookups, 3) if lookups else 0.0)
+            stats[section] = counters
+        return stats
@@ -5,6 +5,7 @@ from typing import Dict, Any, Optional, Tuple
 from django.conf import settings
 from sightengine.client import SightengineClient
 
+from .image_service import ImageService
 from .system_service import ModerationThresholdService
 
 from ..utils.helper_functions import get_dominant_attribute_and_score
@@ -159,8 +160,12 @@ class SightengineService:
         - severity_score: Severity score
         """
         model_thresholds = ModerationThresholdService.get_sightengine_thresholds()
-        scores = SightengineService.moderate(image_url)
-        parsed_scores = SightengineService.parse_response(scores)
+        # Identical content was already scored: only the thresholds are reapplied
+        parsed_scores = ImageService.get_moderation_scores(image_url)
+        if parsed_scores is None:
+            scores = SightengineService.moderate(image_url)
+            parsed_scores = SightengineService.parse_response(scores)
+            ImageService.save_moderation_scores(image_url, parsed_scores)
         dominant_attribute_results = get_dominant_attribute_and_score(parsed_scores, model_thresholds)
         if not dominant_attribute_results:
             error_message = "Sightengine failed to get dominant attribute and score."
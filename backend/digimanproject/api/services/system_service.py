@@ -1,8 +1,10 @@
 import uuid
+from collections import defaultdict
 from django.db import transaction
+from django.db.models import Q
 
 from ..models.user_models import User, Reader, Administrator
-from ..models.manga_models import Comment
+from ..models.manga_models import Chapter, Comment
 from ..models.subscription_models import ReaderSubscription
 from ..models.system_models import LogEntry, FlaggedContent, ModerationThreshold, LogEntryTargetObjectType
 from ..models.common_choice_classes import ModerationStatusChoices
@@ -10,7 +12,7 @@ from ..utils.helper_functions import cast_user_to_subclass
 
 from uuid import UUID
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 TypesInModeration = (
     User, Reader, Administrator, Comment
@@ -150,8 +152,24 @@ class LogEntryService:
     def log_subscription_ended(instance: ReaderSubscription):
         LogEntryService.create_log_entry(instance.reader, LogEntry.ActionTypeChoices.ENDED, instance)
 
+    @staticmethod
+    def log_page_import(user: Optional[User], chapter: Chapter, details: Dict[str, Any]) -> LogEntry:
+        """
+        One summarized chapter update entry for pages imported in bulk
+        (bulk_create does not send the per-page post_save signals).
+        """
+        return LogEntry.objects.create(
+            user=user,
+            action_type=LogEntry.ActionTypeChoices.UPDATE,
+            target_object_type=chapter._meta.model_name,
+            target_object_id=chapter.id,
+            details={"page_import": details},
+        )
+
 
 class FlaggedContentService:
+    FLAGGED_REASONS_ATTRIBUTE = "_flagged_reasons"
+
     @staticmethod
     @transaction.atomic
     def create_flag(
@@ -217,12 +235,6 @@ class FlaggedContentService:
 
         return old_flags.count()
     
-    @staticmethod
-    def get_flagged_content_index(flagged_content: FlaggedContent) -> int:
-        return FlaggedContent.objects.filter(
-            flagged_at__lte=flagged_content.flagged_at
-        ).count()
-    
     @staticmethod
     def get_flagged_contents_by_target_object(
         target_object_type: str,
@@ -243,16 +255,71 @@ class FlaggedContentService:
         target_object_id: uuid.UUID
     ) -> List[str]:
         try:
-            flagged_contents = FlaggedContentService.get_flagged_contents_by_target_object(target_object_type, target_object_id)
-        except:         
+            return FlaggedContentService.get_flagged_reasons_by_target_objects(
+                [(target_object_type, target_object_id)]
+            )[(target_object_type, target_object_id)]
+        except Exception as e:
+            print(str(e))
             return []
-        flagged_contents = flagged_contents.filter(is_resolved=False)
-        reasons = []
-        for flagged_content in flagged_contents:
-            reasons.append(flagged_content.reason)
-        
+
+    @staticmethod
+    def get_flagged_reasons_by_target_objects(
+        targets: Iterable[Tuple[str, uuid.UUID]]
+    ) -> Dict[Tuple[str, uuid.UUID], List[str]]:
+        """
+        Unresolved flag reasons (newest first) of several target objects,
+        by (target_object_type, target_object_id), in one query.
+        """
+        ids_by_type: Dict[str, set] = defaultdict(set)
+        for target_object_type, target_object_id in targets:
+            ids_by_type[target_object_type].add(target_object_id)
+        reasons: Dict[Tuple[str, uuid.UUID], List[str]] = {
+            (target_object_type, target_object_id): []
+            for target_object_type, ids in ids_by_type.items()
+            for target_object_id in ids
+        }
+        if not reasons:
+            return reasons
+
+        targets_filter = Q()
+        for target_object_type, ids in ids_by_type.items():
+            targets_filter |= Q(target_object_type=target_object_type, target_object_id__in=ids)
+        flagged_contents = (
+            FlaggedContent.objects
+            .filter(targets_filter, is_resolved=False)
+            .values_list("target_object_type", "target_object_id", "reason")
+        )
+        for target_object_type, target_object_id, reason in flagged_contents:
+            reasons[(target_object_type, target_object_id)].append(reason)
         return reasons
 
+    @staticmethod
+    def prefetch_flagged_reasons(
+        target_objects: Iterable[Any], get_target_object_type: Callable[[Any], str]
+    ) -> None:
+        """
+        Load the flag reasons of all target objects in one query and cache
+        them on each object for get_flagged_reasons().
+        """
+        target_objects = list(target_objects)
+        reasons = FlaggedContentService.get_flagged_reasons_by_target_objects(
+            (get_target_object_type(target_object), target_object.id)
+            for target_object in target_objects
+        )
+        for target_object in target_objects:
+            setattr(
+                target_object, FlaggedContentService.FLAGGED_REASONS_ATTRIBUTE,
+                reasons[(get_target_object_type(target_object), target_object.id)])
+
+    @staticmethod
+    def get_flagged_reasons(target_object: Any, target_object_type: str) -> List[str]:
+        """Flag reasons cached by prefetch_flagged_reasons(), or queried."""
+        reasons = getattr(target_object, FlaggedContentService.FLAGGED_REASONS_ATTRIBUTE, None)
+        if reasons is not None:
+            return reasons
+        return FlaggedContentService.get_flagged_reasons_by_target_object(
+            target_object_type, target_object.id)
+
 
 class ModerationThresholdService:
     @staticmethod
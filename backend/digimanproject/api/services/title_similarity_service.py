@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import math
+import uuid
+from collections import Counter, defaultdict
+from itertools import groupby
+from operator import itemgetter
+from typing import DefaultDict, Dict, Iterator, List, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from ..models.manga_models import MangaTitle, MangaTitleSimilarity
+from ..models.reader_models import MangaReaderStatistics
+from .response_cache_service import ResponseCacheService, ResponseCacheSections
+
+logger = logging.getLogger(__name__)
+
+
+class TitleSimilarityService:
+    """
+    Item-item collaborative filtering over MangaReaderStatistics.
+
+    rebuild() streams the statistics as a sparse reader x title matrix of
+    implicit weights (read, commented, star rating), computes the cosine
+    similarity of every pair of visible titles sharing at least
+    MIN_COMMON_READERS readers and replaces the MangaTitleSimilarity table
+    with the TOP_K neighbours of each title. Only the pairs that actually
+    co-occur are accumulated, so memory grows with the co-read pairs, not
+    with readers x titles. Run periodically by rebuild_title_similarities_task.
+    """
+
+    TOP_K = 20
+    MIN_COMMON_READERS = 2
+    # Pair counting is quadratic in the titles of a reader: longer
+    # histories keep their strongest titles
+    MAX_TITLES_PER_READER = 300
+    CHUNK_SIZE = 5000
+
+    READ_WEIGHT = 1.0
+    COMMENT_WEIGHT = 0.5
+    RATING_WEIGHTS = {0: 0.0, 1: -1.0, 2: -0.5, 3: 0.0, 4: 0.5, 5: 1.0}
+
+    @staticmethod
+    def get_weight(is_reader_read: bool, is_reader_commented: bool, star_rating: int) -> float:
+        """Implicit preference of a reader for a title; 0 means none."""
+        weight = (
+            TitleSimilarityService.READ_WEIGHT * is_reader_read
+            + TitleSimilarityService.COMMENT_WEIGHT * is_reader_commented
+            + TitleSimilarityService.RATING_WEIGHTS.get(star_rating, 0.0)
+        )
+        return max(weight, 0.0)
+
+    @staticmethod
+    def iter_reader_vectors() -> Iterator[Dict[uuid.UUID, float]]:
+        """{manga_title_id: weight} of each reader (the rows of the
+        matrix), streamed in reader order."""
+        rows = (
+            MangaReaderStatistics.objects
+            .filter(manga_title__is_visible=True)
+            .filter(Q(is_reader_read=True) | Q(is_reader_commented=True) | Q(star_rating__gt=0))
+            .order_by("reader_id")
+            .values_list(
+                "reader_id", "manga_title_id",
+                "is_reader_read", "is_reader_commented", "star_rating",
+            )
+            .iterator(chunk_size=TitleSimilarityService.CHUNK_SIZE)
+        )
+        for _, reader_rows in groupby(rows, key=itemgetter(0)):
+            vector = {}
+            for _, manga_title_id, is_read, is_commented, star_rating in reader_rows:
+                weight = TitleSimilarityService.get_weight(is_read, is_commented, star_rating)
+                if weight > 0:
+                    vector[manga_title_id] = weight
+            if vector:
+                yield vector
+
+    @staticmethod
+    def compute_neighbours() -> Dict[uuid.UUID, List[Tuple[float, uuid.UUID]]]:
+        """{manga_title_id: [(score, similar_title_id), ...]} holding the
+        TOP_K neighbours of each title, best first."""
+        index: Dict[uuid.UUID, int] = {}
+        norms: DefaultDict[int, float] = defaultdict(float)
+        dots: DefaultDict[Tuple[int, int], float] = defaultdict(float)
+        common: Counter = Counter()
+
+        for vector in TitleSimilarityService.iter_reader_vectors():
+            items = [
+                (index.setdefault(manga_title_id, len(index)), weight)
+                for manga_title_id, weight in vector.items()
+            ]
+            if len(items) > TitleSimilarityService.MAX_TITLES_PER_READER:
+                items = heapq.nlargest(
+                    TitleSimilarityService.MAX_TITLES_PER_READER, items, key=itemgetter(1))
+            items.sort()
+            for position, (a, weight_a) in enumerate(items):
+                norms[a] += weight_a * weight_a
+                for b, weight_b in items[position + 1:]:
+                    dots[(a, b)] += weight_a * weight_b
+                    common[(a, b)] += 1
+
+        # Bounded min-heaps of (score, title index) per title
+        heaps: DefaultDict[int, List[Tuple[float, int]]] = defaultdict(list)
+        for (a, b), dot in dots.items():
+            if common[(a, b)] < TitleSimilarityService.MIN_COMMON_READERS:
+                continue
+            score = dot / math.sqrt(norms[a] * norms[b])
+            for source, target in ((a, b), (b, a)):
+                heap = heaps[source]
+                if len(heap) < TitleSimilarityService.TOP_K:
+                    heapq.heappush(heap, (score, target))
+                elif heap[0] < (score, target):
+                    heapq.heapreplace(heap, (score, target))
+
+        titles = list(index)
+        return {
+            titles[source]: [
+                (score, titles[target]) for score, target in sorted(heap, reverse=True)
+            ]
+            for source, heap in heaps.items()
+        }
+
+    @staticmethod
+    def rebuild() -> int:
+        """Replace the similarity table in one transaction and return the
+        number of rows written."""
+        neighbours = TitleSimilarityService.compute_neighbours()
+        with transaction.atomic():
+            # Skip titles deleted while computing
+            existing_ids = set(
+                MangaTitle.objects.filter(id__in=neighbours).values_list("id", flat=True))
+            similarities = [
+                MangaTitleSimilarity(
+                    manga_title_id=manga_title_id,
+                    similar_title_id=similar_title_id,
+                    score=score,
+                    rank=rank,
+                )
+                for manga_title_id, items in neighbours.items()
+                if manga_title_id in existing_ids
+                for rank, (score, similar_title_id) in enumerate(
+                    (item for item in items if item[1] in existing_ids), start=1)
+            ]
+            MangaTitleSimilarity.objects.all().delete()
+            MangaTitleSimilarity.objects.bulk_create(similarities, batch_size=1000)
+            transaction.on_commit(lambda: ResponseCacheService.invalidate(
+                [ResponseCacheSections.RECOMMENDATIONS]))
+        logger.info(
+            "Rebuilt title similarities: %d rows for %d titles",
+            len(similarities), len(existing_ids))
+        return len(similarities)
@@ -3,9 +3,10 @@ from rest_framework.request import Request
 
 from ..models.user_models import User, Reader, Administrator, RoleChoices
 from ..models.common_choice_classes import ModerationStatusChoices
-from ..services.image_service import ImageService, BucketNames
+from ..services.image_service import (
+    ImageService, ImageVariantService, ImageVariantTargets, BucketNames)
 from .system_service import LogEntryService
-from ..tasks import enqueue_moderation_task
+from ..tasks import enqueue_moderation_task, enqueue_image_variants_task
 
 from typing import Union
 
@@ -59,6 +60,11 @@ class UserService:
             # Run moderation pipeline after transaction
             transaction.on_commit(lambda: enqueue_moderation_task(entry.id))
 
+            # Generate resized avatar variants after transaction
+            if avatar_url:
+                transaction.on_commit(lambda: enqueue_image_variants_task(
+                    ImageVariantTargets.AVATAR, user.id))
+
         return user
 
     @staticmethod
@@ -77,11 +83,13 @@ class UserService:
             # Upload new avatar
             new_avatar_url = ImageService.upload_image(avatar_file, bucket)
 
-            # Delete old avatar if it exists
+            # Delete old avatar and its variants if it exists
             if user.avatar:
                 ImageService.delete_image(user.avatar, bucket)
+            ImageVariantService.delete_variants(user.avatar_variants, bucket)
 
             data["avatar"] = new_avatar_url
+            data["avatar_variants"] = {}
 
         # Encrypt password
         new_password = data.pop("password", None)
@@ -101,6 +109,11 @@ class UserService:
 
             # Run moderation pipeline after transaction
             transaction.on_commit(lambda: enqueue_moderation_task(entry.id))
+
+            # Generate resized avatar variants after transaction
+            if avatar_file:
+                transaction.on_commit(lambda: enqueue_image_variants_task(
+                    ImageVariantTargets.AVATAR, user.id))
         return user
 
     @staticmethod
@@ -121,6 +134,7 @@ class UserService:
         # Delete avatar if it exists
         if user.avatar:
             ImageService.delete_image(user.avatar, BucketNames.USER_AVATARS)
+        ImageVariantService.delete_variants(user.avatar_variants, BucketNames.USER_AVATARS)
         
         # Delete user and log deletion
         user.delete()
@@ -2,3 +2,5 @@ from .auth_signals import *
 from .user_signals import *
 from .manga_signals import *
 from .reader_signals import *
+from .cache_signals import *
+from .entitlement_signals import *
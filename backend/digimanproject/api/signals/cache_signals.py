@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from ..models.manga_models import MangaTitle, Chapter
+from ..models.reader_models import MangaReaderStatistics
+from ..services.response_cache_service import ResponseCacheService
+
+# Reader statistics fields that feed the cached rankings (is_reader_visited
+# changes on every visit and must not invalidate anything)
+RANKING_STATISTICS_FIELDS = {"is_reader_read", "star_rating"}
+
+
+def invalidate_response_cache() -> None:
+    # After commit, so a concurrent refresh cannot cache the old rows again
+    transaction.on_commit(ResponseCacheService.invalidate)
+
+
+@receiver(post_save, sender=MangaReaderStatistics)
+def invalidate_cache_on_statistics_save(
+    sender, instance: MangaReaderStatistics, created: bool, update_fields=None, **kwargs
+):
+    if created:
+        if instance.is_reader_read or instance.star_rating:
+            invalidate_response_cache()
+    elif update_fields is None or RANKING_STATISTICS_FIELDS & set(update_fields):
+        invalidate_response_cache()
+
+@receiver(post_delete, sender=MangaReaderStatistics)
+def invalidate_cache_on_statistics_delete(sender, instance: MangaReaderStatistics, **kwargs):
+    invalidate_response_cache()
+
+@receiver(post_save, sender=MangaTitle)
+def invalidate_cache_on_manga_title_save(sender, instance: MangaTitle, **kwargs):
+    invalidate_response_cache()
+
+@receiver(post_delete, sender=MangaTitle)
+def invalidate_cache_on_manga_title_delete(sender, instance: MangaTitle, **kwargs):
+    invalidate_response_cache()
+
+@receiver(post_save, sender=Chapter)
+def invalidate_cache_on_chapter_save(sender, instance: Chapter, **kwargs):
+    invalidate_response_cache()
+
+@receiver(post_delete, sender=Chapter)
+def invalidate_cache_on_chapter_delete(sender, instance: Chapter, **kwargs):
+    invalidate_response_cache()
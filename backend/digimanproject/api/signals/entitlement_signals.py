@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from ..models.subscription_models import SubscriptionPlan, ReaderSubscription
+from ..models.user_models import User, Reader, Administrator
+from ..services.entitlement_service import EntitlementService
+
+
+@receiver(post_save, sender=ReaderSubscription)
+@receiver(post_delete, sender=ReaderSubscription)
+def invalidate_entitlements_on_subscription_change(
+    sender, instance: ReaderSubscription, **kwargs
+):
+    # Covers the Stripe webhook handlers, which update the subscription
+    # inside a transaction: drop the entry once the change is visible
+    reader_id = instance.reader_id
+    transaction.on_commit(lambda: EntitlementService.invalidate(reader_id))
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Reader)
+@receiver(post_save, sender=Administrator)
+def invalidate_entitlements_on_role_change(
+    sender, instance: User, created: bool, update_fields=None, **kwargs
+):
+    if created:
+        return
+    if update_fields is None or "role" in update_fields:
+        user_id = instance.id
+        transaction.on_commit(lambda: EntitlementService.invalidate(user_id))
+
+@receiver(post_save, sender=SubscriptionPlan)
+@receiver(post_delete, sender=SubscriptionPlan)
+def invalidate_entitlements_on_plan_change(sender, instance: SubscriptionPlan, **kwargs):
+    transaction.on_commit(EntitlementService.invalidate_all)
@@ -1,13 +1,45 @@
-from django.db.models.signals import post_save, post_delete
+from typing import List
+
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
 from ..models.manga_models import MangaTitle, Chapter, Page, Genre, Author, Comment
 from ..services.system_service import LogEntryService
+from ..services.manga_title_statistics_service import MangaTitleStatisticsService
+from ..services.manga_search_service import MangaTitleSearchService
 
 
 @receiver(post_save, sender=MangaTitle)
 def log_manga_title_save(sender, instance: MangaTitle, created: bool, **kwargs):
     LogEntryService.log_object_save(instance, created)
 
+@receiver(post_save, sender=MangaTitle)
+def create_manga_title_statistics(sender, instance: MangaTitle, created: bool, **kwargs):
+    if created:
+        MangaTitleStatisticsService.create_statistics(instance)
+
+@receiver(post_save, sender=MangaTitle)
+def update_manga_title_search_vector(sender, instance: MangaTitle, **kwargs):
+    MangaTitleSearchService.update_search_vectors([instance.id])
+
+@receiver(m2m_changed, sender=MangaTitle.genres.through)
+def update_search_vector_on_genres_change(
+    sender, instance, action: str, reverse: bool, pk_set=None, **kwargs
+):
+    if reverse and action == "pre_clear":
+        # The affected titles are gone from the relation after clearing
+        instance._search_manga_title_ids = list(
+            instance.manga_titles.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        MangaTitleSearchService.update_search_vectors([instance.pk])
+    elif action == "post_clear":
+        MangaTitleSearchService.update_search_vectors(
+            getattr(instance, "_search_manga_title_ids", []))
+    else:
+        MangaTitleSearchService.update_search_vectors(pk_set or [])
+
 @receiver(post_delete, sender=MangaTitle)
 def log_manga_title_delete(sender, instance: MangaTitle, **kwargs):
     LogEntryService.log_object_delete(instance)
@@ -20,6 +52,30 @@ def log_chapter_save(sender, instance: Chapter, created: bool, **kwargs):
 def log_chapter_delete(sender, instance: Chapter, **kwargs):
     LogEntryService.log_object_delete(instance)
 
+def pop_previous_manga_title_ids(instance, created: bool, update_fields) -> List:
+    """[previous title] if the save moved the chapter/comment to another
+    title (empty otherwise). The instance then tracks its new title."""
+    previous = getattr(instance, "_loaded_manga_title_id", instance.manga_title_id)
+    if update_fields is not None and not {"manga_title", "manga_title_id"} & set(update_fields):
+        return []
+    instance._loaded_manga_title_id = instance.manga_title_id
+    return [previous] if not created and previous != instance.manga_title_id else []
+
+@receiver(post_save, sender=Chapter)
+def update_statistics_on_chapter_save(
+    sender, instance: Chapter, created: bool, update_fields=None, **kwargs
+):
+    previous_ids = pop_previous_manga_title_ids(instance, created, update_fields)
+    if created:
+        MangaTitleStatisticsService.chapter_added(instance)
+    else:
+        MangaTitleStatisticsService.chapter_changed(
+            instance.manga_title_id, *previous_ids)
+
+@receiver(post_delete, sender=Chapter)
+def update_statistics_on_chapter_delete(sender, instance: Chapter, **kwargs):
+    MangaTitleStatisticsService.chapter_removed(instance)
+
 @receiver(post_save, sender=Page)
 def log_page_save(sender, instance: Page, created: bool, **kwargs):
     LogEntryService.log_object_save(instance, created)
@@ -36,6 +92,22 @@ def log_genre_save(sender, instance: Genre, created: bool, **kwargs):
 def log_genre_delete(sender, instance: Genre, **kwargs):
     LogEntryService.log_object_delete(instance)
 
+@receiver(post_save, sender=Genre)
+def update_search_vectors_on_genre_save(sender, instance: Genre, created: bool, **kwargs):
+    if not created:
+        MangaTitleSearchService.update_search_vectors(
+            instance.manga_titles.values_list("id", flat=True))
+
+@receiver(pre_delete, sender=Genre)
+def collect_search_titles_on_genre_delete(sender, instance: Genre, **kwargs):
+    instance._search_manga_title_ids = list(
+        instance.manga_titles.values_list("id", flat=True))
+
+@receiver(post_delete, sender=Genre)
+def update_search_vectors_on_genre_delete(sender, instance: Genre, **kwargs):
+    MangaTitleSearchService.update_search_vectors(
+        getattr(instance, "_search_manga_title_ids", []))
+
 @receiver(post_save, sender=Author)
 def log_author_save(sender, instance: Author, created: bool, **kwargs):
     LogEntryService.log_object_save(instance, created)
@@ -44,9 +116,40 @@ def log_author_save(sender, instance: Author, created: bool, **kwargs):
 def log_author_delete(sender, instance: Author, **kwargs):
     LogEntryService.log_object_delete(instance)
 
+@receiver(post_save, sender=Author)
+def update_search_vectors_on_author_save(sender, instance: Author, created: bool, **kwargs):
+    if not created:
+        MangaTitleSearchService.update_search_vectors(
+            instance.manga_titles.values_list("id", flat=True))
+
+@receiver(pre_delete, sender=Author)
+def collect_search_titles_on_author_delete(sender, instance: Author, **kwargs):
+    instance._search_manga_title_ids = list(
+        instance.manga_titles.values_list("id", flat=True))
+
+@receiver(post_delete, sender=Author)
+def update_search_vectors_on_author_delete(sender, instance: Author, **kwargs):
+    MangaTitleSearchService.update_search_vectors(
+        getattr(instance, "_search_manga_title_ids", []))
+
 @receiver(post_delete, sender=Comment)
 def log_comment_delete(sender, instance: Comment, **kwargs):
     if getattr(instance, "_action_user", None) is None:
         instance._action_user = instance.owner
     LogEntryService.log_object_delete(instance)
-    
\ No newline at end of file
+
+@receiver(post_save, sender=Comment)
+def update_statistics_on_comment_save(
+    sender, instance: Comment, created: bool, update_fields=None, **kwargs
+):
+    previous_ids = pop_previous_manga_title_ids(instance, created, update_fields)
+    if created:
+        MangaTitleStatisticsService.comment_added(instance)
+    elif previous_ids:
+        MangaTitleStatisticsService.comments_moved([*previous_ids, instance.manga_title_id])
+    elif update_fields is None or "moderation_status" in update_fields:
+        MangaTitleStatisticsService.comment_moderation_changed(instance.manga_title_id)
+
+@receiver(post_delete, sender=Comment)
+def update_statistics_on_comment_delete(sender, instance: Comment, **kwargs):
+    MangaTitleStatisticsService.comment_removed(instance)
@@ -1,10 +1,10 @@
 import logging
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from ..models.manga_models import Comment
-from ..models.reader_models import ReadingProgress
+from ..models.reader_models import ReadingProgress, MangaReaderStatistics
 from ..models.user_models import RoleChoices
 
 logger = logging.getLogger(__name__)
@@ -16,7 +16,9 @@ def on_reading_progress_saved(
 ) -> None:
     """On first save of a ReadingProgress entry, automatically mark the
     reader as having visited and read the associated manga title.
-    Subsequent saves (timestamp updates) are ignored."""
+    Subsequent saves (timestamp updates) are ignored. Progress flushed from
+    the reading progress buffer is bulk upserted without signals; the flush
+    marks the statistics itself."""
     if not created:
         return
     try:
@@ -25,8 +27,10 @@ def on_reading_progress_saved(
             return
         manga_title = chapter.get_manga_title()
         from ..services.reader_statistics_service import ReaderStatisticsService
-        ReaderStatisticsService.mark_visited(instance.reader_id, manga_title.id)
-        ReaderStatisticsService.mark_read(instance.reader_id, manga_title.id)
+        ReaderStatisticsService.upsert_statistics(
+            instance.reader_id, manga_title.id,
+            is_reader_visited=True, is_reader_read=True,
+        )
     except Exception:
         logger.exception(
             "Failed to update MangaReaderStatistics after ReadingProgress "
@@ -58,3 +62,12 @@ def on_comment_created(
             "Failed to update MangaReaderStatistics after Comment "
             "created (comment_id=%s)", instance.id
         )
+
+
+@receiver(post_delete, sender=MangaReaderStatistics)
+def on_manga_reader_statistics_deleted(
+    sender, instance: MangaReaderStatistics, **kwargs
+) -> None:
+    """Remove a deleted entry's read and rating from the title counters."""
+    from ..services.manga_title_statistics_service import MangaTitleStatisticsService
+    MangaTitleStatisticsService.reader_statistics_removed(instance)
@@ -0,0 +1,38 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .base import StorageBackend
+from .local_backend import LocalStorageBackend
+from .supabase_backend import SupabaseStorageBackend
+
+
+class StorageBackendNames:
+    SUPABASE = "supabase"
+    LOCAL = "local"
+
+
+@lru_cache(maxsize=None)
+def get_storage_backend() -> StorageBackend:
+    """The storage backend selected by settings.STORAGE_BACKEND (one
+    instance per process, so connections are reused)."""
+    name = settings.STORAGE_BACKEND
+    if name == StorageBackendNames.SUPABASE:
+        return SupabaseStorageBackend(
+            resumable_threshold=settings.RESUMABLE_UPLOAD_THRESHOLD,
+            max_connections=settings.STORAGE_MAX_CONNECTIONS,
+        )
+    if name == StorageBackendNames.LOCAL:
+        return LocalStorageBackend(settings.LOCAL_STORAGE_ROOT, settings.LOCAL_STORAGE_URL)
+    raise ValueError(f"Invalid STORAGE_BACKEND: {name}")
+
+
+@receiver(setting_changed)
+def reset_storage_backend(setting: str, **kwargs) -> None:
+    if setting in {
+        "STORAGE_BACKEND", "LOCAL_STORAGE_ROOT", "LOCAL_STORAGE_URL",
+        "RESUMABLE_UPLOAD_THRESHOLD", "STORAGE_MAX_CONNECTIONS",
+    }:
+        get_storage_backend.cache_clear()
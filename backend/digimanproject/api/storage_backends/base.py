@@ -0,0 +1,43 @@
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterable, Optional
+
+
+class StorageBackend(ABC):
+    """
+    Object storage used for images (avatars, covers, pages, comment images).
+
+    Objects are addressed by bucket and path; get_public_url() gives the URL
+    stored on the models and get_object_path() maps such a URL back to its
+    path. Implementations must be safe to use from several threads.
+    """
+
+    @abstractmethod
+    def upload(
+        self, bucket: str, path: str, file: BinaryIO, size: int,
+        content_type: str, upsert: bool = False,
+    ) -> None:
+        """Store size bytes read from file (streamed, not read at once)."""
+
+    @abstractmethod
+    def download(self, bucket: str, path: str) -> bytes:
+        """Content of a stored object."""
+
+    @abstractmethod
+    def open(self, bucket: str, path: str) -> BinaryIO:
+        """Readable stream of a stored object, to be closed by the caller."""
+
+    @abstractmethod
+    def delete(self, bucket: str, path: str) -> None:
+        """Delete an object."""
+
+    @abstractmethod
+    def delete_many(self, bucket: str, paths: Iterable[str]) -> None:
+        """Delete several objects of a bucket in as few calls as possible."""
+
+    @abstractmethod
+    def get_public_url(self, bucket: str, path: str) -> str:
+        """Public URL of an object."""
+
+    @abstractmethod
+    def get_object_path(self, public_url: str, bucket: str) -> Optional[str]:
+        """Path of the object behind a public URL of the bucket, or None."""
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional
+from urllib.parse import quote, unquote, urlparse
+
+from .base import StorageBackend
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Stores objects as files under <root>/<bucket>/<path>, served from
+    <base_url><bucket>/<path>. Meant for development, CI and load tests.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, root: str, base_url: str) -> None:
+        self.root = Path(root).resolve()
+        self.base_url = base_url if base_url.endswith("/") else f"{base_url}/"
+
+    def get_file_path(self, bucket: str, path: str) -> Path:
+        file_path = (self.root / bucket / path).resolve()
+        if self.root / bucket not in file_path.parents:
+            raise ValueError(f"Invalid object path: {path}")
+        return file_path
+
+    def upload(
+        self, bucket: str, path: str, file: BinaryIO, size: int,
+        content_type: str, upsert: bool = False,
+    ) -> None:
+        file_path = self.get_file_path(bucket, path)
+        if file_path.exists() and not upsert:
+            raise FileExistsError(f"Object '{path}' already exists in bucket '{bucket}'.")
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write next to the target and move it into place, so readers
+        # never see a partial object
+        descriptor, temp_name = tempfile.mkstemp(dir=file_path.parent, suffix=".part")
+        try:
+            with os.fdopen(descriptor, "wb") as target:
+                shutil.copyfileobj(file, target, self.CHUNK_SIZE)
+            os.replace(temp_name, file_path)
+        except BaseException:
+            try:
+                os.remove(temp_name)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def download(self, bucket: str, path: str) -> bytes:
+        return self.get_file_path(bucket, path).read_bytes()
+
+    def open(self, bucket: str, path: str) -> BinaryIO:
+        return open(self.get_file_path(bucket, path), "rb")
+
+    def delete(self, bucket: str, path: str) -> None:
+        # Like Supabase, deleting a missing object is not an error
+        self.get_file_path(bucket, path).unlink(missing_ok=True)
+
+    def delete_many(self, bucket: str, paths: Iterable[str]) -> None:
+        for path in paths:
+            self.get_file_path(bucket, path).unlink(missing_ok=True)
+
+    def get_public_url(self, bucket: str, path: str) -> str:
+        return f"{self.base_url}{bucket}/{quote(path)}"
+
+    def get_object_path(self, public_url: str, bucket: str) -> Optional[str]:
+        prefix = urlparse(f"{self.base_url}{bucket}/").path
+        url_path = urlparse(public_url or "").path
+        if not url_path.startswith(prefix) or url_path == prefix:
+            return None
+        return unquote(url_path[len(prefix):])
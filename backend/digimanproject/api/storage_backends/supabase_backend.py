@@ -0,0 +1,89 @@
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, List, Optional
+from urllib.request import urlopen
+
+import httpx
+
+from ..utils.resumable_upload_client import ResumableUploadClient
+from .base import StorageBackend
+
+
+class SupabaseStorageBackend(StorageBackend):
+    """
+    Supabase Storage. The Supabase client and the HTTP client of resumable
+    uploads are created once per process and reused (connection pooling,
+    at most max_connections concurrent connections).
+
+    Files of resumable_threshold bytes or more are sent with resumable
+    uploads; smaller files spooled to disk by Django are streamed from
+    their temporary file, other small files are sent as bytes.
+    """
+
+    TIMEOUT_SECONDS = 60
+    DELETE_BATCH_SIZE = 1000
+
+    def __init__(
+        self, resumable_threshold: int, max_connections: int,
+        client: Any = None, http_client: Optional[httpx.Client] = None,
+    ) -> None:
+        if client is None:
+            from ..utils.supabase_client import supabase as client
+        if http_client is None:
+            http_client = httpx.Client(
+                timeout=self.TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections),
+            )
+        self.client = client
+        self.resumable_threshold = resumable_threshold
+        self.resumable_upload_client = ResumableUploadClient(http_client)
+
+    def upload(
+        self, bucket: str, path: str, file: BinaryIO, size: int,
+        content_type: str, upsert: bool = False,
+    ) -> None:
+        if size >= self.resumable_threshold:
+            self.resumable_upload_client.upload(
+                file, bucket, path, size, content_type, upsert)
+            return
+
+        temporary_file_path = getattr(file, "temporary_file_path", None)
+        content = Path(temporary_file_path()) if temporary_file_path else file.read()
+        options = {"content-type": content_type}
+        if upsert:
+            options["upsert"] = "true"
+        response: dict = self.client.storage.from_(bucket).upload(path, content, options)
+        # Check if the upload was successful
+        if hasattr(response, "error") and response.error:
+            raise Exception(response["error"]["message"])
+
+    def download(self, bucket: str, path: str) -> bytes:
+        return self.client.storage.from_(bucket).download(path)
+
+    def open(self, bucket: str, path: str) -> BinaryIO:
+        return urlopen(self.get_public_url(bucket, path), timeout=self.TIMEOUT_SECONDS)
+
+    def delete(self, bucket: str, path: str) -> None:
+        response: dict = self.client.storage.from_(bucket).remove([path])
+        if hasattr(response, "error") and response.error:
+            raise RuntimeError(response["error"]["message"])
+
+    def delete_many(self, bucket: str, paths: Iterable[str]) -> None:
+        paths: List[str] = list(paths)
+        for start in range(0, len(paths), self.DELETE_BATCH_SIZE):
+            self.delete_batch(bucket, paths[start:start + self.DELETE_BATCH_SIZE])
+
+    def delete_batch(self, bucket: str, paths: List[str]) -> None:
+        response: dict = self.client.storage.from_(bucket).remove(paths)
+        if hasattr(response, "error") and response.error:
+            raise RuntimeError(response["error"]["message"])
+
+    def get_public_url(self, bucket: str, path: str) -> str:
+        return self.client.storage.from_(bucket).get_public_url(path)
+
+    def get_object_path(self, public_url: str, bucket: str) -> Optional[str]:
+        marker = f"/object/public/{bucket}/"
+        if not public_url or marker not in public_url:
+            return None
+        return public_url.split(marker, 1)[1].split("?", 1)[0]
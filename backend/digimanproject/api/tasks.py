@@ -1,8 +1,12 @@
+import logging
+
 from celery import shared_task
 from celery.exceptions import MaxRetriesExceededError, SoftTimeLimitExceeded
 from .services.ai_moderation_service import AIModerationService, ModerationCleanupService
 from uuid import UUID
 
+logger = logging.getLogger(__name__)
+
 @shared_task(
     bind=True, 
     max_retries=3,
@@ -30,3 +34,60 @@ def enqueue_moderation_task(entry_id: UUID):
         run_moderation_pipeline_task.delay(str(entry_id))
     except Exception as e:
         AIModerationService.set_moderation_failed_attempt(entry_id, str(e), is_failed_permanently=True)
+
+@shared_task(ignore_result=True)
+def flush_reading_progress_task():
+    from .services.reading_progress_buffer_service import ReadingProgressBufferService
+    # A full batch may leave more buffered readers: keep flushing
+    if ReadingProgressBufferService.flush() >= ReadingProgressBufferService.FLUSH_BATCH_SIZE:
+        flush_reading_progress_task.delay()
+
+@shared_task(ignore_result=True)
+def rebuild_title_similarities_task():
+    from .services.title_similarity_service import TitleSimilarityService
+    TitleSimilarityService.rebuild()
+
+@shared_task(
+    bind=True,
+    max_retries=3,
+    soft_time_limit=120,
+    time_limit=180,
+    ignore_result=True,
+)
+def generate_image_variants_task(self, target: str, object_id: UUID):
+    from .services.image_service import ImageVariantService
+    try:
+        ImageVariantService.refresh_variants(target, object_id)
+    except SoftTimeLimitExceeded:
+        logger.error(
+            "Image variants timed out (target=%s, object_id=%s)", target, object_id)
+    except Exception as exc:
+        try:
+            raise self.retry(exc=exc, countdown=30)
+        except MaxRetriesExceededError:
+            logger.exception(
+                "Image variants failed (target=%s, object_id=%s)", target, object_id)
+
+def enqueue_image_variants_task(target: str, object_id: UUID):
+    """Clients fall back to the original image until the variants exist."""
+    try:
+        generate_image_variants_task.delay(target, str(object_id))
+    except Exception:
+        logger.exception(
+            "Failed to enqueue image variants (target=%s, object_id=%s)",
+            target, object_id,
+        )
+
+@shared_task(ignore_result=True)
+def drain_outbox_task():
+    from .services.outbox_service import OutboxService
+    # A full batch may leave more due events: keep draining
+    if OutboxService.drain() >= OutboxService.BATCH_SIZE:
+        enqueue_drain_outbox_task()
+
+def enqueue_drain_outbox_task():
+    """Pending events are also picked up by the periodic drain."""
+    try:
+        drain_outbox_task.delay()
+    except Exception:
+        logger.exception("Failed to enqueue outbox drain")
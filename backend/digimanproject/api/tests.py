@@ -1,3 +1,1412 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+import uuid
+import zipfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import connection, transaction
+from django.template.defaultfilters import filesizeformat
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from redis import Redis
+from redis.exceptions import RedisError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from .models.common_choice_classes import ModerationStatusChoices
+from .models.manga_models import (
+    Author, MangaTitle, MangaTitleStatistics, MangaTitleSimilarity, Chapter, Page, Comment,
+)
+from .models.reader_models import MangaReaderStatistics, ReadingProgress
+from .models.subscription_models import SubscriptionPlan, ReaderSubscription
+from .models.system_models import FlaggedContent, LogEntry, OutboxEvent, StoredImage
+from .models.user_models import Administrator, Reader, RoleChoices
+from .paginations.keyset_paginations import KeysetPagination, OptInKeysetPagination
+from .services.image_service import ImageService, ImageVariantService, ImageVariantTargets, BucketNames
+from .services.manga_search_service import MangaTitleSearchService
+from .services.manga_service import CommentService, MangaTitleService
+from .services.manga_title_statistics_service import MangaTitleStatisticsService
+from .services.offline_package_service import OfflinePackageService
+from .services.outbox_service import OutboxService
+from .services.reader_statistics_service import ReaderStatisticsService, StatisticsUpdate
+from .services.reading_progress_buffer_service import (
+    ProgressEntry, ReadingPosition, ReadingProgressBufferService,
+)
+from .services.recommendation_service import RecommendationService
+from .services.response_cache_service import ResponseCacheService, ResponseCacheSections
+from .services.title_similarity_service import TitleSimilarityService
+from .storage_backends import get_storage_backend
+from .storage_backends.supabase_backend import SupabaseStorageBackend
+from .utils.resumable_upload_client import ResumableUploadClient
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+REDIS_CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": settings.DJANGO_REDIS_URL,
+        "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+    }
+}
+
+
+class MangaTitleCatalogQueryCountTests(TestCase):
+    """The catalog endpoints must cost a constant number of queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = Author.objects.create(name="Author")
+        self.reader = Reader.objects.create(username="reader", email="reader@example.com")
+        self.title_count = 0
+
+    def create_titles(self, amount: int) -> None:
+        for _ in range(amount):
+            self.title_count += 1
+            manga = MangaTitle.objects.create(
+                title=f"Manga {self.title_count}", author=self.author)
+            for number in range(1, 4):
+                Chapter.objects.create(manga_title=manga, chapter_number=number)
+            Comment.objects.create(manga_title=manga, owner=self.reader, text="Nice")
+            ReaderStatisticsService.mark_read(self.reader.id, manga.id)
+            ReaderStatisticsService.set_star_rating(self.reader.id, manga.id, 4)
+
+    def count_queries(self, url: str) -> int:
+        cache.clear()  # measure the uncached computation
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assert_constant_queries(self, url: str) -> None:
+        self.create_titles(2)
+        small_page_queries = self.count_queries(url)
+        self.create_titles(8)
+        large_page_queries = self.count_queries(url)
+        self.assertEqual(small_page_queries, large_page_queries)
+
+    def test_manga_title_list_query_count_is_constant(self):
+        self.assert_constant_queries("/api/manga-titles/")
+
+    def test_homepage_popular_query_count_is_constant(self):
+        self.assert_constant_queries("/api/homepage/popular/")
+
+    def test_homepage_most_read_query_count_is_constant(self):
+        self.assert_constant_queries("/api/homepage/most-read/")
+
+    def test_manga_title_list_values_match_per_object_queries(self):
+        self.create_titles(1)
+        data = self.client.get("/api/manga-titles/").json()["results"][0]
+        manga = MangaTitle.objects.get(id=data["id"])
+        self.assertEqual(data["chapter_count"], manga.get_chapter_count())
+        self.assertEqual(data["comment_count"], manga.get_comment_count())
+        self.assertEqual(data["average_rating"], 4.0)
+        self.assertEqual(data["read_count"], 1)
+        self.assertEqual(data["author_name"], "Author")
+
+
+class MangaTitleStatisticsTests(TestCase):
+    """Incremental counter updates must match a full recount."""
+
+    def setUp(self):
+        self.reader = Reader.objects.create(username="reader", email="reader@example.com")
+        self.other_reader = Reader.objects.create(username="other", email="other@example.com")
+        self.manga = MangaTitle.objects.create(title="Manga")
+
+    def get_statistics(self) -> MangaTitleStatistics:
+        return MangaTitleStatistics.objects.get(manga_title=self.manga)
+
+    def test_counters_follow_writes(self):
+        first = Chapter.objects.create(manga_title=self.manga, chapter_number=1)
+        Chapter.objects.create(manga_title=self.manga, chapter_number=2)
+        comment = Comment.objects.create(manga_title=self.manga, owner=self.reader, text="Hi")
+        ReaderStatisticsService.mark_read(self.reader.id, self.manga.id)
+        ReaderStatisticsService.mark_read(self.reader.id, self.manga.id)
+        ReaderStatisticsService.set_star_rating(self.reader.id, self.manga.id, 5)
+        ReaderStatisticsService.set_star_rating(self.other_reader.id, self.manga.id, 2)
+        ReaderStatisticsService.set_star_rating(self.other_reader.id, self.manga.id, 4)
+
+        stats = self.get_statistics()
+        self.assertEqual(stats.chapter_count, 2)
+        self.assertEqual(stats.comment_count, 1)
+        self.assertEqual(stats.read_count, 1)
+        self.assertEqual(stats.rating_count, 2)
+        self.assertEqual(stats.average_rating, 4.5)
+
+        first.delete()
+        comment.delete()
+        self.assertEqual(self.get_statistics().chapter_count, 1)
+        self.assertEqual(self.get_statistics().comment_count, 0)
+        self.assertEqual(MangaTitleStatisticsService.find_drift(), [])
+
+    def test_moves_recount_both_titles(self):
+        other = MangaTitle.objects.create(title="Other")
+        Chapter.objects.create(manga_title=self.manga, chapter_number=1)
+        Comment.objects.create(manga_title=self.manga, owner=self.reader, text="Hi")
+
+        chapter = Chapter.objects.get(manga_title=self.manga)
+        chapter.manga_title = other
+        chapter.save()
+        comment = Comment.objects.get(manga_title=self.manga)
+        comment.manga_title = other
+        comment.save(update_fields=["manga_title"])
+
+        self.assertEqual(
+            (self.get_statistics().chapter_count, self.get_statistics().comment_count), (0, 0))
+        other_stats = MangaTitleStatistics.objects.get(manga_title=other)
+        self.assertEqual((other_stats.chapter_count, other_stats.comment_count), (1, 1))
+        self.assertEqual(MangaTitleStatisticsService.find_drift(), [])
+
+    def test_upserts_merge_flags_in_one_statement(self):
+        ReaderStatisticsService.mark_commented(self.reader.id, self.manga.id)
+        with CaptureQueriesContext(connection) as context:
+            stats = ReaderStatisticsService.mark_visited(self.reader.id, self.manga.id)
+        self.assertEqual(
+            [query["sql"].split()[0] for query in context.captured_queries
+             if "mangareaderstatistics" in query["sql"]],
+            ["INSERT"],
+        )
+        self.assertTrue(stats.is_reader_visited and stats.is_reader_commented)
+        self.assertFalse(stats.is_reader_read)
+
+        ReaderStatisticsService.set_star_rating(self.reader.id, self.manga.id, 5)
+        ReaderStatisticsService.set_star_rating(self.reader.id, self.manga.id, 3)
+        ReaderStatisticsService.mark_read(self.reader.id, self.manga.id)
+        ReaderStatisticsService.upsert_statistics_many([
+            StatisticsUpdate(self.reader.id, self.manga.id, is_reader_read=True),
+            StatisticsUpdate(self.other_reader.id, self.manga.id, star_rating=4),
+            StatisticsUpdate(self.other_reader.id, self.manga.id, is_reader_read=True),
+        ])
+        self.assertEqual(MangaReaderStatistics.objects.count(), 2)
+        self.assertEqual(
+            MangaReaderStatistics.objects.get(reader=self.reader).star_rating, 3)
+        stats = self.get_statistics()
+        self.assertEqual((stats.read_count, stats.rating_count, stats.average_rating), (2, 2, 3.5))
+        self.assertEqual(MangaTitleStatisticsService.find_drift(), [])
+
+    def test_rebuild_repairs_drift(self):
+        Chapter.objects.create(manga_title=self.manga, chapter_number=1)
+        MangaTitleStatistics.objects.filter(manga_title=self.manga).update(chapter_count=7)
+        drift = MangaTitleStatisticsService.find_drift()
+        self.assertEqual(
+            [(row["field"], row["stored"], row["computed"]) for row in drift],
+            [("chapter_count", 7, 1)],
+        )
+
+        MangaTitleStatisticsService.rebuild()
+        self.assertEqual(MangaTitleStatisticsService.find_drift(), [])
+
+
+class KeysetPaginationTests(TestCase):
+    """?pagination=cursor walks a list by (ordering key, id) without gaps."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.reader = Reader.objects.create(username="reader", email="reader@example.com")
+        self.manga = MangaTitle.objects.create(title="Manga")
+        created_at = timezone.now()
+        # Identical timestamps make the id tie-breaker decide the order.
+        Comment.objects.bulk_create([
+            Comment(manga_title=self.manga, owner=self.reader, text=f"Comment {index}",
+                    created_at=created_at + timedelta(seconds=index % 3))
+            for index in range(45)
+        ])
+
+    def test_cursor_pages_cover_every_row_in_order(self):
+        url = f"/api/comments/?manga_title_id={self.manga.id}&pagination=cursor"
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            self.assertNotIn("count", data)
+            pages.append(data)
+            url = data["next"]
+
+        ids = [comment["id"] for page in pages for comment in page["results"]]
+        expected = [str(pk) for pk in Comment.objects.order_by("created_at", "id")
+                    .values_list("id", flat=True)]
+        self.assertEqual([len(page["results"]) for page in pages], [20, 20, 5])
+        self.assertEqual(ids, expected)
+
+        previous = self.client.get(pages[2]["previous"]).json()
+        self.assertEqual(previous["results"], pages[1]["results"])
+
+    def test_page_number_pagination_is_the_default(self):
+        data = self.client.get(f"/api/comments/?manga_title_id={self.manga.id}").json()
+        self.assertEqual(data["count"], 45)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get("/api/comments/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+
+class MangaTitleSearchTests(TestCase):
+    """/api/search/ and ?search= return matching titles."""
+
+    def setUp(self):
+        self.client = APIClient()
+        author = Author.objects.create(name="Author")
+        MangaTitle.objects.create(title="Frieren Beyond Journey's End", author=author)
+        MangaTitle.objects.create(title="Dungeon Meshi", author=author)
+
+    def get_titles(self, url: str) -> list:
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [manga["title"] for manga in response.json()["results"]]
+
+    def test_search_endpoint_returns_matches(self):
+        self.assertEqual(
+            self.get_titles("/api/search/?search=frieren"),
+            ["Frieren Beyond Journey's End"],
+        )
+
+    def test_search_endpoint_without_keyword_is_empty(self):
+        self.assertEqual(self.get_titles("/api/search/"), [])
+
+    def test_catalog_search_parameter(self):
+        self.assertEqual(
+            self.get_titles("/api/manga-titles/?search=dungeon"), ["Dungeon Meshi"])
+
+    def test_cursor_walks_search_results_to_the_end(self):
+        author = Author.objects.first()
+        MangaTitle.objects.bulk_create([
+            MangaTitle(title=f"Dungeon Crawl {'x' * (index % 4)} {index}", author=author)
+            for index in range(11)
+        ])
+        MangaTitleSearchService.update_search_vectors()
+        expected = set(MangaTitle.objects.filter(title__icontains="dungeon")
+                       .values_list("title", flat=True))
+
+        pages = []
+        url = "/api/manga-titles/?search=dungeon&pagination=cursor"
+        with mock.patch.object(OptInKeysetPagination, "page_size", 5):
+            while url:
+                data = self.client.get(url).json()
+                pages.append([manga["title"] for manga in data["results"]])
+                url = data["next"]
+        titles = [title for page in pages for title in page]
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertEqual(set(titles), expected)
+
+
+class HomepageResponseCacheTests(TestCase):
+    """Homepage sections are served from the cache until the data changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.reader = Reader.objects.create(username="reader", email="reader@example.com")
+        author = Author.objects.create(name="Author")
+        self.first = MangaTitle.objects.create(title="First", author=author)
+        self.second = MangaTitle.objects.create(title="Second", author=author)
+
+    def get_titles(self) -> list:
+        return [manga["title"] for manga in self.client.get("/api/homepage/popular/").json()]
+
+    def test_second_request_is_a_cache_hit(self):
+        self.get_titles()
+        with CaptureQueriesContext(connection) as context:
+            self.get_titles()
+        self.assertEqual(len(context.captured_queries), 0)
+        stats = ResponseCacheService.get_stats()[ResponseCacheSections.POPULAR]
+        self.assertEqual((stats["miss"], stats["hit"]), (1, 1))
+
+        with mock.patch.object(cache, "get_many", side_effect=ConnectionError("down")), \
+                self.assertLogs("api.services.response_cache_service", "ERROR"):
+            stats = ResponseCacheService.get_stats()[ResponseCacheSections.POPULAR]
+        self.assertEqual((stats["miss"], stats["hit"], stats["hit_ratio"]), (0, 0, 0.0))
+
+    def test_rating_change_refreshes_the_section(self):
+        ReaderStatisticsService.set_star_rating(self.reader.id, self.first.id, 3)
+        self.assertEqual(self.get_titles(), ["First", "Second"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ReaderStatisticsService.set_star_rating(self.reader.id, self.second.id, 5)
+        self.assertEqual(self.get_titles(), ["Second", "First"])
+
+    def test_visits_do_not_invalidate(self):
+        self.get_titles()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            ReaderStatisticsService.mark_visited(self.reader.id, self.first.id)
+        self.assertEqual(callbacks, [])
+
+
+class ChapterNavigationTests(TestCase):
+    """Chapter lists compute navigation and premium status in bulk."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.manga = MangaTitle.objects.create(
+            title="Manga", is_premium=True,
+            first_free_chapter_amount=1, last_free_chapter_amount=1)
+        self.chapter_count = 0
+
+    def create_chapters(self, amount: int) -> None:
+        for _ in range(amount):
+            self.chapter_count += 1
+            Chapter.objects.create(manga_title=self.manga, chapter_number=self.chapter_count)
+
+    def list_chapters(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                f"/api/chapters/?manga_title_id={self.manga.id}&no_paging=true")
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(context.captured_queries)
+
+    def test_full_chapter_list_query_count_is_constant(self):
+        self.create_chapters(3)
+        _, small_list_queries = self.list_chapters()
+        self.create_chapters(30)
+        chapters, large_list_queries = self.list_chapters()
+        self.assertEqual(len(chapters), 33)
+        self.assertEqual(small_list_queries, large_list_queries)
+
+    def test_navigation_and_premium_values(self):
+        self.create_chapters(4)
+        chapters, _ = self.list_chapters()
+        by_number = {chapter["chapter_number"]: chapter for chapter in chapters}
+
+        self.assertIsNone(by_number[1]["previous_chapter_id"])
+        self.assertEqual(by_number[2]["previous_chapter_id"], by_number[1]["id"])
+        self.assertEqual(by_number[2]["next_chapter_id"], by_number[3]["id"])
+        self.assertIsNone(by_number[4]["next_chapter_id"])
+        self.assertEqual(
+            [by_number[number]["is_premium"] for number in range(1, 5)],
+            [False, True, True, False],
+        )
+
+        detail = self.client.get(f"/api/chapters/{by_number[1]['id']}/").json()
+        self.assertEqual(detail["next_chapter_id"], by_number[2]["id"])
+
+
+class PremiumChapterEntitlementTests(TestCase):
+    """Premium page reads resolve entitlements from the cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.reader = Reader.objects.create(username="reader", email="reader@example.com")
+        self.plan = SubscriptionPlan.objects.create(
+            name="Premium", features={"premium_chapters": "true"})
+        self.subscription = ReaderSubscription.objects.create(
+            reader=self.reader, subscription_plan=self.plan)
+        manga = MangaTitle.objects.create(title="Manga", is_premium=True)
+        self.chapter = Chapter.objects.create(manga_title=manga, chapter_number=1)
+        Page.objects.create(chapter=self.chapter, page_number=1)
+        self.client.force_authenticate(user=self.reader)
+
+    def get_pages(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f"/api/pages/?chapter_id={self.chapter.id}")
+        subscription_queries = [
+            query for query in context.captured_queries
+            if "subscription" in query["sql"].lower()
+        ]
+        return response.status_code, subscription_queries
+
+    def test_repeated_page_reads_skip_subscription_tables(self):
+        status_code, _ = self.get_pages()
+        self.assertEqual(status_code, 200)
+        status_code, subscription_queries = self.get_pages()
+        self.assertEqual(status_code, 200)
+        self.assertEqual(subscription_queries, [])
+
+    def test_subscription_change_invalidates_entitlements(self):
+        self.assertEqual(self.get_pages()[0], 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscription.update_metadata(
+                status=ReaderSubscription.SubscriptionStatusChoices.ENDED)
+        self.assertEqual(self.get_pages()[0], 403)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChapterReadBundleTests(TestCase):
+    """/api/chapters/<id>/read/ returns the reader bundle in one request."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.reader = Reader.objects.create(username="reader", email="reader@example.com")
+        self.manga = MangaTitle.objects.create(title="Manga")
+        self.first = Chapter.objects.create(manga_title=self.manga, chapter_number=1)
+        self.second = Chapter.objects.create(manga_title=self.manga, chapter_number=2)
+        for number in (2, 1, 3):
+            Page.objects.create(chapter=self.first, page_number=number)
+
+    def read(self, chapter: Chapter):
+        return self.client.get(f"/api/chapters/{chapter.id}/read/")
+
+    def test_bundle_contents_and_progress(self):
+        self.metadata = {
+            "width": 800, "height": 1200, "bytes": 1024, "mime_type": "image/png",
+            "placeholder": "data:image/webp;base64,AAAA",
+        }
+        self.variants = {"mobile": "https://example.com/mobile.webp"}
+        Page.objects.filter(chapter=self.first, page_number=1).update(
+            image_metadata=self.metadata, image_variants=self.variants)
+        self.client.force_authenticate(user=self.reader)
+        data = self.read(self.first).json()
+        self.assertEqual([page["page_number"] for page in data["pages"]], [1, 2, 3])
+        self.assertEqual(data["pages"][0]["image_metadata"], self.metadata)
+        self.assertEqual(data["pages"][0]["image_variants"], self.variants)
+        self.assertEqual(data["pages"][1]["image_metadata"], {})
+        self.assertEqual(data["chapter"]["next_chapter_id"], str(self.second.id))
+        self.assertFalse(data["entitlements"]["premium_chapters"])
+        self.assertIsNone(data["progress"])
+        # Buffered until the flush (with Redis), then stored
+        self.assertIsNotNone(self.read(self.first).json()["progress"])
+        ReadingProgressBufferService.flush_reader(self.reader.id)
+        self.assertTrue(ReadingProgress.objects.filter(
+            reader=self.reader, chapter=self.first).exists())
+
+    def test_query_count_does_not_depend_on_page_count(self):
+        with CaptureQueriesContext(connection) as context:
+            self.read(self.second)
+        few_pages_queries = len(context.captured_queries)
+        for number in range(1, 41):
+            Page.objects.create(chapter=self.second, page_number=number)
+        with CaptureQueriesContext(connection) as context:
+            self.read(self.second)
+        self.assertEqual(few_pages_queries, len(context.captured_queries))
+
+    def test_premium_chapter_requires_entitlement(self):
+        MangaTitle.objects.filter(id=self.manga.id).update(is_premium=True)
+        self.client.force_authenticate(user=self.reader)
+        self.assertEqual(self.read(self.first).status_code, 403)
+
+
+class MangaTitleDeleteTests(TransactionTestCase):
+    """Deleting a title commits although its removals update counters."""
+
+    def test_delete_title_with_chapters_and_comments(self):
+        reader = Reader.objects.create(username="reader", email="reader@example.com")
+        manga = MangaTitle.objects.create(title="Manga")
+        chapter = Chapter.objects.create(manga_title=manga, chapter_number=1)
+        Comment.objects.create(manga_title=manga, owner=reader, text="On the title")
+        Comment.objects.create(chapter=chapter, owner=reader, text="On the chapter")
+        ReaderStatisticsService.set_star_rating(reader.id, manga.id, 4)
+
+        with transaction.atomic():
+            manga.delete()
+
+        self.assertFalse(MangaTitle.objects.exists())
+        self.assertFalse(MangaTitleStatistics.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReadingProgressBufferTests(TestCase):
+    """Buffered progress is written in bulk, with the title marked read once.
+    Without Redis, progress is written through."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.reader = Reader.objects.create(username="reader", email="reader@example.com")
+        self.manga = MangaTitle.objects.create(title="Manga")
+        self.chapters = [
+            Chapter.objects.create(manga_title=self.manga, chapter_number=number)
+            for number in range(1, 4)
+        ]
+
+    def test_apply_upserts_progress_and_statistics(self):
+        now = timezone.now()
+        first, second, deleted = self.chapters
+        ReadingProgressBufferService.apply({
+            (self.reader.id, first.id): ProgressEntry(now - timedelta(minutes=2)),
+            (self.reader.id, second.id): ProgressEntry(now - timedelta(minutes=1)),
+            (self.reader.id, uuid.uuid4()): ProgressEntry(now),
+        })
+        deleted_id = deleted.id
+        deleted.delete()
+        ReadingProgressBufferService.apply({
+            (self.reader.id, first.id): ProgressEntry(now),
+            (self.reader.id, deleted_id): ProgressEntry(now),
+        })
+
+        self.assertEqual(
+            dict(ReadingProgress.objects.values_list("chapter_id", "last_read_timestamp")),
+            {first.id: now, second.id: now - timedelta(minutes=1)},
+        )
+        stats = MangaReaderStatistics.objects.get(reader=self.reader, manga_title=self.manga)
+        self.assertTrue(stats.is_reader_visited and stats.is_reader_read)
+        self.assertEqual(MangaTitleStatistics.objects.get(manga_title=self.manga).read_count, 1)
+        self.assertEqual(MangaTitleStatisticsService.find_drift(), [])
+
+        def count_queries(reader_count):
+            readers = [
+                Reader.objects.create(username=f"reader{index}", email=f"reader{index}@example.com")
+                for index in range(Reader.objects.count(), Reader.objects.count() + reader_count)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                ReadingProgressBufferService.apply({
+                    (reader.id, first.id): ProgressEntry(now) for reader in readers})
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(5), count_queries(1))
+        self.assertEqual(MangaTitleStatistics.objects.get(manga_title=self.manga).read_count, 7)
+
+    def test_progress_endpoint_upserts(self):
+        self.client.force_authenticate(user=self.reader)
+        chapter = self.chapters[0]
+        created = self.client.post("/api/reading-progress/", {"chapter_id": str(chapter.id)})
+        updated = self.client.post("/api/reading-progress/", {"chapter_id": str(chapter.id)})
+        self.assertEqual((created.status_code, updated.status_code), (201, 200))
+        self.assertEqual(created.json()["id"], updated.json()["id"])
+        history = self.client.get("/api/reading-progress/").json()["results"]
+        self.assertEqual([entry["id"] for entry in history], [created.json()["id"]])
+        self.assertEqual(history[0]["last_read_timestamp"], updated.json()["last_read_timestamp"])
+
+    def test_list_overlays_buffered_progress_without_flushing(self):
+        self.client.force_authenticate(user=self.reader)
+        first, second, third = self.chapters
+        now = timezone.now()
+        for chapter, minutes_ago in ((second, 10), (third, 30)):
+            ReadingProgress.objects.create(
+                reader=self.reader, chapter=chapter,
+                last_read_timestamp=now - timedelta(minutes=minutes_ago))
+        buffered = {
+            first.id: ProgressEntry(now - timedelta(minutes=20)),
+            third.id: ProgressEntry(now, ReadingPosition(5, 2500, now)),
+            uuid.uuid4(): ProgressEntry(now),  # Deleted chapter
+        }
+
+        pages = []
+        url = "/api/reading-progress/"
+        with mock.patch.object(ReadingProgressBufferService, "get_buffered", return_value=buffered), \
+                mock.patch.object(PageNumberPagination, "page_size", 2):
+            while url:
+                data = self.client.get(url).json()
+                self.assertEqual(data["count"], 3)
+                pages.append(data["results"])
+                url = data["next"]
+        entries = [entry for page in pages for entry in page]
+        self.assertEqual([len(page) for page in pages], [2, 1])
+        self.assertEqual(
+            [entry["chapter_id"] for entry in entries],
+            [str(third.id), str(second.id), str(first.id)])
+        self.assertEqual((entries[0]["page_number"], entries[0]["scroll_fraction"]), (5, 0.25))
+        self.assertEqual(
+            entries[2]["id"],
+            str(ReadingProgressBufferService.get_progress_id(self.reader.id, first.id)))
+        # Nothing was written
+        self.assertEqual(
+            dict(ReadingProgress.objects.values_list("chapter_id", "last_read_timestamp")),
+            {second.id: now - timedelta(minutes=10), third.id: now - timedelta(minutes=30)})
+
+    def test_positions_merge_by_time(self):
+        self.client.force_authenticate(user=self.reader)
+        chapter = self.chapters[0]
+        now = timezone.now()
+
+        def send(*positions):
+            return self.client.post("/api/reading-progress/positions/", {"positions": [
+                {"chapter_id": str(chapter.id), "page_number": page,
+                 "scroll_fraction": fraction, "updated_at": updated_at.isoformat()}
+                for page, fraction, updated_at in positions
+            ]}, format="json")
+
+        response = send((4, 0.25, now - timedelta(minutes=1)), (6, 0.5, now - timedelta(seconds=30)))
+        self.assertEqual((response.status_code, response.json()), (202, {"accepted": 2}))
+        # Queued offline before the stored position: ignored
+        send((2, 0.9, now - timedelta(minutes=5)))
+        # Opening the chapter keeps the position
+        self.client.post("/api/reading-progress/", {"chapter_id": str(chapter.id)})
+        bundle = self.client.get(f"/api/chapters/{chapter.id}/read/").json()
+        self.assertEqual(bundle["progress"]["page_number"], 6)
+
+        ReadingProgressBufferService.flush_reader(self.reader.id)
+        progress = ReadingProgress.objects.get(reader=self.reader, chapter=chapter)
+        self.assertEqual((progress.page_number, progress.scroll_fraction), (6, 0.5))
+        self.assertGreater(progress.last_read_timestamp, progress.position_updated_at)
+        self.assertEqual(ReadingProgress.objects.count(), 1)
+        self.assertEqual(send((0, 2, now)).status_code, 400)
+
+        # Buffered values round-trip with their position
+        entry = ProgressEntry(now, ReadingPosition(3, 1250, now - timedelta(seconds=5)))
+        fields = ReadingProgressBufferService._encode(chapter.id, entry)
+        parsed = ReadingProgressBufferService._parse({
+            field.encode(): value.encode() for field, value in zip(fields[::2], fields[1::2])
+        })
+        merged = None
+        for chapter_id, parsed_entry in parsed:
+            merged = parsed_entry.merge(merged) if merged else parsed_entry
+        self.assertEqual(merged.position.page_number, 3)
+        self.assertEqual(merged.position.scroll_position, 1250)
+        self.assertAlmostEqual(merged.read_at.timestamp(), now.timestamp(), places=5)
+
+
+class RedisBufferMixin:
+    """Runs the tests against the Redis cache of DJANGO_REDIS_URL (skipped
+    when no server answers), with the buffer keys under a test prefix."""
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            Redis.from_url(settings.DJANGO_REDIS_URL, socket_connect_timeout=1).ping()
+        except RedisError:
+            raise unittest.SkipTest("No Redis server at DJANGO_REDIS_URL")
+        super().setUpClass()
+
+    def setUp(self):
+        prefix = f"test:{uuid.uuid4().hex}"
+        patcher = mock.patch.object(ReadingProgressBufferService, "KEY_PREFIX", prefix)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.delete_buffer_keys, prefix)
+        super().setUp()
+        self.assertIsNotNone(ReadingProgressBufferService.get_client())
+
+    def delete_buffer_keys(self, prefix):
+        client = ReadingProgressBufferService.get_client()
+        keys = list(client.scan_iter(f"{prefix}:*"))
+        if keys:
+            client.delete(*keys)
+
+
+@override_settings(CACHES=REDIS_CACHES)
+class RedisChapterReadBundleTests(RedisBufferMixin, ChapterReadBundleTests):
+    pass
+
+
+@override_settings(CACHES=REDIS_CACHES)
+class RedisReadingProgressBufferTests(RedisBufferMixin, ReadingProgressBufferTests):
+
+    def test_reads_stay_buffered_until_flushed(self):
+        chapter = self.chapters[0]
+        self.assertTrue(ReadingProgressBufferService.record(self.reader.id, chapter.id))
+        self.assertFalse(ReadingProgressBufferService.record(self.reader.id, chapter.id))
+        self.assertFalse(ReadingProgress.objects.exists())
+        self.assertIsNotNone(
+            ReaderStatisticsService.get_reading_progress(self.reader.id, chapter.id))
+
+        self.assertEqual(ReadingProgressBufferService.flush(), 1)
+        self.assertEqual(ReadingProgress.objects.get().chapter_id, chapter.id)
+        self.assertEqual(ReadingProgressBufferService.get_buffered(self.reader.id), {})
+
+
+class ReadingHistoryTests(TestCase):
+    """The history lists the latest progress of each title."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.reader = Reader.objects.create(username="reader", email="reader@example.com")
+        self.client.force_authenticate(user=self.reader)
+        self.now = timezone.now()
+
+    def add_title(self, name, chapter_count):
+        manga = MangaTitle.objects.create(title=name)
+        return [
+            Chapter.objects.create(manga_title=manga, chapter_number=number)
+            for number in range(1, chapter_count + 1)
+        ]
+
+    def add_progress(self, chapter, minutes_ago):
+        ReadingProgress.objects.create(
+            reader=self.reader, chapter=chapter,
+            last_read_timestamp=self.now - timedelta(minutes=minutes_ago))
+
+    def get_history(self, url="/api/reading-progress/history/"):
+        with CaptureQueriesContext(connection) as context:
+            data = self.client.get(url).json()
+        return data, len(context.captured_queries)
+
+    def test_latest_entry_per_title_with_next_chapters(self):
+        long_title = self.add_title("Long", 4)
+        short_title = self.add_title("Short", 1)
+        self.add_progress(long_title[1], minutes_ago=30)
+        self.add_progress(short_title[0], minutes_ago=20)
+        self.add_progress(long_title[0], minutes_ago=10)
+
+        with mock.patch.object(KeysetPagination, "page_size", 1):
+            first_page, few_titles_queries = self.get_history()
+            second_page, _ = self.get_history(first_page["next"])
+        entries = [*first_page["results"], *second_page["results"]]
+        self.assertIsNone(second_page["next"])
+        self.assertEqual(
+            [(entry["manga_title_title"], entry["chapter_number"]) for entry in entries],
+            [("Long", 1), ("Short", 1)],
+        )
+        self.assertEqual(entries[0]["next_unread_chapter_id"], str(long_title[2].id))
+        self.assertEqual(
+            (entries[0]["latest_chapter_id"], entries[0]["latest_chapter_number"]),
+            (str(long_title[3].id), 4),
+        )
+        self.assertIsNone(entries[1]["next_unread_chapter_id"])
+
+        for index in range(5):
+            chapters = self.add_title(f"Title {index}", 2)
+            self.add_progress(chapters[0], minutes_ago=index)
+            self.add_progress(chapters[1], minutes_ago=index + 1)
+        data, queries = self.get_history()
+        self.assertEqual(len(data["results"]), 7)
+        self.assertEqual(queries, few_titles_queries)
+
+
+class TitleSimilarityTests(TestCase):
+    """Recommendations come from the precomputed item-item neighbours."""
+
+    def setUp(self):
+        self.titles = {
+            name: MangaTitle.objects.create(title=name) for name in ("A", "B", "C", "D", "E")
+        }
+        self.readers = [
+            Reader.objects.create(username=f"reader{index}", email=f"reader{index}@example.com")
+            for index in range(4)
+        ]
+
+    def rate(self, reader, name, **values):
+        ReaderStatisticsService.upsert_statistics(reader.id, self.titles[name].id, **values)
+
+    def test_rebuild_and_recommendations(self):
+        first, second, third, fourth = self.readers
+        for reader in (first, second, third):
+            self.rate(reader, "A", is_reader_read=True)
+            self.rate(reader, "B", is_reader_read=True, star_rating=5)
+        for reader in (first, second):
+            self.rate(reader, "C", is_reader_read=True, star_rating=2)
+        # Only one common reader: no similarity
+        self.rate(first, "D", is_reader_read=True)
+        self.rate(fourth, "E", is_reader_read=True)
+
+        self.assertEqual(TitleSimilarityService.rebuild(), 6)
+        self.assertEqual(TitleSimilarityService.rebuild(), 6)
+        neighbours = list(
+            MangaTitleSimilarity.objects
+            .filter(manga_title=self.titles["A"])
+            .order_by("rank")
+            .values_list("similar_title__title", flat=True)
+        )
+        self.assertEqual(neighbours, ["B", "C"])
+
+        recommendations = RecommendationService.get_recommendations(self.titles["A"].id, limit=3)
+        self.assertEqual([manga.title for manga in recommendations[:2]], ["B", "C"])
+        self.assertNotIn(self.titles["A"].id, [manga.id for manga in recommendations])
+
+        # The banner seeds from the reader's latest read and skips read titles
+        chapter = Chapter.objects.create(manga_title=self.titles["C"], chapter_number=1)
+        ReadingProgress.objects.create(reader=fourth, chapter=chapter)
+        self.rate(fourth, "B", is_reader_read=True)
+        banner, = RecommendationService.get_homepage_recommendation(fourth.id)
+        self.assertEqual(banner["source_manga"].id, self.titles["C"].id)
+        self.assertEqual([manga.title for manga in banner["recommendations"]], ["A"])
+
+
+class CommentTreeTests(TestCase):
+    """/api/comments/tree/ returns threads with their reply subtrees."""
+
+    def setUp(self):
+        self.client = APIClient()
+        manga = MangaTitle.objects.create(title="Manga")
+        self.chapter = Chapter.objects.create(manga_title=manga, chapter_number=1)
+        created_at = timezone.now()
+        self.roots = [
+            Comment.objects.create(
+                chapter=self.chapter, text=f"root {index}",
+                created_at=created_at + timedelta(seconds=index))
+            for index in range(3)
+        ]
+        # A reply chain of 4 levels below the first root
+        self.chain = []
+        parent = self.roots[0]
+        for level in range(1, 5):
+            parent = Comment.objects.create(
+                chapter=self.chapter, parent_comment=parent, text=f"reply {level}",
+                created_at=created_at + timedelta(seconds=10 + level))
+            self.chain.append(parent)
+
+    def get_tree(self, **params):
+        return self.client.get("/api/comments/tree/", params).json()
+
+    def test_tree_is_nested_to_depth_with_reply_counts(self):
+        data = self.get_tree(chapter_id=self.chapter.id, depth=2)
+        self.assertEqual([root["text"] for root in data["results"]], ["root 0", "root 1", "root 2"])
+        first = data["results"][0]
+        self.assertEqual(first["reply_count"], 1)
+        reply = first["replies"][0]
+        self.assertEqual(reply["text"], "reply 1")
+        self.assertEqual(reply["replies"][0]["text"], "reply 2")
+        # Cut off at the depth limit, but the count tells there is more
+        self.assertEqual(reply["replies"][0]["replies"], [])
+        self.assertEqual(reply["replies"][0]["reply_count"], 1)
+
+        data = self.get_tree(parent_comment_id=self.chain[1].id, depth=5)
+        self.assertEqual([node["text"] for node in data["results"]], ["reply 3"])
+        self.assertEqual(data["results"][0]["replies"][0]["text"], "reply 4")
+
+    def test_top_level_comments_are_keyset_paginated(self):
+        with mock.patch.object(KeysetPagination, "page_size", 2):
+            data = self.get_tree(chapter_id=self.chapter.id)
+            self.assertEqual(len(data["results"]), 2)
+            data = self.client.get(data["next"]).json()
+        self.assertEqual([root["text"] for root in data["results"]], ["root 2"])
+        self.assertIsNone(data["next"])
+
+    def test_scope_is_required(self):
+        self.assertEqual(self.client.get("/api/comments/tree/").status_code, 400)
+
+    def test_owner_profiles_are_loaded_in_bulk(self):
+        def count_profile_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.get_tree(chapter_id=self.chapter.id)
+            return sum(
+                Reader._meta.db_table in query["sql"] or Administrator._meta.db_table in query["sql"]
+                for query in context.captured_queries
+            )
+
+        Reader.objects.create(username="reader", email="reader@example.com")
+        Comment.objects.filter(parent_comment__isnull=True).update(
+            owner=Reader.objects.get(username="reader"))
+        few_owners_queries = count_profile_queries()
+
+        for index, comment in enumerate(Comment.objects.all()):
+            owner_class = Administrator if index % 2 else Reader
+            comment.owner = owner_class.objects.create(
+                username=f"owner{index}", email=f"owner{index}@example.com",
+                role=RoleChoices.ADMIN if index % 2 else RoleChoices.READER,
+                display_name=f"Owner {index}")
+            comment.save(update_fields=["owner"])
+        self.assertLessEqual(count_profile_queries(), few_owners_queries + 1)
+        names = {
+            node["owner_name"] for node in self.get_tree(chapter_id=self.chapter.id)["results"]}
+        self.assertTrue(all(name.startswith("Owner ") for name in names))
+
+
+class SequenceNumberTests(TestCase):
+    """Comments and flags keep the number they get when created/safe."""
+
+    def setUp(self):
+        self.manga = MangaTitle.objects.create(title="Manga")
+        self.chapter = Chapter.objects.create(manga_title=self.manga, chapter_number=1)
+
+    def add_flag(self, comment):
+        return FlaggedContent.objects.create(
+            reason="Toxic", content="text", content_name="text",
+            target_object_type=FlaggedContent.TargetObjectTypeChoices.COMMENT,
+            target_object_id=comment.id)
+
+    def test_comments_are_numbered_when_they_become_safe(self):
+        first = Comment.objects.create(manga_title=self.manga, text="first")
+        second = Comment.objects.create(manga_title=self.manga, text="second")
+        on_chapter = Comment.objects.create(
+            chapter=self.chapter, text="chapter", moderation_status=ModerationStatusChoices.SAFE)
+        self.assertIsNone(first.sequence_number)
+
+        second.set_moderation_status(ModerationStatusChoices.SAFE)
+        first.set_moderation_status(ModerationStatusChoices.SAFE)
+        first.set_moderation_status(ModerationStatusChoices.FLAGGED)
+        self.assertEqual(
+            [Comment.objects.get(pk=c.pk).sequence_number for c in (first, second, on_chapter)],
+            [2, 1, 1])
+        self.assertEqual(str(second), "Comment #1 in Manga")
+        self.assertEqual(
+            [str(self.add_flag(first)), str(self.add_flag(second))],
+            ["Flagged Content #1 on comment's text", "Flagged Content #2 on comment's text"])
+
+    def test_moved_comment_is_numbered_in_its_new_scope(self):
+        other = MangaTitle.objects.create(title="Other")
+        Comment.objects.create(
+            manga_title=other, text="other", moderation_status=ModerationStatusChoices.SAFE)
+        moved = Comment.objects.create(
+            manga_title=self.manga, text="moved", moderation_status=ModerationStatusChoices.SAFE)
+        on_chapter = Comment.objects.create(
+            chapter=self.chapter, text="chapter", moderation_status=ModerationStatusChoices.SAFE)
+        self.assertEqual((moved.sequence_number, on_chapter.sequence_number), (1, 1))
+
+        moved = Comment.objects.get(pk=moved.pk)
+        moved.manga_title = other
+        moved.save()
+        on_chapter = Comment.objects.get(pk=on_chapter.pk)
+        on_chapter.manga_title = self.manga
+        on_chapter.save(update_fields=["manga_title"])
+        self.assertEqual(
+            [Comment.objects.get(pk=c.pk).sequence_number for c in (moved, on_chapter)], [2, 1])
+
+        # Saving other fields keeps the number
+        moved.text = "edited"
+        moved.save(update_fields=["text"])
+        self.assertEqual(Comment.objects.get(pk=moved.pk).sequence_number, 2)
+
+    def test_admin_changelists_use_constant_queries(self):
+        admin_user = Administrator.objects.create(
+            username="admin", email="admin@example.com", role=RoleChoices.ADMIN,
+            is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+
+        def add_rows(count):
+            for index in range(count):
+                parent = Comment.objects.create(
+                    chapter=self.chapter, owner=admin_user, text="parent",
+                    moderation_status=ModerationStatusChoices.SAFE)
+                Comment.objects.create(
+                    chapter=self.chapter, owner=admin_user, parent_comment=parent, text="reply")
+                self.add_flag(parent)
+
+        def count_queries(url):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries)
+
+        urls = ("/admin/api/comment/", "/admin/api/flaggedcontent/")
+        add_rows(2)
+        few_rows_queries = [count_queries(url) for url in urls]
+        add_rows(5)
+        self.assertEqual([count_queries(url) for url in urls], few_rows_queries)
+
+
+class FlaggedReasonsTests(TestCase):
+    """Comment and user lists load flag reasons with one query."""
+
+    def setUp(self):
+        self.client = APIClient()
+        manga = MangaTitle.objects.create(title="Manga")
+        self.chapter = Chapter.objects.create(manga_title=manga, chapter_number=1)
+        self.admin = Administrator.objects.create(
+            username="admin", email="admin@example.com", role=RoleChoices.ADMIN)
+
+    def add_flagged_comments(self, count):
+        start = Reader.objects.count()
+        for index in range(start, start + count):
+            comment = Comment.objects.create(chapter=self.chapter, text=f"comment {index}")
+            for reason in ("Toxic", "Insult"):
+                FlaggedContent.objects.create(
+                    reason=reason, content="text",
+                    target_object_type=FlaggedContent.TargetObjectTypeChoices.COMMENT,
+                    target_object_id=comment.id)
+            reader = Reader.objects.create(
+                username=f"reader{index}", email=f"reader{index}@example.com")
+            FlaggedContent.objects.create(
+                reason="Spam", content="name", is_resolved=index % 2 == 0,
+                target_object_type=FlaggedContent.TargetObjectTypeChoices.READER,
+                target_object_id=reader.id)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        return len(context.captured_queries), response.json()
+
+    def test_query_count_does_not_depend_on_row_count(self):
+        self.client.force_authenticate(user=self.admin)
+        comments_url = f"/api/comments/?chapter_id={self.chapter.id}"
+        readers_url = "/api/readers/"
+        self.add_flagged_comments(2)
+        few_comment_queries, _ = self.count_queries(comments_url)
+        few_reader_queries, _ = self.count_queries(readers_url)
+
+        self.add_flagged_comments(6)
+        comment_queries, comments = self.count_queries(comments_url)
+        reader_queries, readers = self.count_queries(readers_url)
+        self.assertEqual(comment_queries, few_comment_queries)
+        self.assertEqual(reader_queries, few_reader_queries)
+        self.assertTrue(all(
+            sorted(comment["hidden_reasons"]) == ["Insult", "Toxic"]
+            for comment in comments["results"]))
+        self.assertEqual(
+            sum(reader["flagged_reasons"] == ["Spam"] for reader in readers["results"]), 4)
+
+
+class ImageVariantTests(TestCase):
+    def test_build_variants_resizes_to_webp_without_upscaling(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (2000, 3000), "white").save(buffer, format="PNG")
+
+        variants = ImageVariantService.build_variants(
+            buffer.getvalue(), {"thumbnail": 240, "huge": 4000})
+
+        with Image.open(io.BytesIO(variants["thumbnail"])) as thumbnail:
+            self.assertEqual(thumbnail.format, "WEBP")
+            self.assertEqual(thumbnail.size, (240, 360))
+        with Image.open(io.BytesIO(variants["huge"])) as huge:
+            self.assertEqual(huge.size, (2000, 3000))
+        self.assertLess(len(variants["thumbnail"]), len(buffer.getvalue()))
+
+    def test_supabase_object_path(self):
+        storage = SupabaseStorageBackend(
+            resumable_threshold=1, max_connections=1,
+            client=mock.Mock(), http_client=mock.Mock())
+        bucket = BucketNames.MANGA_CONTENT
+        url = f"https://example.supabase.co/storage/v1/object/public/{bucket}/abc.jpg?"
+        self.assertEqual(storage.get_object_path(url, bucket), "abc.jpg")
+        self.assertIsNone(storage.get_object_path("https://example.com/abc.jpg", bucket))
+
+
+class OfflinePackageTests(TestCase):
+    """/api/chapters/<id>/download/ streams a cached CBZ of the chapter."""
+
+    def setUp(self):
+        cache.clear()
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        settings_override = override_settings(OFFLINE_PACKAGE_CACHE_DIR=cache_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = APIClient()
+        self.reader = Reader.objects.create(username="reader", email="reader@example.com")
+        plan = SubscriptionPlan.objects.create(
+            name="Basic", features={"offline_reading": "true"})
+        self.subscription = ReaderSubscription.objects.create(
+            reader=self.reader, subscription_plan=plan)
+        author = Author.objects.create(name="Author")
+        manga = MangaTitle.objects.create(title="Manga", author=author)
+        self.chapter = Chapter.objects.create(manga_title=manga, chapter_number=1)
+        for number in (2, 1):
+            Page.objects.create(
+                chapter=self.chapter, page_number=number,
+                image_url=f"https://cdn.example.com/page-{number}.png")
+        self.client.force_authenticate(user=self.reader)
+
+    def download(self, **headers):
+        with mock.patch.object(
+            OfflinePackageService, "open_image",
+            side_effect=lambda url: io.BytesIO(url.encode()),
+        ) as open_image:
+            response = self.client.get(f"/api/chapters/{self.chapter.id}/download/", **headers)
+        content = b"".join(response.streaming_content) if response.streaming else b""
+        return response, content, open_image.call_count
+
+    def test_download_is_built_once_and_resumable(self):
+        response, content, fetches = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(fetches, 2)
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            manifest = json.loads(archive.read("manifest.json"))
+            files = [page["file"] for page in manifest["chapters"][0]["pages"]]
+            self.assertEqual([name.rsplit("/", 1)[1] for name in files], ["0001.png", "0002.png"])
+            self.assertEqual(archive.read(files[0]), b"https://cdn.example.com/page-1.png")
+
+        response, partial, fetches = self.download(HTTP_RANGE="bytes=10-")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(fetches, 0)
+        self.assertEqual(partial, content[10:])
+        self.assertEqual(response["Content-Range"], f"bytes 10-{len(content) - 1}/{len(content)}")
+
+    def test_evicted_archive_is_rebuilt_and_open_archives_are_served(self):
+        content = self.download()[1]
+        for archive_path in Path(settings.OFFLINE_PACKAGE_CACHE_DIR).glob("*.cbz"):
+            archive_path.unlink()
+        response, rebuilt, fetches = self.download()
+        self.assertEqual((response.status_code, fetches), (200, 2))
+        self.assertEqual(rebuilt, content)
+
+        # Evicted by a concurrent request before streaming: the open file
+        # is still served in full
+        for archive_path in Path(settings.OFFLINE_PACKAGE_CACHE_DIR).glob("*.cbz"):
+            archive_path.unlink()
+        with mock.patch.object(
+            OfflinePackageService, "evict", side_effect=lambda keep: keep.unlink(),
+        ):
+            response, evicted, _ = self.download()
+        self.assertEqual(response["Content-Length"], str(len(content)))
+        self.assertEqual(evicted, content)
+
+    def test_download_requires_offline_reading(self):
+        self.subscription.update_metadata(
+            status=ReaderSubscription.SubscriptionStatusChoices.ENDED)
+        cache.clear()
+        self.assertEqual(self.download()[0].status_code, 403)
+
+
+class LocalStorageTestMixin:
+    """Runs the test against the local storage backend in a temporary directory."""
+
+    def use_local_storage(self):
+        storage_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(storage_dir.cleanup)
+        self.storage_root = storage_dir.name
+        settings_override = override_settings(
+            STORAGE_BACKEND="local",
+            LOCAL_STORAGE_ROOT=storage_dir.name,
+            LOCAL_STORAGE_URL="http://testserver/local-storage/",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        return get_storage_backend()
+
+    def stored_files(self):
+        return sorted(
+            str(path.relative_to(self.storage_root))
+            for path in Path(self.storage_root).rglob("*") if path.is_file()
+        )
+
+
+class PageImportTests(LocalStorageTestMixin, TestCase):
+    """/api/chapters/<id>/import-pages/ creates the pages of an archive at once."""
+
+    PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+    def setUp(self):
+        self.storage = self.use_local_storage()
+        self.client = APIClient()
+        self.admin = Administrator.objects.create(
+            username="admin", email="admin@example.com", role=RoleChoices.ADMIN)
+        manga = MangaTitle.objects.create(title="Manga")
+        self.chapter = Chapter.objects.create(manga_title=manga, chapter_number=1)
+        Page.objects.create(chapter=self.chapter, page_number=1)
+        self.client.force_authenticate(user=self.admin)
+
+    def make_archive(self, names):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for name in names:
+                archive.writestr(name, self.PNG_SIGNATURE + name.encode())
+        buffer.seek(0)
+        buffer.name = "chapter.cbz"
+        return buffer
+
+    def import_archive(self, names):
+        return self.client.post(
+            f"/api/chapters/{self.chapter.id}/import-pages/",
+            {"archive": self.make_archive(names)}, format="multipart")
+
+    def stored_content(self, page: Page) -> bytes:
+        bucket = BucketNames.MANGA_CONTENT
+        return self.storage.download(bucket, self.storage.get_object_path(page.image_url, bucket))
+
+    def test_pages_are_created_in_natural_order(self):
+        names = ["vol/p10.png", "vol/p2.png", "vol/p1.png", "__MACOSX/._p1.png", "notes.txt"]
+        with self.captureOnCommitCallbacks():
+            response = self.import_archive(names)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 3)
+        pages = Page.objects.filter(chapter=self.chapter, page_number__gt=1).order_by("page_number")
+        self.assertEqual(
+            [(page.page_number, self.stored_content(page)[8:]) for page in pages],
+            [(2, b"vol/p1.png"), (3, b"vol/p2.png"), (4, b"vol/p10.png")])
+        entries = LogEntry.objects.filter(
+            target_object_id=self.chapter.id, action_type=LogEntry.ActionTypeChoices.UPDATE)
+        self.assertEqual(entries.count(), 1)
+        self.assertEqual(entries.get().details["page_import"]["page_count"], 3)
+
+    def test_oversized_archive_is_rejected_with_the_limit(self):
+        with override_settings(ARCHIVE_UPLOAD_MAX_BYTES=1024):
+            response = self.import_archive([f"p{index}.png" for index in range(40)])
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(
+            response.json()["detail"],
+            f"chapter.cbz exceeds the {filesizeformat(1024)} upload limit.")
+        self.assertEqual(Page.objects.filter(chapter=self.chapter).count(), 1)
+
+    def test_failed_upload_removes_stored_images(self):
+        upload = type(self.storage).upload
+
+        def failing_upload(storage, bucket, path, file, *args, **kwargs):
+            if file.name == "p3.png":
+                raise RuntimeError("storage unavailable")
+            return upload(storage, bucket, path, file, *args, **kwargs)
+
+        with override_settings(STORAGE_UPLOAD_CONCURRENCY=1), \
+                mock.patch.object(type(self.storage), "upload", failing_upload):
+            response = self.import_archive(["p1.png", "p2.png", "p3.png"])
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(Page.objects.filter(chapter=self.chapter).count(), 1)
+        self.assertEqual(self.stored_files(), [])
+
+
+class LocalStorageBackendTests(LocalStorageTestMixin, TestCase):
+    def test_upload_variants_and_delete(self):
+        self.use_local_storage()
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 600), "white").save(buffer, format="PNG")
+        buffer.name = "cover.png"
+        author = Author.objects.create(name="Author")
+        manga = MangaTitle.objects.create(
+            title="Manga", author=author,
+            cover_image=ImageService.upload_image(buffer, BucketNames.MANGA_CONTENT))
+
+        variants = ImageVariantService.refresh_variants(ImageVariantTargets.MANGA_COVER, manga.id)
+        self.assertEqual(set(variants), {"thumbnail", "mobile", "desktop"})
+        self.assertEqual(len(self.stored_files()), 4)
+
+        manga.refresh_from_db()
+        metadata = manga.cover_image_metadata
+        self.assertEqual(
+            (metadata["width"], metadata["height"], metadata["bytes"], metadata["mime_type"]),
+            (800, 600, len(buffer.getvalue()), "image/png"))
+        placeholder = metadata["placeholder"].removeprefix("data:image/webp;base64,")
+        with Image.open(io.BytesIO(base64.b64decode(placeholder))) as image:
+            self.assertEqual(image.size, (16, 12))
+        with self.captureOnCommitCallbacks() as callbacks:
+            MangaTitleService.delete_manga_title(manga)
+        self.assertTrue(callbacks)
+        self.assertEqual(len(self.stored_files()), 4)
+        OutboxService.drain()
+        self.assertEqual(self.stored_files(), [])
+
+    def test_identical_uploads_share_one_object(self):
+        self.use_local_storage()
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), "white").save(buffer, format="PNG")
+        content = buffer.getvalue()
+        bucket = BucketNames.COMMENT_IMAGES
+
+        urls = [ImageService.upload_image(io.BytesIO(content), bucket) for _ in range(3)]
+        self.assertEqual(len(set(urls)), 1)
+        self.assertEqual(len(self.stored_files()), 1)
+        self.assertEqual(StoredImage.objects.get().reference_count, 3)
+
+        ImageService.delete_image(urls[0], bucket)
+        ImageService.delete_images(urls[1:2], bucket)
+        self.assertEqual(len(self.stored_files()), 1)
+        self.assertEqual(StoredImage.objects.get().reference_count, 1)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            ImageService.delete_image(urls[2], bucket)
+        self.assertTrue(callbacks)
+        self.assertEqual(OutboxService.drain(), 1)
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(StoredImage.objects.exists())
+
+    def test_failed_comment_update_keeps_the_old_image(self):
+        self.use_local_storage()
+        bucket = BucketNames.COMMENT_IMAGES
+        images = []
+        for color in ("white", "black"):
+            buffer = io.BytesIO()
+            Image.new("RGB", (64, 64), color).save(buffer, format="PNG")
+            buffer.seek(0)
+            buffer.name = f"{color}.png"
+            images.append(buffer)
+        reader = Reader.objects.create(username="reader", email="reader@example.com")
+        comment = Comment.objects.create(
+            manga_title=MangaTitle.objects.create(title="Manga"), owner=reader, text="Text",
+            attached_image_url=ImageService.upload_image(images[0], bucket))
+
+        with self.assertRaises(RuntimeError), \
+                mock.patch.object(Comment, "update_metadata", side_effect=RuntimeError("down")):
+            CommentService.update_comment(
+                comment, {"text": "Edited", "manga_title": comment.manga_title}, images[1])
+        self.assertFalse(OutboxEvent.objects.exists())
+        old_image = StoredImage.objects.get(
+            object_path=get_storage_backend().get_object_path(comment.attached_image_url, bucket))
+        self.assertEqual(old_image.reference_count, 1)
+        self.assertEqual(OutboxService.drain(), 0)
+        self.assertIn(f"{bucket}/{old_image.object_path}", self.stored_files())
+
+    def test_deletions_wait_for_commit_and_are_dead_lettered(self):
+        storage = self.use_local_storage()
+        bucket = BucketNames.COMMENT_IMAGES
+        storage.upload(bucket, "old.png", io.BytesIO(b"old"), 3, "image/png")
+
+        # A rolled back transaction also discards its deletions
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            ImageService.delete_image("old.png", bucket)
+            raise RuntimeError("rollback")
+        self.assertFalse(OutboxEvent.objects.exists())
+
+        ImageService.delete_image("old.png", bucket)
+        self.assertEqual(self.stored_files(), ["comment-images/old.png"])
+        with mock.patch.object(type(storage), "delete_many", side_effect=OSError("down")):
+            for _ in range(OutboxService.MAX_ATTEMPTS):
+                OutboxEvent.objects.update(available_at=timezone.now())
+                OutboxService.drain()
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.status, OutboxEvent.StatusChoices.DEAD)
+        self.assertEqual(event.last_error, "down")
+
+        OutboxService.retry_dead_events([event])
+        self.assertEqual(OutboxService.drain(), 1)
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+    def test_failing_event_does_not_hold_back_its_batch(self):
+        storage = self.use_local_storage()
+        bucket = BucketNames.COMMENT_IMAGES
+        for name in ("good.png", "bad.png"):
+            storage.upload(bucket, name, io.BytesIO(b"data"), 4, "image/png")
+            ImageService.delete_image(name, bucket)
+        delete_many = type(storage).delete_many
+
+        def failing_delete_many(storage, bucket, paths):
+            if "bad.png" in paths:
+                raise OSError("locked")
+            delete_many(storage, bucket, paths)
+
+        with mock.patch.object(type(storage), "delete_many", failing_delete_many):
+            self.assertEqual(OutboxService.drain(), 2)
+        self.assertEqual(self.stored_files(), ["comment-images/bad.png"])
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.payload["paths"], ["bad.png"])
+        self.assertEqual((event.attempts, event.last_error), (1, "locked"))
+
+
+class ImageUploadMemoryTests(TestCase):
+    """Peak memory of a large upload to a local storage stand-in. Uploads
+    4 MB in 1 MB chunks; set RUN_BENCHMARKS=1 for the 50 MB benchmark."""
+
+    FILE_SIZE = (50 if os.environ.get("RUN_BENCHMARKS") else 4) * 1024 * 1024
+
+    def setUp(self):
+        storage_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(storage_dir.cleanup)
+        self.stored_path = f"{storage_dir.name}/object"
+
+    class LocalStorageTransport(httpx.BaseTransport):
+        """Resumable upload endpoint streaming the chunks to local disk
+        (httpx.MockTransport would buffer every request body)."""
+
+        def __init__(self, stored_path: str):
+            self.stored_path = stored_path
+
+        def handle_request(self, request: httpx.Request) -> httpx.Response:
+            if request.method == "POST":
+                open(self.stored_path, "wb").close()
+                return httpx.Response(201, headers={"location": "/upload/resumable/object"})
+            with open(self.stored_path, "ab") as stored:
+                if request.method == "PATCH":
+                    for part in request.stream:
+                        stored.write(part)
+                return httpx.Response(204, headers={"upload-offset": str(stored.tell())})
+
+    def make_upload(self):
+        upload = TemporaryUploadedFile("scan.png", "image/png", self.FILE_SIZE, None)
+        digest = hashlib.sha256()
+        block = b"\x89PNG\r\n\x1a\n" + bytes(1024 * 1024 - 8)
+        for _ in range(self.FILE_SIZE // len(block)):
+            upload.write(block)
+            digest.update(block)
+        upload.seek(0)
+        self.addCleanup(upload.close)
+        return upload, digest.hexdigest()
+
+    def test_large_upload_memory_is_bounded(self):
+        upload, expected_digest = self.make_upload()
+        transport = self.LocalStorageTransport(self.stored_path)
+
+        client = mock.Mock()
+        client.storage.from_.return_value.get_public_url.return_value = (
+            "https://example.supabase.co/storage/v1/object/public/manga-content/scan.png")
+        storage = SupabaseStorageBackend(
+            resumable_threshold=1024 * 1024, max_connections=1,
+            client=client, http_client=httpx.Client(transport=transport))
+        with mock.patch("api.services.image_service.get_storage_backend", return_value=storage), \
+                mock.patch.object(ResumableUploadClient, "CHUNK_SIZE", 1024 * 1024):
+            tracemalloc.start()
+            try:
+                ImageService.upload_image(upload, BucketNames.MANGA_CONTENT)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        with open(self.stored_path, "rb") as stored:
+            self.assertEqual(hashlib.sha256(stored.read()).hexdigest(), expected_digest)
+        self.assertLess(peak, 16 * ResumableUploadClient.READ_SIZE)
+
+    def test_oversized_and_unknown_images_are_rejected_before_reading(self):
+        with override_settings(IMAGE_UPLOAD_MAX_BYTES=1024):
+            with self.assertRaisesMessage(ValueError, "too large"):
+                ImageService.upload_image(
+                    io.BytesIO(b"\x89PNG\r\n\x1a\n" + bytes(2048)), BucketNames.MANGA_CONTENT)
+        with self.assertRaisesMessage(ValueError, "Unsupported image type"):
+            ImageService.upload_image(io.BytesIO(b"<svg></svg>"), BucketNames.MANGA_CONTENT)
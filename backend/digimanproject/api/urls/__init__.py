@@ -14,6 +14,7 @@ urlpatterns = [
     # Utility endpoints
     path("auth/", include("api.urls.authentication_urls")),
     path("images/", include("api.urls.image_urls")),
+    path("search/", include("api.urls.search_urls")),
     path("subscriptions/", include("api.urls.subscription_urls")),
     path("payments/", include("api.urls.payment_urls")),
     path("chatbot/", include("api.urls.chatbot_urls")),
@@ -1,6 +1,7 @@
 from django.urls import path
 
 from ..views.homepage_views import (
+    HomepageCacheStatsView,
     HomepageMostReadView,
     HomepagePopularView,
     HomepageRecommendationView,
@@ -11,5 +12,6 @@ urlpatterns = [
     path("recommendations/", RecommendationsView.as_view(), name="recommendations"),
     path("homepage/popular/", HomepagePopularView.as_view(), name="homepage-popular"),
     path("homepage/most-read/", HomepageMostReadView.as_view(), name="homepage-most-read"),
+    path("homepage/cache-stats/", HomepageCacheStatsView.as_view(), name="homepage-cache-stats"),
     path("homepage/recommendation/", HomepageRecommendationView.as_view(), name="homepage-recommendation"),
 ]
@@ -0,0 +1,6 @@
+from django.urls import path
+from ..views.search_view import MangaTitleSearchView
+
+urlpatterns = [
+    path("", MangaTitleSearchView.as_view(), name="search"),
+]
@@ -0,0 +1,89 @@
+import os
+import re
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django.utils.http import content_disposition_header
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range_header(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range "bytes=start-end" header into (start, end), both
+    inclusive. Returns None when the range cannot be satisfied and raises
+    ValueError when it should be ignored (malformed or multiple ranges).
+    """
+    match = RANGE_PATTERN.match(range_header.strip())
+    if match is None or match.group(1) == match.group(2) == "":
+        raise ValueError(f"Unsupported range: {range_header}")
+
+    start, end = match.group(1), match.group(2)
+    if start == "":
+        # Suffix range: the last <end> bytes
+        length = int(end)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = size - 1 if end == "" else min(int(end), size - 1)
+    if start >= size or start > end:
+        return None
+    return start, end
+
+
+def iter_file_range(file: BinaryIO, start: int, end: int) -> Iterator[bytes]:
+    """Yield bytes start..end of an open file in chunks, then close it."""
+    try:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def ranged_file_response(
+    request: HttpRequest, file: BinaryIO, filename: str, content_type: str, etag: str
+) -> HttpResponseBase:
+    """
+    Stream an open file as an attachment, honouring Range and If-Range
+    headers so interrupted downloads can be resumed. The file is closed
+    once the response is done.
+    """
+    # Size of the open file: its path may already be gone
+    size = os.fstat(file.fileno()).st_size
+    start, end, status = 0, size - 1, 200
+
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range_header(range_header, size)
+        except ValueError:
+            byte_range = (start, end)
+        else:
+            if byte_range is None:
+                file.close()
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+            status = 206
+        start, end = byte_range
+
+    response = StreamingHttpResponse(
+        iter_file_range(file, start, end), status=status, content_type=content_type)
+    response["Content-Length"] = str(end - start + 1)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    if status == 206:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
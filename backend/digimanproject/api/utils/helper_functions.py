@@ -1,7 +1,8 @@
-from typing import Any, Dict, Optional, Set, Tuple, TypeVar, TYPE_CHECKING
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple, TypeVar, TYPE_CHECKING
 import uuid
-from django.db.models import Model
-from django.db import transaction
+from django.db.models import Max, Model, QuerySet, prefetch_related_objects
+from django.db import IntegrityError, transaction
 from rest_framework.serializers import Serializer
 from datetime import datetime, timezone
 
@@ -11,6 +12,9 @@ if TYPE_CHECKING:
 M = TypeVar("M", bound=Model)
 S = TypeVar("S", bound=Serializer)
 
+USER_SUBCLASS_CACHE_ATTRIBUTE = "_subclass_instance"
+SEQUENCE_NUMBER_ATTEMPTS = 5
+
 @transaction.atomic
 def update_instance(instance: type[M], **data: Any) -> bool:
     updated_fields = []
@@ -81,6 +85,11 @@ def get_dominant_attribute_and_score(scores: Dict[str, float], thresholds: Dict[
 def cast_user_to_subclass(user: "User"):
     from ..models.user_models import Reader, Administrator, RoleChoices
 
+    # Resolved in bulk by prefetch_user_subclasses()
+    cached = getattr(user, USER_SUBCLASS_CACHE_ATTRIBUTE, None)
+    if cached is not None:
+        return cached
+
     role = user.get_role()
     if role == RoleChoices.READER:
         return Reader.objects.get(pk=user.pk)
@@ -89,6 +98,57 @@ def cast_user_to_subclass(user: "User"):
     else:
         return user
     
+def prefetch_user_subclasses(instances: Iterable[Any], *user_fields: str) -> None:
+    """
+    Load the users behind user_fields (e.g. "owner" or
+    "parent_comment__owner") of all instances, and
+    their Reader/Administrator subclass, with one query per field and per
+    role. The subclass is cached on each user, so cast_user_to_subclass()
+    and the display names/avatars built on it do not query again.
+    """
+    from ..models.user_models import Reader, Administrator, RoleChoices
+
+    instances = list(instances)
+    for user_field in user_fields:
+        prefetch_related_objects(instances, user_field)
+
+    subclasses = {RoleChoices.READER: Reader, RoleChoices.ADMIN: Administrator}
+    users_by_subclass: Dict[type, list] = defaultdict(list)
+    for instance in instances:
+        for user_field in user_fields:
+            user = instance
+            for attribute in user_field.split("__"):
+                user = getattr(user, attribute) if user is not None else None
+            subclass = subclasses.get(user.get_role()) if user is not None else None
+            if subclass is not None and not hasattr(user, USER_SUBCLASS_CACHE_ATTRIBUTE):
+                users_by_subclass[subclass].append(user)
+
+    for subclass, users in users_by_subclass.items():
+        resolved = subclass.objects.in_bulk({user.pk for user in users})
+        for user in users:
+            if user.pk in resolved:
+                setattr(user, USER_SUBCLASS_CACHE_ATTRIBUTE, resolved[user.pk])
+    
+def save_with_sequence_number(
+    instance: M, field: str, scope: QuerySet, save: Callable[[], None]
+) -> None:
+    """
+    Set the field to the next number of the scope and save. The field must
+    be unique within the scope: a concurrent save that took the same number
+    fails the constraint, and the number is drawn again.
+    """
+    for attempt in range(SEQUENCE_NUMBER_ATTEMPTS):
+        last_number = scope.aggregate(last_number=Max(field))["last_number"] or 0
+        setattr(instance, field, last_number + 1)
+        try:
+            with transaction.atomic():
+                save()
+            return
+        except IntegrityError:
+            setattr(instance, field, None)
+            if attempt == SEQUENCE_NUMBER_ATTEMPTS - 1:
+                raise
+
 def stripe_ts_to_datetime(ts: int | None) -> datetime | None:
     return None if not ts else datetime.fromtimestamp(ts, tz=timezone.utc)
 
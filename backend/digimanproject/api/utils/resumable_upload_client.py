@@ -0,0 +1,97 @@
+import base64
+from typing import BinaryIO, Iterator
+
+import httpx
+
+from .env_getters import env
+
+
+class ResumableUploadClient:
+    """
+    Minimal TUS client for Supabase Storage resumable uploads.
+
+    The file is sent in CHUNK_SIZE requests (the chunk size Supabase
+    expects), each streamed from the file in READ_SIZE pieces, so the
+    upload never holds more than READ_SIZE bytes of the file in memory.
+    When a request fails, the client asks the server for the stored offset
+    and resumes from there.
+    """
+
+    CHUNK_SIZE = 6 * 1024 * 1024
+    READ_SIZE = 64 * 1024
+    MAX_RETRIES = 3
+    TUS_VERSION = "1.0.0"
+
+    def __init__(self, client: httpx.Client) -> None:
+        service_role_key: str = env("SUPABASE_SERVICE_ROLE_KEY")
+        self.endpoint = f"{env('SUPABASE_URL')}/storage/v1/upload/resumable"
+        self.client = client
+        self.headers = {
+            "authorization": f"Bearer {service_role_key}",
+            "apikey": service_role_key,
+            "tus-resumable": self.TUS_VERSION,
+        }
+
+    def upload(
+        self, file: BinaryIO, bucket: str, object_name: str, size: int,
+        content_type: str, upsert: bool = False,
+    ) -> None:
+        upload_url = self.create_upload(bucket, object_name, size, content_type, upsert)
+        offset = 0
+        retries = 0
+        file.seek(0)
+        while offset < size:
+            length = min(self.CHUNK_SIZE, size - offset)
+            try:
+                offset = self.send_chunk(upload_url, offset, self.read_chunk(file, length), length)
+                retries = 0
+            except httpx.HTTPError:
+                retries += 1
+                if retries > self.MAX_RETRIES:
+                    raise
+                # Resume from what the server actually stored
+                offset = self.get_offset(upload_url)
+                file.seek(offset)
+
+    def create_upload(
+        self, bucket: str, object_name: str, size: int, content_type: str, upsert: bool
+    ) -> str:
+        metadata = {
+            "bucketName": bucket,
+            "objectName": object_name,
+            "contentType": content_type,
+        }
+        response = self.client.post(self.endpoint, headers={
+            **self.headers,
+            "upload-length": str(size),
+            "x-upsert": "true" if upsert else "false",
+            "upload-metadata": ",".join(
+                f"{key} {base64.b64encode(value.encode()).decode()}"
+                for key, value in metadata.items()
+            ),
+        })
+        response.raise_for_status()
+        return str(response.url.join(response.headers["location"]))
+
+    def read_chunk(self, file: BinaryIO, length: int) -> Iterator[bytes]:
+        while length > 0:
+            data = file.read(min(self.READ_SIZE, length))
+            if not data:
+                raise RuntimeError("File ended before the announced upload length.")
+            length -= len(data)
+            yield data
+
+    def send_chunk(self, upload_url: str, offset: int, content: Iterator[bytes], length: int) -> int:
+        response = self.client.patch(upload_url, content=content, headers={
+            **self.headers,
+            "upload-offset": str(offset),
+            "content-length": str(length),
+            "content-type": "application/offset+octet-stream",
+        })
+        response.raise_for_status()
+        return int(response.headers["upload-offset"])
+
+    def get_offset(self, upload_url: str) -> int:
+        response = self.client.head(upload_url, headers=self.headers)
+        response.raise_for_status()
+        return int(response.headers["upload-offset"])
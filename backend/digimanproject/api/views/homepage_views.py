@@ -1,12 +1,14 @@
 import logging
+import uuid
 
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from ..serializers.manga_model_serializers import MangaTitleSerializer
 from ..services.recommendation_service import RecommendationService
+from ..services.response_cache_service import ResponseCacheService, ResponseCacheSections
 
 logger = logging.getLogger(__name__)
 
@@ -14,8 +16,9 @@ logger = logging.getLogger(__name__)
 class RecommendationsView(APIView):
     """GET /api/recommendations/?manga_id=<uuid>
 
-    Returns a list of manga that share the same author or genres as the
-    given manga, sorted by reader count (descending).
+    Returns the manga most similar to the given manga by reader behaviour
+    (precomputed neighbours), filled up with manga that share the same
+    author or genres. Cached per manga_id.
     """
     permission_classes = [AllowAny]
 
@@ -26,36 +29,64 @@ class RecommendationsView(APIView):
                 {"detail": "manga_id query parameter is required."},
                 status=400,
             )
-        qs = RecommendationService.get_recommendations(manga_id, limit=10)
-        serializer = MangaTitleSerializer(qs, many=True)
-        return Response(serializer.data)
+
+        def compute():
+            qs = RecommendationService.get_recommendations(manga_id, limit=10)
+            return list(MangaTitleSerializer(qs, many=True).data)
+
+        try:
+            cache_key = str(uuid.UUID(manga_id))
+        except ValueError:
+            return Response(compute())
+        return Response(ResponseCacheService.get_or_compute(
+            ResponseCacheSections.RECOMMENDATIONS, compute, key=cache_key))
 
 
 class HomepagePopularView(APIView):
     """GET /api/homepage/popular/
 
     Returns manga sorted by average star rating (highest first).
-    Manga with no ratings appear at the end.
+    Manga with no ratings appear at the end. Served from the response cache.
     """
     permission_classes = [AllowAny]
 
     def get(self, request):
-        qs = RecommendationService.get_popular(limit=12)
-        serializer = MangaTitleSerializer(qs, many=True)
-        return Response(serializer.data)
+        def compute():
+            qs = RecommendationService.get_popular(limit=12)
+            return list(MangaTitleSerializer(qs, many=True).data)
+
+        return Response(ResponseCacheService.get_or_compute(
+            ResponseCacheSections.POPULAR, compute))
 
 
 class HomepageMostReadView(APIView):
     """GET /api/homepage/most-read/
 
     Returns manga sorted by the number of distinct readers (highest first).
+    Served from the response cache.
     """
     permission_classes = [AllowAny]
 
     def get(self, request):
-        qs = RecommendationService.get_most_read(limit=12)
-        serializer = MangaTitleSerializer(qs, many=True)
-        return Response(serializer.data)
+        def compute():
+            qs = RecommendationService.get_most_read(limit=12)
+            return list(MangaTitleSerializer(qs, many=True).data)
+
+        return Response(ResponseCacheService.get_or_compute(
+            ResponseCacheSections.MOST_READ, compute))
+
+
+class HomepageCacheStatsView(APIView):
+    """GET /api/homepage/cache-stats/
+
+    Hit/miss/stale/refresh counters of the discovery response cache,
+    per section. Admin only.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(ResponseCacheService.get_stats())
 
 
 class HomepageRecommendationView(APIView):
@@ -64,7 +95,7 @@ class HomepageRecommendationView(APIView):
     Returns personalised recommendation banners for the authenticated reader.
     Each banner contains:
       - source_manga: the manga from the reader's history that was used as seed
-      - recommendations: list of manga similar to that seed
+      - recommendations: unread manga similar to the reader's recent titles
 
     Number of banners: random 1–3.
     Requires a valid JWT (IsAuthenticated).
@@ -34,6 +34,8 @@ class ImageView(APIView):
         try:
             image_url = self.image_service.upload_image(file, bucket)
             return Response({"url": image_url}, status=status.HTTP_201_CREATED)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -53,7 +55,7 @@ class ImageView(APIView):
         file_path = serializer.validated_data["file_path"]
 
         try:
-            self.image_service.delete_image(bucket, file_path)
+            self.image_service.delete_image(file_path, bucket)
             return Response(
                 {"message": f"Deleted '{file_path}' from '{bucket}'."},
                 status=status.HTTP_200_OK,
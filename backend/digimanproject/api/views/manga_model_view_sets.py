@@ -1,17 +1,29 @@
-from rest_framework import viewsets
+import uuid
+
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.response import Response
+from rest_framework.exceptions import PermissionDenied, ValidationError, NotFound
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 
 from ..models.manga_models import MangaTitle, Chapter, Page, Genre, Author, Comment
 from ..serializers.manga_model_serializers import MangaTitleSerializer, ChapterSerializer, PageSerializer, GenreSerializer, AuthorSerializer, CommentSerializer
-from ..services.manga_service import CommentService
+from ..services.manga_service import MangaTitleService, ChapterService, CommentService
+from ..services.entitlement_service import EntitlementService
+from ..services.offline_package_service import OfflinePackageService
+from ..services.page_import_service import PageImportService
+from ..services.reader_statistics_service import ReaderStatisticsService
+from ..services.reading_progress_buffer_service import ReadingProgressBufferService
+from ..models.user_models import RoleChoices
+from ..models.subscription_models import SubscriptionFeatureChoices
 
-from ..filters.manga_filters import MangaTitleFilter, ChapterFilter, CommentFilter
+from ..filters.manga_filters import MangaTitleFilter, ChapterFilter, CommentFilter, MangaTitleSearchFilter, RelevanceOrderingFilter
+from ..paginations.keyset_paginations import OptInKeysetPagination, KeysetPagination
 from ..permissions.admin_permissions import AdminWriteOnly
 from ..permissions.subscription_permissions import PremiumChaptersPermission
-from django.db.models import Max
+from ..utils.file_responses import ranged_file_response
 
 
 class MangaTitleViewSet(viewsets.ModelViewSet):
@@ -22,16 +34,20 @@ class MangaTitleViewSet(viewsets.ModelViewSet):
     The manga titles are filtered, searched, ordered, and paginated.
     Basic url pattern: 
     /api/manga-titles/?(filters)&search=(keyword)&ordering=(field)&page=(number)
+    Keyset pagination (flat latency at any depth):
+    /api/manga-titles/?(filters)&ordering=(field)&pagination=cursor,
+    then follow the next/previous links.
     """
     queryset = MangaTitle.objects.all().distinct()
     serializer_class = MangaTitleSerializer
+    pagination_class = OptInKeysetPagination
     permission_classes = [AdminWriteOnly]
 
-    # Enable filtering, searching, ordering
+    # Enable filtering, searching (ranked by relevance), ordering
     filter_backends = [
         DjangoFilterBackend,
-        SearchFilter,
-        OrderingFilter,
+        MangaTitleSearchFilter,
+        RelevanceOrderingFilter,
     ]
     filterset_class = MangaTitleFilter
     search_fields = ["title", "alternative_title"]
@@ -44,13 +60,9 @@ class MangaTitleViewSet(viewsets.ModelViewSet):
     ordering = ["-publication_date"]  # default
 
     def get_queryset(self):
-        """Add prefetch/select related for performance"""
-        return (MangaTitle.objects
-            .filter(is_visible=True)
-            .annotate(latest_chapter_date=Max("chapters__upload_date"))
-            .select_related("author")
-            .prefetch_related("genres")
-        )
+        """Visible titles annotated with the serializer's statistics,
+        so a page costs the same number of queries regardless of its size"""
+        return MangaTitleService.get_catalog_queryset()
 
 
 class ChapterViewSet(viewsets.ModelViewSet):
@@ -63,10 +75,153 @@ class ChapterViewSet(viewsets.ModelViewSet):
     ordering = ["-chapter_number", "title"]
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        """Chapters with manga title and page count loaded in the same
+        query; the serializer adds navigation in one extra query"""
+        queryset = ChapterService.get_chapter_queryset()
         if self.request.query_params.get("no_paging") == "true":
             self.pagination_class = None
         return queryset
+
+    @action(detail=True, methods=["get"], url_path="read")
+    def read(self, request, pk=None):
+        """
+        Everything the reader needs to open a chapter, in one response:
+        GET /api/chapters/<id>/read/
+        {
+          "chapter": { ...ChapterSerializer fields (incl. prev/next ids, is_premium)... },
+          "pages": [ { "id", "page_number", "image_url", "image_variants",
+                       "image_metadata" }, ... ],
+          "entitlements": { "premium_chapters", "offline_reading", "admin" },
+          "progress": { "last_read_timestamp", "page_number", "scroll_fraction" } | null
+        }
+        The page metadata (width, height, placeholder) lets the client lay
+        out the whole chapter before the images download.
+        The progress holds the resume position (page_number is null until
+        the reader sent one), so the client can fetch that page first.
+        Premium chapters require the premium_chapters entitlement (403 otherwise).
+        The reader's progress is buffered and written in the background.
+        """
+        chapter: Chapter = self.get_object()
+        user = request.user
+
+        pages = list(
+            chapter.get_pages()
+            .order_by("page_number")
+            .values("id", "page_number", "image_url", "image_variants", "image_metadata")
+        )
+
+        progress = None
+        is_reader = user.is_authenticated and user.role in (RoleChoices.READER, RoleChoices.ADMIN)
+        if is_reader:
+            previous_progress = ReaderStatisticsService.get_reading_progress(user.id, chapter.id)
+            if previous_progress is not None:
+                progress = {
+                    "last_read_timestamp": previous_progress.last_read_timestamp,
+                    "page_number": previous_progress.page_number,
+                    "scroll_fraction": previous_progress.scroll_fraction,
+                }
+            ReadingProgressBufferService.record(user.id, chapter.id)
+
+        return Response({
+            "chapter": self.get_serializer(chapter).data,
+            "pages": pages,
+            "entitlements": EntitlementService.get_entitlements(user, request).to_dict(),
+            "progress": progress,
+        })
+
+    @action(detail=True, methods=["get"], url_path="download")
+    def download(self, request, pk=None):
+        """
+        Offline package of a chapter: GET /api/chapters/<id>/download/
+        A CBZ (ZIP) archive of the page images with a manifest.json.
+        Requires the offline_reading entitlement; supports Range requests.
+        """
+        self.check_offline_reading(request)
+        chapter: Chapter = self.get_object()
+        return self.package_response(
+            request, [chapter], f"{chapter.manga_title.title} - Chapter {chapter.chapter_number}")
+
+    @action(detail=False, methods=["get"], url_path="download")
+    def download_many(self, request):
+        """
+        Offline package of several chapters, in the given order:
+        GET /api/chapters/download/?ids=<id>,<id>,...
+        """
+        self.check_offline_reading(request)
+        try:
+            chapter_ids = list(dict.fromkeys(
+                uuid.UUID(value)
+                for value in request.query_params.get("ids", "").split(",")
+                if value.strip()
+            ))
+        except ValueError:
+            raise ValidationError({"ids": "Invalid chapter id."})
+        if not chapter_ids:
+            raise ValidationError({"ids": "At least one chapter id is required."})
+        if len(chapter_ids) > OfflinePackageService.MAX_CHAPTERS:
+            raise ValidationError({
+                "ids": f"At most {OfflinePackageService.MAX_CHAPTERS} chapters per download."})
+
+        chapters_by_id = ChapterService.get_chapter_queryset().in_bulk(chapter_ids)
+        if len(chapters_by_id) != len(chapter_ids):
+            raise NotFound("Chapter not found.")
+        chapters = [chapters_by_id[chapter_id] for chapter_id in chapter_ids]
+        for chapter in chapters:
+            self.check_object_permissions(request, chapter)
+
+        first = chapters[0]
+        return self.package_response(
+            request, chapters, f"{first.manga_title.title} - {len(chapters)} chapters")
+
+    @action(detail=True, methods=["post"], url_path="import-pages")
+    def import_pages(self, request, pk=None):
+        """
+        Append pages to a chapter in one request (admins only):
+        POST /api/chapters/<id>/import-pages/
+        multipart: "archive" (a CBZ/ZIP file) or "images" (several image files)
+        Pages are numbered after the chapter's last page, in natural order
+        of the file names.
+        """
+        chapter: Chapter = self.get_object()
+        archive_file = request.FILES.get("archive")
+        image_files = request.FILES.getlist("images")
+        if not archive_file and not image_files:
+            raise ValidationError({"detail": "Upload an \"archive\" or \"images\"."})
+
+        try:
+            if archive_file:
+                pages = PageImportService.import_archive(chapter, archive_file, request.user)
+            else:
+                pages = PageImportService.import_files(chapter, image_files, request.user)
+        except ValueError as e:
+            raise ValidationError({"detail": str(e)})
+        except Exception as e:
+            print(e)
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            "created": len(pages),
+            "pages": PageSerializer(pages, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+
+    def check_offline_reading(self, request) -> None:
+        if not EntitlementService.has_feature(
+            request.user, SubscriptionFeatureChoices.OFFLINE_READING, request
+        ):
+            self.permission_denied(
+                request, message="Offline reading is not included in your subscription.")
+
+    def package_response(self, request, chapters, name: str):
+        try:
+            file, key = OfflinePackageService.open_package(chapters)
+        except Exception as e:
+            print(e)
+            return Response(
+                {"detail": "Failed to build the offline package."},
+                status=status.HTTP_502_BAD_GATEWAY)
+        return ranged_file_response(
+            request, file, f"{name}{OfflinePackageService.EXTENSION}",
+            OfflinePackageService.CONTENT_TYPE, f'"{key}"')
     
 
 class PageViewSet(viewsets.ModelViewSet):
@@ -112,8 +267,9 @@ class AuthorViewSet(viewsets.ModelViewSet):
 
 class CommentViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
-    queryset = Comment.objects.all()
+    queryset = Comment.objects.select_related("owner")
     serializer_class = CommentSerializer
+    pagination_class = OptInKeysetPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = CommentFilter
     ordering_fields = ["created_at"]
@@ -154,3 +310,51 @@ class CommentViewSet(viewsets.ModelViewSet):
         # Not allowed
         raise PermissionDenied("Deleting comments is not allowed.")
 
+    @action(detail=False, methods=["get"], url_path="tree")
+    def tree(self, request):
+        """
+        Comment threads, keyset-paginated by top-level comment:
+        GET /api/comments/tree/?manga_title_id=<id> or ?chapter_id=<id>,
+        or the replies of a comment: ?parent_comment_id=<id>.
+        Each comment carries its replies down to ?depth= levels (default
+        3, loaded with one recursive query) and a reply_count; replies that
+        were cut off are loaded with ?parent_comment_id=.
+        """
+        params = request.query_params
+        if not any(params.get(name) for name in (
+            "manga_title_id", "chapter_id", "parent_comment_id"
+        )):
+            raise ValidationError({
+                "detail": "manga_title_id, chapter_id or parent_comment_id is required."})
+        try:
+            depth = int(params.get("depth", CommentService.DEFAULT_TREE_DEPTH))
+        except ValueError:
+            raise ValidationError({"depth": "Depth must be an integer."})
+        depth = max(0, min(depth, CommentService.MAX_TREE_DEPTH))
+
+        roots = self.filter_queryset(self.get_queryset())
+        if not params.get("parent_comment_id"):
+            roots = roots.filter(parent_comment__isnull=True)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(
+            CommentService.annotate_reply_count(roots), request, self)
+        replies = CommentService.get_reply_trees([root.id for root in page], depth)
+        return paginator.get_paginated_response(self.build_comment_trees(page, replies))
+
+    def build_comment_trees(self, roots, replies):
+        """Nest the replies (ordered parents first) under their parents."""
+        comments = [*roots, *replies]
+        serialized = CommentSerializer(
+            comments, many=True, context=self.get_serializer_context()).data
+        nodes = {}
+        trees = []
+        for index, (comment, data) in enumerate(zip(comments, serialized)):
+            data["reply_count"] = comment.reply_count
+            data["replies"] = []
+            nodes[comment.id] = data
+            if index < len(roots):
+                trees.append(data)
+            else:
+                nodes[comment.parent_comment_id]["replies"].append(data)
+        return trees
+
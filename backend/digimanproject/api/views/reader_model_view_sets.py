@@ -6,14 +6,21 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from ..models.manga_models import Chapter
 from ..models.reader_models import ReadingProgress, MangaReaderStatistics
-from ..serializers.reader_model_serializers import ReadingProgressSerializer, MangaReaderStatisticsSerializer
+from ..paginations.keyset_paginations import KeysetPagination
+from ..serializers.reader_model_serializers import (
+    ReadingProgressSerializer, ReadingHistorySerializer, ReadingPositionBatchSerializer,
+    MangaReaderStatisticsSerializer,
+)
 from ..services.reader_statistics_service import ReaderStatisticsService
+from ..services.reading_progress_buffer_service import ReadingProgressBufferService
 
 
 class ReadingProgressViewSet(viewsets.ModelViewSet):
     serializer_class = ReadingProgressSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    # The buffered progress is merged into the list by this (non-null) field
+    ordering_fields = ["last_read_timestamp"]
 
     def get_queryset(self):
         return (
@@ -23,12 +30,60 @@ class ReadingProgressViewSet(viewsets.ModelViewSet):
             .order_by("-last_read_timestamp")
         )
 
+    def list(self, request, *args, **kwargs):
+        # Include the chapters read since the last flush without writing them
+        queryset = ReadingProgressBufferService.overlay(
+            request.user.id, self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    @action(detail=False, methods=["get"], url_path="history")
+    def history(self, request):
+        """
+        Continue-reading history: the latest progress of each manga title,
+        newest first, keyset-paginated (follow the next/previous links).
+        Entries include next_unread_chapter_id and the title's latest
+        chapter.
+
+        The latest entry of each title and its next unread chapter are
+        computed from the stored reads, so the reader's buffered progress
+        is flushed first: two Redis round trips, plus an upsert and
+        statistics update when reads are waiting in the buffer.
+        """
+        ReadingProgressBufferService.flush_reader(request.user.id)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(
+            ReaderStatisticsService.get_reading_history(request.user.id), request, self)
+        serializer = ReadingHistorySerializer(
+            page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=["post"], url_path="positions")
+    def positions(self, request):
+        """
+        Batched resume positions, e.g. debounced scroll updates of the PWA
+        and the ones it queued offline:
+        POST /api/reading-progress/positions/
+        { "positions": [ { "chapter_id", "page_number",
+                           "scroll_fraction" (0-1), "updated_at" }, ... ] }
+        Only the newest position of each chapter is kept. Positions are
+        buffered and written by the periodic flush; returns 202.
+        """
+        serializer = ReadingPositionBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        accepted = ReaderStatisticsService.record_reading_positions(
+            request.user.id, serializer.validated_data["positions"])
+        return Response({"accepted": accepted}, status=status.HTTP_202_ACCEPTED)
+
     def create(self, request, *args, **kwargs):
         """Upsert reading progress for a chapter.
 
         Body: { "chapter_id": "<uuid>" }
         Returns 201 on first read, 200 on a re-visit (timestamp updated).
-        The post_save signal on ReadingProgress will automatically update
+        The progress is buffered; the periodic flush writes it and updates
         MangaReaderStatistics (is_reader_visited, is_reader_read).
         """
         chapter_id = request.data.get("chapter_id")
@@ -0,0 +1,41 @@
+from rest_framework import generics
+from rest_framework.permissions import AllowAny
+from django_filters.rest_framework import DjangoFilterBackend
+
+from ..models.manga_models import MangaTitle
+from ..serializers.manga_model_serializers import MangaTitleSerializer
+from ..services.manga_service import MangaTitleService
+from ..filters.manga_filters import MangaTitleFilter, MangaTitleSearchFilter, RelevanceOrderingFilter
+from ..paginations.keyset_paginations import OptInKeysetPagination
+
+
+class MangaTitleSearchView(generics.ListAPIView):
+    """GET /api/search/?search=(keyword)&(filters)&ordering=(field)
+
+    Manga titles matching the keyword through full-text search (title,
+    alternative title, author, genres, description) or trigram similarity
+    (typos), ranked by relevance unless an ordering is given.
+    Returns an empty page when no keyword is given.
+    """
+    permission_classes = [AllowAny]
+    serializer_class = MangaTitleSerializer
+    pagination_class = OptInKeysetPagination
+    filter_backends = [
+        DjangoFilterBackend,
+        MangaTitleSearchFilter,
+        RelevanceOrderingFilter,
+    ]
+    filterset_class = MangaTitleFilter
+    search_fields = ["title", "alternative_title", "author__name"]
+    ordering_fields = [
+        "title",
+        "publication_date",
+        "latest_chapter_date",
+    ]
+    ordering = ["-publication_date"]
+
+    def get_queryset(self):
+        search_terms = MangaTitleSearchFilter().get_search_terms(self.request)
+        if not search_terms:
+            return MangaTitle.objects.none()
+        return MangaTitleService.get_catalog_queryset()
@@ -11,6 +11,7 @@ from ..models.subscription_models import SubscriptionPlan, ReaderSubscription, P
 from ..serializers.subscription_serializers import SubscriptionPlanSerializer, ReaderSubscriptionSerializer, PaymentTransactionSerializer, SubscriptionMeSerializer
 from ..services.subscription_service import ReaderSubscriptionService
 from ..services.stripe_service import StripeService
+from ..services.entitlement_service import EntitlementService
 
 from ..permissions.admin_permissions import AdminWriteOnly
 
@@ -46,11 +47,12 @@ class SubscriptionMeView(APIView):
 
         ReaderSubscriptionService.check_or_create_reader_subscription(user.get_id())
 
-        return Response(
-            SubscriptionMeSerializer(user.get_id()).data.get
-            ("reader_subscription"), 
-            status=status.HTTP_200_OK
-        )
+        reader_subscription = SubscriptionMeSerializer(user.get_id()).data.get(
+            "reader_subscription")
+        if reader_subscription is not None:
+            reader_subscription["entitlements"] = EntitlementService.get_entitlements(
+                user, request).to_dict()
+        return Response(reader_subscription, status=status.HTTP_200_OK)
 
 
 class ToggleAutoRenewalView(APIView):
@@ -5,6 +5,7 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from ..models.system_models import Report, Penalty, FlaggedContent, LogEntry
 from ..serializers.system_model_serializers import ReportSerializer, PenaltySerializer, FlaggedContentSerializer, LogEntrySerializer
+from ..paginations.keyset_paginations import OptInKeysetPagination
 
 
 class ReportViewSet(viewsets.ModelViewSet):
@@ -65,3 +66,6 @@ class LogEntryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminUser]
     queryset = LogEntry.objects.all()
     serializer_class = LogEntrySerializer
+    pagination_class = OptInKeysetPagination
+    ordering_fields = ["timestamp"]
+    ordering = ["-timestamp"]
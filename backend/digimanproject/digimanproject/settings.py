@@ -15,6 +15,7 @@ import os
 import environ
 import dj_database_url
 import ssl
+import tempfile
 from urllib.parse import urlparse
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -61,6 +62,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'api',
     'rest_framework_simplejwt',
@@ -204,6 +206,23 @@ CELERY_RESULT_BACKEND = env("REDIS_URL")
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+CELERY_BEAT_SCHEDULE = {
+    # Retries outbox events and picks up any whose drain was not enqueued
+    "drain-outbox": {
+        "task": "api.tasks.drain_outbox_task",
+        "schedule": 60.0,
+    },
+    # Writes the reading progress buffered in Redis
+    "flush-reading-progress": {
+        "task": "api.tasks.flush_reading_progress_task",
+        "schedule": env.float("READING_PROGRESS_FLUSH_SECONDS", default=10.0),
+    },
+    # Recomputes the collaborative filtering neighbours of each title
+    "rebuild-title-similarities": {
+        "task": "api.tasks.rebuild_title_similarities_task",
+        "schedule": env.float("TITLE_SIMILARITY_REBUILD_SECONDS", default=6 * 3600.0),
+    },
+}
 
 
 # Django Redis Settings
@@ -231,6 +250,39 @@ CACHES = {
 }
 
 
+# Uploads (larger files are spooled to disk and streamed to storage)
+
+IMAGE_UPLOAD_MAX_BYTES = env.int("IMAGE_UPLOAD_MAX_BYTES", default=64 * 1024 ** 2)
+ARCHIVE_UPLOAD_MAX_BYTES = env.int("ARCHIVE_UPLOAD_MAX_BYTES", default=1024 ** 3)
+RESUMABLE_UPLOAD_THRESHOLD = env.int("RESUMABLE_UPLOAD_THRESHOLD", default=6 * 1024 ** 2)
+FILE_UPLOAD_HANDLERS = [
+    "api.utils.upload_handlers.UploadSizeLimitHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+# Storage Backend ("supabase" or "local" for development, CI and load tests)
+
+STORAGE_BACKEND = env("STORAGE_BACKEND", default="supabase")
+STORAGE_MAX_CONNECTIONS = env.int("STORAGE_MAX_CONNECTIONS", default=20)
+STORAGE_UPLOAD_CONCURRENCY = env.int("STORAGE_UPLOAD_CONCURRENCY", default=8)
+LOCAL_STORAGE_ROOT = env(
+    "LOCAL_STORAGE_ROOT",
+    default=os.path.join(tempfile.gettempdir(), "digiman-storage"),
+)
+LOCAL_STORAGE_URL = env("LOCAL_STORAGE_URL", default="http://localhost:8000/local-storage/")
+
+
+# Offline Download Packages (built chapter archives, LRU-evicted)
+
+OFFLINE_PACKAGE_CACHE_DIR = env(
+    "OFFLINE_PACKAGE_CACHE_DIR",
+    default=os.path.join(tempfile.gettempdir(), "digiman-offline-packages"),
+)
+OFFLINE_PACKAGE_CACHE_MAX_BYTES = env.int(
+    "OFFLINE_PACKAGE_CACHE_MAX_BYTES", default=2 * 1024 ** 3)
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -14,12 +14,24 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from urllib.parse import urlparse
+
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.http import HttpResponse
+from django.views.static import serve
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
     path("wake/", lambda r: HttpResponse("awake")),
 ]
+
+# Serve the local storage backend's files (development, CI and load tests)
+if settings.STORAGE_BACKEND == "local":
+    local_storage_prefix = urlparse(settings.LOCAL_STORAGE_URL).path.strip("/")
+    urlpatterns += [
+        re_path(rf"^{local_storage_prefix}/(?P<path>.*)$", serve,
+                {"document_root": settings.LOCAL_STORAGE_ROOT}),
+    ]